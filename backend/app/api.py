@@ -1,14 +1,40 @@
 """Complete FastAPI backend for AWS Study Partner."""
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Optional
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import List, Optional
+import asyncio
+import importlib
 import os
+import secrets
+import time
+import uuid
 
 from models.schemas import (
-    QueryRequest, QueryResponse, ExplainRequest, CompareRequest,
+    QueryRequest, QueryResponse, BatchQueryRequest, BatchQueryItem,
+    ExplainRequest, CompareRequest,
     QuizRequest, QuizResponse, QuizSubmission, QuizResult,
-    Topic, HealthResponse
+    BulkQuizSubmission, BulkQuizResult, QuestionStats,
+    FlashcardNextResponse, FlashcardReviewRequest, FlashcardReviewResponse,
+    HealthResponse, IngestionJobStatus
 )
+from models.topics import STUDY_TOPICS
+from services.admission import AdmissionController, Rejected
+from services.deadlines import (
+    Deadline, RequestCancelled, cancellation_cause, cancellation_stats, deadline_scope
+)
+from services.generations import GenerationManager
+from services.flashcards import RATINGS, FlashcardScheduler, build_deck
+from services.grading import PASSING_SCORE, AnswerKey
+from services.ingestion import IngestionManager, ingest_workers
+from services.payloads import compress, encode_json, shape_result, source_level
+from services.question_bank import QuestionBank
+from services.response_cache import bump_index_epoch
+from services.tracing import span
 
 # Initialize FastAPI
 app = FastAPI(
@@ -28,22 +54,229 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def _build_engine():
+    factory = os.getenv("STUDY_PARTNER_FACTORY")
+    if factory:
+        # "module:function" building the engine, e.g. services.standins:standin_engine
+        # for load tests on local stand-ins with configurable latency
+        module_name, _, function_name = factory.partition(":")
+        return getattr(importlib.import_module(module_name), function_name)()
+    from rag_engine import EnhancedAWSStudyPartner
+    return EnhancedAWSStudyPartner()
+
+
+def _on_engine_swap(engine, previous):
+    if previous is not None and engine.index_version != previous.index_version:
+        engine.purge_stale_responses()
+    print(f"🔄 Serving engine generation {generations.generation} (index {engine.index_version})")
+
+
+# Engine generations: each request leases the engine that is current when it
+# starts. A reload builds the next generation in the background (reopening
+# the index at its live generation and reloading the service index and
+# question bank), swaps it in, and frees the old one once its last request
+# finishes.
+generations = GenerationManager(
+    loader=lambda engine: engine.next_generation() if engine else _build_engine(),
+    release=lambda engine: engine.release(),
+    on_swap=_on_engine_swap
+)
+
 # Initialize study partner immediately (before Uvicorn starts)
 print("🚀 Initializing Enhanced AWS Study Partner...")
-study_partner = None
 
 try:
-    from rag_engine import EnhancedAWSStudyPartner
-    study_partner = EnhancedAWSStudyPartner()
+    generations.install(_build_engine())
     print("✅ Study Partner ready!")
 except Exception as e:
     print(f"❌ Failed to initialize study partner: {e}")
     import traceback
     traceback.print_exc()
-    study_partner = None
 
-# Store active quizzes (in production, use Redis or database)
+# Store active quizzes and their answer keys (in production, use Redis or database)
 active_quizzes = {}
+answer_keys = {}
+
+# Background ingestion: uploads land in data/raw/uploads/<batch>/
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+UPLOAD_DIR = DATA_DIR / "raw" / "uploads"
+
+
+def _flashcard_deck():
+    engine = generations.current
+    question_bank = (
+        engine.question_bank if engine
+        else QuestionBank.from_processed(DATA_DIR / "processed")
+    )
+    return build_deck(question_bank, DATA_DIR / "processed")
+
+
+# Flashcards need no LLM or index: the deck comes from the processed chunks
+flashcards = FlashcardScheduler.from_env(_flashcard_deck(), DATA_DIR / "flashcards.sqlite3")
+
+
+def _on_ingestion_complete(job):
+    """Pick up new partitions, service tags and cards without a restart."""
+    if not generations.reload():
+        # A reload already running may have read the index before this job
+        generations.wait()
+        generations.reload()
+    generations.wait()
+    flashcards.set_deck(_flashcard_deck())
+
+
+# On the local backend each job publishes a new index generation, which
+# the reload in _on_ingestion_complete then serves
+ingestion_manager = IngestionManager(
+    processed_dir=DATA_DIR / "processed",
+    max_workers=ingest_workers(),
+    on_complete=_on_ingestion_complete,
+    local_index_path=(
+        Path(os.getenv("LOCAL_INDEX_PATH", str(DATA_DIR / "index")))
+        if os.getenv("VECTOR_BACKEND", "pinecone") == "local" else None
+    )
+)
+
+
+# Admission control: per-endpoint concurrency limits with bounded wait
+# queues. Saturated endpoints shed load with 503 + Retry-After instead of
+# piling up requests that would time out anyway.
+admission = {
+    "query": AdmissionController.from_env("query", limit=8, queue_size=32),
+    "batch": AdmissionController.from_env("batch", limit=2, queue_size=4),
+    "explain": AdmissionController.from_env("explain", limit=4, queue_size=16),
+    "compare": AdmissionController.from_env("compare", limit=4, queue_size=16),
+    "quiz": AdmissionController.from_env("quiz", limit=4, queue_size=16),
+}
+
+
+async def admit(endpoint: str, session_id: Optional[str] = None, deadline: Optional[Deadline] = None):
+    """Ticket for one request, or 503 with Retry-After when saturated."""
+    try:
+        return await admission[endpoint].acquire(
+            session_id, timeout=deadline.remaining() if deadline else None
+        )
+    except Rejected as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Server busy ({e.reason}), retry in {e.retry_after}s",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+
+@asynccontextmanager
+async def admitted(endpoint: str, session_id: Optional[str] = None, deadline: Optional[Deadline] = None):
+    ticket = await admit(endpoint, session_id, deadline)
+    try:
+        yield ticket
+    finally:
+        ticket.release()
+
+
+# Deadlines: `timeout_ms` in the body or an X-Request-Timeout-Ms header
+# (the smaller wins; REQUEST_TIMEOUT_MS is the server default). Requests
+# whose client disconnects are cancelled mid-pipeline.
+DEFAULT_TIMEOUT_MS = os.getenv("REQUEST_TIMEOUT_MS")
+DISCONNECT_POLL_SECONDS = 0.25
+
+
+def request_deadline(http_request: Request, timeout_ms: Optional[int] = None) -> Deadline:
+    candidates = [timeout_ms, http_request.headers.get("x-request-timeout-ms"), DEFAULT_TIMEOUT_MS]
+    try:
+        limits = [int(value) for value in candidates if value]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="X-Request-Timeout-Ms must be an integer")
+    return Deadline(min(limits) / 1000 if limits else None)
+
+
+async def run_engine(http_request: Request, deadline: Deadline, label: str, method: str, **kwargs):
+    """
+    Run a blocking engine method in the threadpool under `deadline`.
+    
+    The worker leases the current engine generation and holds it until it
+    returns, even when the request has already been answered with 499/504,
+    so a reload never frees an index that a worker is still reading.
+    
+    While it runs, the client connection is polled; on disconnect (or when
+    the deadline passes) the deadline is cancelled and the worker stops at
+    its next checkpoint, abandoning any in-flight LLM stream. Failures map
+    to 499 (client gone), 504 (deadline) or 500. The call is the root span
+    of the request's trace, tagged with its X-Request-ID (or a new id).
+    """
+    request_id = http_request.headers.get("x-request-id") or uuid.uuid4().hex
+    
+    def call():
+        lease = generations.checkout()
+        if lease is None:
+            raise RuntimeError("Study partner not initialized")
+        try:
+            with deadline_scope(deadline), span(
+                f"api.{label}", **{"request.id": request_id, "generation": lease.generation.number}
+            ):
+                return getattr(lease.value, method)(**kwargs)
+        finally:
+            lease.release()
+    
+    task = asyncio.ensure_future(run_in_threadpool(call))
+    # An abandoned worker still finishes (or fails) later; don't log that
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+    try:
+        while not task.done():
+            await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if task.done():
+                break
+            if await http_request.is_disconnected():
+                deadline.cancel("client_disconnected")
+            elif deadline.expired:
+                deadline.cancel("deadline_exceeded")
+            if deadline.cancelled:
+                # Don't wait for the worker; it notices at its next checkpoint
+                raise RequestCancelled(deadline.reason, "in_flight")
+        result = task.result()
+    except Exception as e:
+        # Cancellations raised inside an upstream call arrive wrapped by the SDK
+        cancelled = cancellation_cause(e)
+        if cancelled is not None or deadline.stopped:
+            reason = deadline.reason or "deadline_exceeded"
+            cancellation_stats.record(reason, cancelled.stage if cancelled is not None else None)
+            if reason == "client_disconnected":
+                raise HTTPException(status_code=499, detail="Client closed request")
+            raise HTTPException(status_code=504, detail=f"{label} exceeded its deadline")
+        cancellation_stats.record("failed")
+        raise HTTPException(status_code=500, detail=f"{label} failed: {str(e)}")
+    
+    cancellation_stats.record("completed")
+    return result
+
+
+def json_response(content, http_request: Request, status_code: int = 200) -> Response:
+    """
+    JSON for the hot endpoints, encoded directly (orjson for dicts,
+    pydantic-core for models) rather than validated and re-encoded by
+    FastAPI, and compressed when large enough and the client accepts it.
+    """
+    body, encoding = compress(encode_json(content), http_request.headers.get("accept-encoding", ""))
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(body, status_code=status_code, headers=headers, media_type="application/json")
+
+
+def require_admin(http_request: Request):
+    """403 unless X-Admin-Token matches ADMIN_TOKEN (open when ADMIN_TOKEN is unset)."""
+    token = os.getenv("ADMIN_TOKEN")
+    if token and not secrets.compare_digest(http_request.headers.get("x-admin-token", ""), token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+def get_quiz(quiz_id: str) -> dict:
+    """Stored quiz, or 404."""
+    if quiz_id not in active_quizzes:
+        raise HTTPException(
+            status_code=404, 
+            detail=f"Quiz {quiz_id} not found. Generate a quiz first."
+        )
+    return active_quizzes[quiz_id]
 
 
 # ============================================================================
@@ -64,6 +297,7 @@ async def root():
             "Concept explanations",
             "Service comparisons",
             "Practice quizzes",
+            "Spaced-repetition flashcards",
             "Session management"
         ]
     }
@@ -71,52 +305,127 @@ async def root():
 
 @app.get("/health", response_model=HealthResponse, tags=["Health"])
 async def health_check():
-    """Detailed health check."""
+    """Detailed health check, including the engine generation being served."""
+    engine = generations.current
+    index = engine.local_index if engine else None
     return HealthResponse(
-        status="healthy" if study_partner else "degraded",
-        study_partner_initialized=study_partner is not None,
+        status="healthy" if engine else "degraded",
+        study_partner_initialized=engine is not None,
         pinecone_index=os.getenv("PINECONE_INDEX_NAME", ""),
         embedding_model=os.getenv("EMBEDDING_MODEL", ""),
+        embedding_dimension=engine.embedding_dimension if engine else None,
+        generation=generations.generation,
+        index_version=engine.index_version if engine else None,
+        index_generation=index.generation if index is not None else None,
+        reloading=generations.loading,
         version="2.0.0"
     )
 
 
 @app.post("/api/query", response_model=QueryResponse, tags=["Study"])
-async def query(request: QueryRequest):
+async def query(request: QueryRequest, http_request: Request):
     """
     Ask a question to the study partner.
     
     Supports conversation history via session_id.
     
+    **Sources** (`include_sources`): `none`, `ids` (chunk ids only),
+    `excerpts` (first 300 characters; the default, same as `true`) or
+    `full` chunk text.
+    
     **Example Request:**
 ```json
     {
         "question": "What is Amazon S3?",
         "session_id": "my-session-123",
-        "top_k": 5
+        "top_k": 5,
+        "include_sources": "ids"
     }
 ```
     """
-    if not study_partner:
+    if not generations.current:
         raise HTTPException(
             status_code=503, 
             detail="Study partner not initialized. Check server logs."
         )
     
-    try:
-        result = study_partner.query(
+    deadline = request_deadline(http_request, request.timeout_ms)
+    async with admitted("query", request.session_id, deadline):
+        result = await run_engine(
+            http_request, deadline, "Query",
+            "query",
             question=request.question,
             session_id=request.session_id,
             top_k=request.top_k,
-            include_history=True
+            include_history=True,
+            services=request.services,
+            certification=request.certification
         )
-        return QueryResponse(**result)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Query failed: {str(e)}")
+        return json_response(shape_result(result, source_level(request.include_sources)), http_request)
+
+
+@app.post("/api/query/batch", tags=["Study"])
+async def query_batch(request: BatchQueryRequest, http_request: Request):
+    """
+    Answer a list of questions in one call.
+    
+    Questions are embedded together and answered with bounded LLM
+    concurrency. Results stream back as newline-delimited JSON in completion
+    order; each line carries the question's `index`. A failed item is
+    reported on its own line and does not fail the batch.
+    
+    **Example Request:**
+```json
+    {
+        "questions": ["What is Amazon S3?", "When should I use SQS FIFO?"],
+        "top_k": 4,
+        "max_concurrency": 8
+    }
+```
+    """
+    if not generations.current:
+        raise HTTPException(status_code=503, detail="Study partner not initialized")
+    
+    # The slot and the engine generation are held until the stream finishes
+    # (or the client goes away)
+    deadline = request_deadline(http_request, request.timeout_ms)
+    level = source_level(request.include_sources)
+    ticket = await admit("batch", deadline=deadline)
+    lease = generations.checkout()
+    if lease is None:
+        ticket.release()
+        raise HTTPException(status_code=503, detail="Study partner not initialized")
+    
+    def finish():
+        ticket.release()
+        lease.release()
+    
+    def stream():
+        # Sync generator: Starlette iterates it in a worker thread. If the
+        # client disconnects it is closed, which cancels the batch.
+        try:
+            for item in lease.value.query_batch(
+                questions=request.questions,
+                top_k=request.top_k,
+                max_concurrency=request.max_concurrency,
+                services=request.services,
+                certification=request.certification,
+                deadline=deadline
+            ):
+                if item.get("result"):
+                    item = {**item, "result": shape_result(item["result"], level)}
+                yield BatchQueryItem(**item).model_dump_json(exclude_none=True) + "\n"
+        finally:
+            finish()
+            cancellation_stats.record(deadline.reason if deadline.stopped else "completed")
+    
+    return StreamingResponse(
+        stream(), media_type="application/x-ndjson", background=BackgroundTask(finish)
+    )
 
 
 @app.post("/api/explain", response_model=QueryResponse, tags=["Study"])
-async def explain(request: ExplainRequest):
+async def explain(request: ExplainRequest, http_request: Request):
     """
     Get detailed explanation of an AWS concept.
     
@@ -133,21 +442,22 @@ async def explain(request: ExplainRequest):
     }
 ```
     """
-    if not study_partner:
+    if not generations.current:
         raise HTTPException(status_code=503, detail="Study partner not initialized")
     
-    try:
-        result = study_partner.explain_concept(
+    deadline = request_deadline(http_request, request.timeout_ms)
+    async with admitted("explain", deadline=deadline):
+        result = await run_engine(
+            http_request, deadline, "Explanation",
+            "explain_concept",
             concept=request.concept,
             detail_level=request.detail_level
         )
-        return QueryResponse(**result)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Explanation failed: {str(e)}")
+        return json_response(shape_result(result, source_level(request.include_sources)), http_request)
 
 
 @app.post("/api/compare", response_model=QueryResponse, tags=["Study"])
-async def compare(request: CompareRequest):
+async def compare(request: CompareRequest, http_request: Request):
     """
     Compare two AWS services.
     
@@ -162,22 +472,23 @@ async def compare(request: CompareRequest):
     }
 ```
     """
-    if not study_partner:
+    if not generations.current:
         raise HTTPException(status_code=503, detail="Study partner not initialized")
     
-    try:
-        result = study_partner.compare_services(
+    deadline = request_deadline(http_request, request.timeout_ms)
+    async with admitted("compare", deadline=deadline):
+        result = await run_engine(
+            http_request, deadline, "Comparison",
+            "compare_services",
             service1=request.service1,
             service2=request.service2,
             aspects=request.aspects
         )
-        return QueryResponse(**result)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Comparison failed: {str(e)}")
+        return json_response(shape_result(result, source_level(request.include_sources)), http_request)
 
 
 @app.post("/api/quiz/generate", response_model=QuizResponse, tags=["Quiz"])
-async def generate_quiz(request: QuizRequest):
+async def generate_quiz(request: QuizRequest, http_request: Request):
     """
     Generate a practice quiz.
     
@@ -194,27 +505,31 @@ async def generate_quiz(request: QuizRequest):
     }
 ```
     """
-    if not study_partner:
+    if not generations.current:
         raise HTTPException(status_code=503, detail="Study partner not initialized")
     
-    try:
-        result = study_partner.generate_quiz(
+    deadline = request_deadline(http_request, request.timeout_ms)
+    async with admitted("quiz", deadline=deadline):
+        result = await run_engine(
+            http_request, deadline, "Quiz generation",
+            "generate_quiz",
             topic=request.topic,
             num_questions=request.num_questions,
-            difficulty=request.difficulty
+            difficulty=request.difficulty,
+            certification=request.certification
         )
         
-        # Store quiz for later grading
+        # Store quiz and its normalized answer key for later grading
         quiz_id = result["quiz_id"]
         active_quizzes[quiz_id] = result
+        answer_keys[quiz_id] = AnswerKey.from_quiz(result)
         
-        return QuizResponse(**result)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Quiz generation failed: {str(e)}")
+        # Through the model: it drops the server-side answer key
+        return json_response(QuizResponse(**result), http_request)
 
 
 @app.post("/api/quiz/submit", response_model=QuizResult, tags=["Quiz"])
-async def submit_quiz(submission: QuizSubmission):
+async def submit_quiz(submission: QuizSubmission, http_request: Request):
     """
     Submit quiz answers for grading.
     
@@ -232,52 +547,138 @@ async def submit_quiz(submission: QuizSubmission):
     }
 ```
     """
-    quiz_id = submission.quiz_id
+    quiz = get_quiz(submission.quiz_id)
+    key = answer_keys[submission.quiz_id]
+    problems = key.check(submission.answers)
+    if problems:
+        raise HTTPException(status_code=422, detail={"message": "Submission doesn't match the quiz", **problems})
+    graded = key.grade([submission.answers])
     
-    if quiz_id not in active_quizzes:
-        raise HTTPException(
-            status_code=404, 
-            detail=f"Quiz {quiz_id} not found. Generate a quiz first."
-        )
-    
-    quiz = active_quizzes[quiz_id]
-    
-    # Grade quiz
-    # Note: This is simplified. In production, store correct answers securely
     results = []
-    correct = 0
-    
-    for question in quiz["questions"]:
+    for index, question in enumerate(quiz["questions"]):
         q_id = question["id"]
-        user_answer = submission.answers.get(q_id, "")
-        
-        # Simplified grading (in real app, compare with stored correct answers)
-        # For demo purposes, randomly mark some as correct
-        is_correct = bool(hash(user_answer) % 2) if user_answer else False
-        
-        if is_correct:
-            correct += 1
-        
+        entry = key.questions[index]
         results.append({
             "question_id": q_id,
             "question": question["question"][:100] + "...",
-            "user_answer": user_answer,
-            "is_correct": is_correct,
-            "explanation": "Review AWS documentation for detailed explanation."
+            "user_answer": submission.answers.get(q_id, ""),
+            # None: no answer key was found for this question
+            "is_correct": bool(graded["correct"][0, index]) if key.gradable[index] else None,
+            "correct_answer": key.label(index, int(key.masks[index])) or None,
+            "explanation": entry.get("explanation") or "Review AWS documentation for detailed explanation."
         })
     
-    total = len(quiz["questions"])
-    score = (correct / total * 100) if total > 0 else 0
-    passed = score >= 70  # 70% passing grade
-    
-    return QuizResult(
-        quiz_id=quiz_id,
-        score=round(score, 2),
-        total_questions=total,
-        correct_answers=correct,
-        results=results,
-        passed=passed
-    )
+    score = float(graded["scores"][0])
+    
+    return json_response({
+        "quiz_id": submission.quiz_id,
+        "score": round(score, 2),
+        "total_questions": len(quiz["questions"]),
+        "correct_answers": int(graded["correct_counts"][0]),
+        "results": results,
+        "passed": score >= PASSING_SCORE,
+        "graded_questions": graded["graded_questions"]
+    }, http_request)
+
+
+@app.post("/api/quiz/submit/bulk", response_model=BulkQuizResult, tags=["Quiz"])
+async def submit_quiz_bulk(submission: BulkQuizSubmission, http_request: Request):
+    """
+    Grade a whole class's submissions for one quiz against its answer key.
+    
+    Answers may be option letters ("B", "b)"), numbers ("2") or the option
+    text; case, spacing and punctuation don't matter. No LLM calls are made,
+    so thousands of submissions grade in well under a second. Returns each
+    student's score and per-question statistics (percent correct, blanks,
+    most common wrong answers). A student's answers to unknown questions or
+    past the last option are listed on their result; the latter grade wrong.
+    
+    **Example Request:**
+```json
+    {
+        "quiz_id": "abc-123-def",
+        "submissions": [
+            {"student_id": "s1", "answers": {"q1": "B", "q2": "A, D"}},
+            {"student_id": "s2", "answers": {"q1": "c", "q2": "A and D"}}
+        ]
+    }
+```
+    """
+    get_quiz(submission.quiz_id)
+    key = answer_keys[submission.quiz_id]
+    if not key.gradable.any():
+        raise HTTPException(status_code=422, detail="Quiz has no questions with an answer key")
+    
+    start = time.perf_counter()
+    answers = [s.answers for s in submission.submissions]
+
+    def grade_class():
+        # A bad answer is graded wrong and flagged on that student's result, not a 422 for the class
+        return key.grade(answers, submission.top_wrong_answers), [key.check(a) for a in answers]
+
+    graded, problems = await run_in_threadpool(grade_class)
+    scores = graded["scores"]
+    
+    # Plain dicts: a model per student costs more than grading the class
+    return json_response({
+        "quiz_id": submission.quiz_id,
+        "submissions": len(submission.submissions),
+        "graded_questions": graded["graded_questions"],
+        "average_score": round(float(scores.mean()), 2),
+        "pass_rate": round(float((scores >= PASSING_SCORE).mean()), 4),
+        "results": [
+            {
+                "student_id": s.student_id,
+                "score": round(score, 2),
+                "correct_answers": correct,
+                "passed": score >= PASSING_SCORE,
+                **flagged
+            }
+            for s, score, correct, flagged in zip(
+                submission.submissions, scores.tolist(), graded["correct_counts"].tolist(), problems
+            )
+        ],
+        "question_stats": [QuestionStats(**stats).model_dump() for stats in graded["question_stats"]],
+        "grading_ms": round((time.perf_counter() - start) * 1000, 2)
+    }, http_request)
+
+
+@app.get("/api/flashcards/next", response_model=FlashcardNextResponse, tags=["Flashcards"])
+async def next_flashcard(user_id: str):
+    """
+    Get the next flashcard for a user.
+    
+    Cards that are due come first, most overdue first; when none are due,
+    unseen cards are introduced (up to FLASHCARD_NEW_PER_DAY per day).
+    Returns `card: null` and `next_due` when there is nothing to study.
+    """
+    result = await run_in_threadpool(flashcards.next_card, user_id)
+    return FlashcardNextResponse(user_id=user_id, **result)
+
+
+@app.post("/api/flashcards/review", response_model=FlashcardReviewResponse, tags=["Flashcards"])
+async def review_flashcard(request: FlashcardReviewRequest):
+    """
+    Record how well a card was recalled and reschedule it (SM-2).
+    
+    **Example Request:**
+```json
+    {
+        "user_id": "student-1",
+        "card_id": "practice exam.pdf#q12",
+        "rating": "good"
+    }
+```
+    Ratings: again, hard, good, easy (or `quality` 0-5).
+    """
+    if request.quality is None and request.rating is None:
+        raise HTTPException(status_code=422, detail="Provide a rating or a quality")
+    quality = request.quality if request.quality is not None else RATINGS[request.rating]
+    try:
+        result = await run_in_threadpool(flashcards.review, request.user_id, request.card_id, quality)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Card {request.card_id} not found")
+    return FlashcardReviewResponse(user_id=request.user_id, **result)
 
 
 @app.get("/api/topics", tags=["Topics"])
@@ -285,94 +686,16 @@ async def get_topics():
     """
     Get list of available AWS topics/services.
     
-    Returns common AWS services covered in certifications.
-    """
-    topics = [
-        Topic(
-            id="s3", 
-            name="S3 - Simple Storage Service", 
-            icon="📦",
-            description="Object storage with high scalability and durability"
-        ),
-        Topic(
-            id="ec2", 
-            name="EC2 - Elastic Compute Cloud", 
-            icon="🖥️",
-            description="Scalable virtual servers in the cloud"
-        ),
-        Topic(
-            id="vpc", 
-            name="VPC - Virtual Private Cloud", 
-            icon="🔒",
-            description="Isolated cloud resources and networking"
-        ),
-        Topic(
-            id="iam", 
-            name="IAM - Identity & Access Management", 
-            icon="👤",
-            description="Secure access control for AWS resources"
-        ),
-        Topic(
-            id="rds", 
-            name="RDS - Relational Database Service", 
-            icon="🗄️",
-            description="Managed relational databases"
-        ),
-        Topic(
-            id="lambda", 
-            name="Lambda - Serverless Compute", 
-            icon="⚡",
-            description="Run code without managing servers"
-        ),
-        Topic(
-            id="cloudfront", 
-            name="CloudFront - CDN", 
-            icon="🌐",
-            description="Content delivery network for fast distribution"
-        ),
-        Topic(
-            id="route53", 
-            name="Route 53 - DNS Service", 
-            icon="🗺️",
-            description="Scalable domain name system"
-        ),
-        Topic(
-            id="cloudwatch", 
-            name="CloudWatch - Monitoring", 
-            icon="📊",
-            description="Monitor resources and applications"
-        ),
-        Topic(
-            id="dynamodb", 
-            name="DynamoDB - NoSQL Database", 
-            icon="🔢",
-            description="Fast and flexible NoSQL database"
-        ),
-        Topic(
-            id="elasticache", 
-            name="ElastiCache - Caching", 
-            icon="⚡",
-            description="In-memory data store and cache"
-        ),
-        Topic(
-            id="sns", 
-            name="SNS - Simple Notification Service", 
-            icon="📢",
-            description="Pub/sub messaging and mobile notifications"
-        ),
-        Topic(
-            id="sqs", 
-            name="SQS - Simple Queue Service", 
-            icon="📮",
-            description="Fully managed message queuing"
-        ),
-        Topic(
-            id="elb", 
-            name="ELB - Elastic Load Balancing", 
-            icon="⚖️",
-            description="Distribute traffic across targets"
-        ),
-    ]
+    Returns common AWS services covered in certifications, with the number
+    of corpus chunks tagged with each service at ingestion time.
+    """
+    topics = [topic.model_copy() for topic in STUDY_TOPICS]
+    
+    lease = generations.checkout()
+    if lease is not None:
+        with lease as engine:
+            for topic in topics:
+                topic.chunk_count = engine.service_index.chunk_count(topic.id)
     
     return {"topics": topics, "total": len(topics)}
 
@@ -387,11 +710,12 @@ async def get_session(session_id: str):
     - Topics covered
     - Activity timestamps
     """
-    if not study_partner:
+    engine = generations.current
+    if not engine:
         raise HTTPException(status_code=503, detail="Study partner not initialized")
     
     try:
-        session_info = study_partner.get_session_info(session_id)
+        session_info = engine.get_session_info(session_id)
         return session_info
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get session: {str(e)}")
@@ -404,11 +728,12 @@ async def clear_session(session_id: str):
     
     Use this to start fresh or clear sensitive information.
     """
-    if not study_partner:
+    engine = generations.current
+    if not engine:
         raise HTTPException(status_code=503, detail="Study partner not initialized")
     
     try:
-        study_partner.conversation_history.clear_session(session_id)
+        engine.conversation_history.clear_session(session_id)
         return {
             "message": "Session cleared successfully",
             "session_id": session_id
@@ -417,6 +742,50 @@ async def clear_session(session_id: str):
         raise HTTPException(status_code=500, detail=f"Failed to clear session: {str(e)}")
 
 
+@app.post("/api/ingest", response_model=IngestionJobStatus, status_code=202, tags=["Ingestion"])
+async def start_ingestion(files: List[UploadFile] = File(...)):
+    """
+    Upload PDFs and queue a background ingestion job.
+    
+    The job runs extract → chunk → embed → upsert on the ingestion worker
+    pool while the API keeps serving queries (with VECTOR_BACKEND=local,
+    "upsert" publishes a new local index generation). Once it completes the
+    engine is hot-reloaded onto the new content. Poll `/api/ingest/{job_id}`
+    for progress.
+    """
+    for upload in files:
+        if not upload.filename or not upload.filename.lower().endswith(".pdf"):
+            raise HTTPException(status_code=400, detail=f"Not a PDF: {upload.filename}")
+    
+    batch_dir = UPLOAD_DIR / uuid.uuid4().hex
+    batch_dir.mkdir(parents=True, exist_ok=True)
+    
+    paths = []
+    for upload in files:
+        path = batch_dir / Path(upload.filename).name
+        with open(path, "wb") as f:
+            while chunk := await upload.read(1024 * 1024):
+                f.write(chunk)
+        paths.append(str(path))
+    
+    job = ingestion_manager.submit(paths)
+    return IngestionJobStatus(**job.to_dict())
+
+
+@app.get("/api/ingest/{job_id}", response_model=IngestionJobStatus, tags=["Ingestion"])
+async def get_ingestion_job(job_id: str):
+    """
+    Get ingestion job progress.
+    
+    Reports the current stage, pages/sec during extraction and chunks/sec
+    during embedding and upsert.
+    """
+    job = ingestion_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Ingestion job {job_id} not found")
+    return IngestionJobStatus(**job.to_dict())
+
+
 @app.get("/api/stats", tags=["Statistics"])
 async def get_stats():
     """
@@ -424,23 +793,69 @@ async def get_stats():
     
     Returns information about active sessions and quizzes.
     """
-    if not study_partner:
+    lease = generations.checkout()
+    if lease is None:
         return {
             "study_partner_initialized": False,
             "active_sessions": 0,
-            "active_quizzes": 0
+            "active_quizzes": 0,
+            "admission": {name: controller.stats() for name, controller in admission.items()},
+            "flashcards": flashcards.stats(),
+            "ingestion": ingestion_manager.stats(),
+            "generations": generations.stats()
         }
     
-    active_sessions = len(study_partner.conversation_history.sessions)
+    with lease as study_partner:
+        active_sessions = len(study_partner.conversation_history.sessions)
+        
+        return {
+            "study_partner_initialized": True,
+            "active_sessions": active_sessions,
+            "active_quizzes": len(active_quizzes),
+            "total_quiz_questions": sum(
+                q.get("total_questions", 0) for q in active_quizzes.values()
+            ),
+            "index_partitions": study_partner.partitions.stats(),
+            "response_cache": (
+                study_partner.response_cache.stats(study_partner.index_version)
+                if study_partner.response_cache else None
+            ),
+            "http_pools": study_partner.clients.stats(),
+            "admission": {name: controller.stats() for name, controller in admission.items()},
+            "cancellations": cancellation_stats.stats(),
+            "flashcards": flashcards.stats(),
+            "ingestion": ingestion_manager.stats(),
+            "generations": generations.stats()
+        }
+
+
+@app.post("/api/admin/reload", status_code=202, tags=["Admin"])
+async def reload_engine(http_request: Request):
+    """
+    Hot-reload the index: build the next engine generation in the background.
     
-    return {
-        "study_partner_initialized": True,
-        "active_sessions": active_sessions,
-        "active_quizzes": len(active_quizzes),
-        "total_quiz_questions": sum(
-            q.get("total_questions", 0) for q in active_quizzes.values()
-        )
-    }
+    Reopens the local index at its live generation (see `vector_store.py
+    --local`) and reloads partitions, service index and question bank,
+    while the current generation keeps serving. New requests move to the
+    new generation once it is loaded; requests already running finish on
+    the old one, which is freed after the last of them. Poll
+    `/api/admin/reload` (GET) or `/health` for the result.
+    
+    Requires `X-Admin-Token` when ADMIN_TOKEN is set.
+    """
+    require_admin(http_request)
+    # The index may have changed out of band (e.g. vector_store.py uploads):
+    # answers cached against the current contents stop matching
+    bump_index_epoch(DATA_DIR / "processed")
+    started = generations.reload()
+    return {"started": started, **generations.stats()}
+
+
+@app.get("/api/admin/reload", tags=["Admin"])
+async def reload_status(http_request: Request):
+    """Generation being served, generations still draining and the last reload's outcome."""
+    require_admin(http_request)
+    return generations.stats()
 
 
 # ============================================================================
@@ -1,6 +1,40 @@
-"""Interactive command-line study interface."""
-from rag_engine import AWSStudyPartner
-import sys
+"""Interactive command-line study interface.
+
+The prompt comes up in well under a second: only the question bank and
+the service tagger are loaded at start. The answer engine (LangChain,
+OpenAI, Pinecone) is imported and built on a background thread while you
+type, over the memory-mapped local index at data/index when there is one.
+Answers stream in token by token, followed by the time to first token and
+the total latency.
+
+Retrieval-only commands need no network or API key:
+
+    quiz [topic]            practice questions from the question bank, graded locally
+    source [n | file#id]    full text of a source from the last answer, or of any chunk
+
+Usage (from backend/app):
+    python cli_study.py
+    python cli_study.py --offline
+    python cli_study.py --index ../data/index --mode binary
+"""
+import argparse
+import os
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from services.question_bank import QuestionBank, load_processed_chunks
+from services.service_tagger import ServiceTagger, chunk_key
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+PROCESSED_DIR = DATA_DIR / "processed"
+
+# Characters of a question's explanation shown after it is answered
+EXPLANATION_CHARS = 600
 
 
 def print_banner():
@@ -8,82 +42,279 @@ def print_banner():
     print("📚 AWS Certification Study Partner")
     print("="*60)
     print("\nCommands:")
-    print("  ask <question>      - Ask any AWS question")
-    print("  explain <concept>   - Get detailed explanation")
-    print("  compare <A> vs <B>  - Compare two services")
-    print("  quiz <topic>        - Get practice questions")
-    print("  help                - Show this help")
-    print("  quit                - Exit")
+    print("  ask <question>        - Ask any AWS question")
+    print("  explain <concept>     - Get detailed explanation")
+    print("  compare <A> vs <B>    - Compare two services")
+    print("  quiz [topic] [count]  - Practice questions (offline)")
+    print("  source [n | file#id]  - Show a source in full (offline)")
+    print("  help                  - Show this help")
+    print("  quit                  - Exit")
     print("="*60 + "\n")
 
 
+class StudySession:
+    """CLI state; everything beyond the question bank is loaded on first use."""
+
+    def __init__(self, index_path: Optional[Path], index_mode: str = "int8", offline: bool = False):
+        self.index_path = index_path
+        self.index_mode = index_mode
+        self.offline = offline
+        self.tagger = ServiceTagger()
+        self.question_bank = QuestionBank.from_processed(PROCESSED_DIR)
+        self.last_sources: List[Dict] = []
+
+        self._lock = threading.Lock()
+        self._index = None
+        self._chunks: Optional[Dict[str, Dict]] = None
+        self._question_services: Dict[str, set] = {}
+        self._engine = None
+        self._engine_error: Optional[Exception] = None
+        self._warmup: Optional[threading.Thread] = None
+
+    def local_index(self):
+        """The memory-mapped local index, or None when there isn't one."""
+        with self._lock:
+            from services.local_index import LocalVectorIndex, resolve_generation
+            if (self._index is None and self.index_path is not None
+                    and (resolve_generation(self.index_path) / "meta.json").exists()):
+                self._index = LocalVectorIndex(self.index_path, mode=self.index_mode)
+            return self._index
+
+    def warm_up(self):
+        """Import and build the engine in the background."""
+        if self.offline or self._warmup is not None:
+            return
+        self._warmup = threading.Thread(target=self._build_engine, daemon=True)
+        self._warmup.start()
+
+    def _build_engine(self):
+        try:
+            from rag_engine import EnhancedAWSStudyPartner
+            self._engine = EnhancedAWSStudyPartner(local_index=self.local_index())
+        except Exception as e:
+            self._engine_error = e
+
+    def engine(self):
+        """The answer engine, waiting for the warm-up if it is still running."""
+        if self.offline:
+            raise RuntimeError("running offline; only quiz and source are available")
+        self.warm_up()
+        if self._warmup.is_alive():
+            print("⏳ Loading the answer engine...")
+            self._warmup.join()
+        if self._engine is None:
+            raise RuntimeError(f"answer engine unavailable: {self._engine_error}")
+        return self._engine
+
+    def chunks(self) -> Dict[str, Dict]:
+        """Every chunk by "<filename>#<chunk_id>": processed chunks, then local index records."""
+        if self._chunks is None:
+            chunks = {
+                chunk_key(chunk["metadata"], chunk["chunk_id"]): chunk
+                for chunk in load_processed_chunks(PROCESSED_DIR)
+            }
+            index = self.local_index()
+            for record in index.records if index is not None else []:
+                metadata = record.get("metadata", {})
+                chunks.setdefault(
+                    chunk_key(metadata, metadata.get("chunk_id", -1)),
+                    {"text": record["text"], "chunk_id": metadata.get("chunk_id", -1), "metadata": metadata}
+                )
+            self._chunks = chunks
+        return self._chunks
+
+    def find_source(self, source: Dict) -> Optional[Dict]:
+        """The full chunk behind a (truncated) source of an answer."""
+        prefix = source["text"][:-3] if source["text"].endswith("...") else source["text"]
+        for chunk in self.chunks().values():
+            if chunk["chunk_id"] == source["chunk_id"] and chunk["text"].startswith(prefix):
+                return chunk
+        return None
+
+    def questions_about(self, topic: Optional[str]) -> List[Dict]:
+        """Distinct parsed questions, narrowed to those tagged with the topic's services."""
+        questions, seen = [], set()
+        for question in self.question_bank.questions:
+            # The same question can appear in several exports
+            if question["question"].lower() not in seen:
+                seen.add(question["question"].lower())
+                questions.append(question)
+        if not topic:
+            return questions
+
+        services = set(self.tagger.resolve(topic))
+        if not services:
+            topic = topic.lower()
+            return [q for q in questions if topic in q["question"].lower()]
+        for question in questions:
+            if question["id"] not in self._question_services:
+                self._question_services[question["id"]] = set(
+                    self.tagger.tag(" ".join([question["question"], *question["options"]]))
+                )
+        return [q for q in questions if self._question_services[q["id"]] & services]
+
+
+def stream_answer(ask) -> Dict:
+    """
+    Run ask(on_token), printing the answer as it streams in, then the
+    latency: time to first token and total.
+    """
+    start = time.perf_counter()
+    first_token = []
+
+    def on_token(text: str):
+        if not first_token:
+            first_token.append(time.perf_counter() - start)
+            print("💡 ", end="")
+        print(text, end="", flush=True)
+
+    result = ask(on_token)
+    total = time.perf_counter() - start
+    ttft = f"{first_token[0]:.2f}s" if first_token else "n/a"
+    print(f"\n\n⏱️  first token {ttft} · total {total:.2f}s · {result.get('num_sources', 0)} sources\n")
+    return result
+
+
+def run_quiz(session: StudySession, topic: Optional[str], count: int):
+    from services.grading import AnswerKey, LETTERS, normalize_answer
+
+    questions = session.questions_about(topic)
+    if not questions:
+        print(f"No practice questions found for '{topic}'.\n")
+        return
+    questions = random.sample(questions, min(count, len(questions)))
+    key = AnswerKey([
+        {"question_id": q["id"], "options": q["options"], "answer": q["answer"], "explanation": q["explanation"]}
+        for q in questions
+    ])
+
+    print(f"\n📝 {len(questions)} question(s) on {topic or 'General AWS'} (Enter to skip)\n")
+    answers = {}
+    for i, question in enumerate(questions):
+        print(f"Question {i + 1}: {question['question']}")
+        for letter, option in zip(LETTERS, question["options"]):
+            print(f"  {letter}. {option}")
+        answers[question["id"]] = input("Your answer: ").strip()
+
+        correct = key.resolve(i, normalize_answer(answers[question["id"]])) == int(key.masks[i])
+        print(f"{'✅ Correct' if correct else '❌ Incorrect'}: {key.label(i, int(key.masks[i]))}")
+        explanation = question["explanation"]
+        if explanation:
+            if len(explanation) > EXPLANATION_CHARS:
+                explanation = explanation[:EXPLANATION_CHARS].rsplit(" ", 1)[0] + "..."
+            print(f"\n{explanation}")
+        print(f"📚 {question['source']}\n" + "-" * 60 + "\n")
+
+    result = key.grade([answers])
+    print(f"🎯 Score: {int(result['correct_counts'][0])}/{result['graded_questions']} "
+          f"({result['scores'][0]:.0f}%)\n")
+
+
+def show_source(session: StudySession, argument: Optional[str]):
+    if not argument:
+        if not session.last_sources:
+            print("No sources yet; ask a question first, or use source <file>#<chunk_id>.\n")
+        for i, source in enumerate(session.last_sources, 1):
+            print(f"  {i}. [{source['doc_type']}] chunk {source['chunk_id']}: {source['text'][:80]}")
+        print()
+        return
+
+    if argument.isdigit():
+        position = int(argument) - 1
+        if not 0 <= position < len(session.last_sources):
+            print(f"The last answer has {len(session.last_sources)} source(s).\n")
+            return
+        chunk = session.find_source(session.last_sources[position])
+    else:
+        chunk = session.chunks().get(argument)
+    if chunk is None:
+        print(f"Source '{argument}' not found.\n")
+        return
+    print(f"\n📄 {chunk_key(chunk['metadata'], chunk['chunk_id'])} ({chunk['metadata'].get('doc_type', 'unknown')})\n")
+    print(f"{chunk['text']}\n")
+
+
+def handle(session: StudySession, user_input: str) -> bool:
+    """Run one command; False when the user quits."""
+    parts = user_input.split(maxsplit=1)
+    command = parts[0].lower()
+    argument = parts[1].strip() if len(parts) > 1 else None
+
+    if command in ["quit", "exit", "q"]:
+        print("\n👋 Happy studying! Good luck on your exam!")
+        return False
+
+    if command == "help":
+        print_banner()
+
+    elif command == "quiz":
+        count = 3
+        if argument and argument.split()[-1].isdigit():
+            *words, number = argument.split()
+            argument, count = " ".join(words) or None, int(number)
+        run_quiz(session, argument, count)
+
+    elif command == "source":
+        show_source(session, argument)
+
+    elif command == "explain" and argument:
+        engine = session.engine()
+        print(f"\n📖 Explaining {argument}...\n")
+        result = stream_answer(lambda on_token: engine.explain_concept(argument, on_token=on_token))
+        session.last_sources = result["sources"]
+
+    elif command == "compare" and argument:
+        # "X vs Y" or "X and Y"
+        services = argument.replace(" vs ", " ").replace(" and ", " ").split()
+        if len(services) < 2:
+            print("Usage: compare <service1> vs <service2>\n")
+            return True
+        engine = session.engine()
+        print(f"\n⚖️  Comparing...\n")
+        result = stream_answer(
+            lambda on_token: engine.compare_services(services[0], services[1], on_token=on_token)
+        )
+        session.last_sources = result["sources"]
+
+    else:
+        # "ask <question>", or anything else is treated as a question
+        question = argument if command == "ask" and argument else user_input
+        engine = session.engine()
+        print()
+        result = stream_answer(lambda on_token: engine.query(question, session_id="cli", on_token=on_token))
+        session.last_sources = result["sources"]
+    return True
+
+
 def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--index", type=Path,
+                        default=Path(os.getenv("LOCAL_INDEX_PATH", str(DATA_DIR / "index"))),
+                        help="Local index directory (built with `vector_store.py --local`)")
+    parser.add_argument("--mode", default=os.getenv("LOCAL_INDEX_MODE", "int8"),
+                        choices=["float32", "int8", "binary"], help="Local index search mode")
+    parser.add_argument("--offline", action="store_true", help="Never load the answer engine")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    load_dotenv()
+    offline = args.offline
+    if not offline and not os.getenv("OPENAI_API_KEY"):
+        print("⚠️  OPENAI_API_KEY is not set; running offline")
+        offline = True
+
     print_banner()
-    
-    # Initialize study partner
-    print("Initializing study partner...")
-    partner = AWSStudyPartner()
-    print("✅ Ready!\n")
-    
+    session = StudySession(args.index, args.mode, offline=offline)
+    session.warm_up()
+    print(f"✅ Ready in {time.perf_counter() - start:.2f}s "
+          f"({len(session.question_bank)} practice questions{', offline' if offline else ''})\n")
+
     while True:
         try:
-            # Get user input
             user_input = input("You: ").strip()
-            
-            if not user_input:
-                continue
-            
-            # Parse command
-            parts = user_input.lower().split(maxsplit=1)
-            command = parts[0]
-            
-            if command in ["quit", "exit", "q"]:
-                print("\n👋 Happy studying! Good luck on your exam!")
+            if user_input and not handle(session, user_input):
                 break
-            
-            elif command == "help":
-                print_banner()
-            
-            elif command == "ask" and len(parts) > 1:
-                question = parts[1]
-                print("\n🤔 Thinking...\n")
-                result = partner.query(question)
-                print(f"💡 Answer:\n{result['answer']}\n")
-                print(f"📚 (Based on {result['num_sources']} sources)\n")
-            
-            elif command == "explain" and len(parts) > 1:
-                concept = parts[1]
-                print(f"\n📖 Explaining {concept}...\n")
-                result = partner.explain_concept(concept)
-                print(f"{result['answer']}\n")
-            
-            elif command == "compare" and len(parts) > 1:
-                # Parse "X vs Y" or "X and Y"
-                comparison = parts[1].replace(" vs ", " ").replace(" and ", " ")
-                services = comparison.split()
-                if len(services) >= 2:
-                    print(f"\n⚖️  Comparing...\n")
-                    result = partner.compare_services(services[0], services[1])
-                    print(f"{result['answer']}\n")
-                else:
-                    print("Usage: compare <service1> vs <service2>\n")
-            
-            elif command == "quiz":
-                topic = parts[1] if len(parts) > 1 else None
-                print(f"\n📝 Fetching practice questions...\n")
-                result = partner.practice_quiz(topic, num_questions=3)
-                print(f"Topic: {result['topic']}\n")
-                for i, q in enumerate(result['questions'], 1):
-                    print(f"Question {i}:\n{q['content']}\n")
-                    print("-" * 60 + "\n")
-            
-            else:
-                # Default: treat as a question
-                print("\n🤔 Thinking...\n")
-                result = partner.query(user_input)
-                print(f"💡 Answer:\n{result['answer']}\n")
-        
-        except KeyboardInterrupt:
+        except (KeyboardInterrupt, EOFError):
             print("\n\n👋 Happy studying!")
             break
         except Exception as e:
@@ -91,4 +322,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
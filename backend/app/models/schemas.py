@@ -1,6 +1,6 @@
 """Pydantic models for request/response validation."""
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict
+from typing import List, Literal, Optional, Dict, Union
 from enum import Enum
 
 
@@ -13,18 +13,38 @@ class StudyMode(str, Enum):
     FLASHCARD = "flashcard"
 
 
+# Sources returned with an answer: none, ids only, 300-character excerpts
+# (default; also what true means) or full chunk text
+SourceLevel = Union[bool, Literal["none", "ids", "excerpts", "full"]]
+
+
 class QueryRequest(BaseModel):
     """Request model for general queries."""
     question: str = Field(..., min_length=3, max_length=1000)
     session_id: Optional[str] = None
     top_k: int = Field(default=5, ge=1, le=10)
-    include_sources: bool = True
+    include_sources: SourceLevel = True
+    services: Optional[List[str]] = None  # e.g., ["s3", "cloudfront"] to narrow retrieval
+    certification: Optional[str] = None  # e.g., "saa", "mla" to search one certification
+    timeout_ms: Optional[int] = Field(default=None, ge=100, le=300000)  # or X-Request-Timeout-Ms header
+
+
+class BatchQueryRequest(BaseModel):
+    """Request model for answering a list of questions in one call."""
+    questions: List[str] = Field(..., min_length=1, max_length=200)
+    top_k: int = Field(default=5, ge=1, le=10)
+    max_concurrency: int = Field(default=8, ge=1, le=16)
+    include_sources: SourceLevel = True
+    services: Optional[List[str]] = None
+    certification: Optional[str] = None
+    timeout_ms: Optional[int] = Field(default=None, ge=100, le=300000)  # or X-Request-Timeout-Ms header
 
 
 class Source(BaseModel):
-    """Source document information."""
-    text: str
-    source: str
+    """Source document information (text and source are left out at the "ids" level)."""
+    id: Optional[str] = None  # "<filename>#<chunk_id>"
+    text: Optional[str] = None
+    source: Optional[str] = None
     doc_type: str
     chunk_id: int
     relevance_score: Optional[float] = None
@@ -40,10 +60,20 @@ class QueryResponse(BaseModel):
     processing_time_ms: Optional[float] = None
 
 
+class BatchQueryItem(BaseModel):
+    """One streamed line of a batch query response."""
+    index: int
+    status: str  # "ok" or "error"
+    result: Optional[QueryResponse] = None
+    error: Optional[str] = None
+
+
 class ExplainRequest(BaseModel):
     """Request for concept explanation."""
     concept: str = Field(..., min_length=2, max_length=200)
     detail_level: str = Field(default="medium", pattern="^(brief|medium|detailed)$")
+    include_sources: SourceLevel = True
+    timeout_ms: Optional[int] = Field(default=None, ge=100, le=300000)  # or X-Request-Timeout-Ms header
 
 
 class CompareRequest(BaseModel):
@@ -51,6 +81,8 @@ class CompareRequest(BaseModel):
     service1: str = Field(..., min_length=2, max_length=100)
     service2: str = Field(..., min_length=2, max_length=100)
     aspects: Optional[List[str]] = None  # e.g., ["pricing", "performance", "use_cases"]
+    include_sources: SourceLevel = True
+    timeout_ms: Optional[int] = Field(default=None, ge=100, le=300000)  # or X-Request-Timeout-Ms header
 
 
 class QuizQuestion(BaseModel):
@@ -69,6 +101,8 @@ class QuizRequest(BaseModel):
     topic: Optional[str] = None
     num_questions: int = Field(default=5, ge=1, le=20)
     difficulty: Optional[str] = Field(default=None, pattern="^(easy|medium|hard)?$")
+    certification: Optional[str] = None
+    timeout_ms: Optional[int] = Field(default=None, ge=100, le=300000)  # or X-Request-Timeout-Ms header
 
 
 class QuizResponse(BaseModel):
@@ -93,6 +127,98 @@ class QuizResult(BaseModel):
     correct_answers: int
     results: List[Dict]
     passed: bool
+    graded_questions: Optional[int] = None  # Questions with an answer key
+
+
+class StudentSubmission(BaseModel):
+    """One student's answers within a bulk submission."""
+    student_id: Optional[str] = None
+    answers: Dict[str, str]  # question_id: answer (letter, number or option text)
+
+
+class BulkQuizSubmission(BaseModel):
+    """A whole class's answers to one quiz."""
+    quiz_id: str
+    submissions: List[StudentSubmission] = Field(..., min_length=1, max_length=20000)
+    top_wrong_answers: int = Field(default=3, ge=0, le=10)
+
+
+class StudentScore(BaseModel):
+    """Score of one submission in a bulk grading run."""
+    student_id: Optional[str] = None
+    score: float
+    correct_answers: int
+    passed: bool
+    # Answers for questions not in the quiz (ignored) and option labels past the last option (graded wrong)
+    unknown_question_ids: List[str] = []
+    out_of_range_answers: List[str] = []
+
+
+class QuestionStats(BaseModel):
+    """How a class did on one question."""
+    question_id: str
+    graded: bool
+    correct_answer: Optional[str] = None
+    percent_correct: float
+    blank: int
+    common_wrong_answers: List[Dict]  # {"answer", "recognised", "count"}
+
+
+class BulkQuizResult(BaseModel):
+    """Bulk grading results with a per-question rollup."""
+    quiz_id: str
+    submissions: int
+    graded_questions: int
+    average_score: float
+    pass_rate: float
+    results: List[StudentScore]
+    question_stats: List[QuestionStats]
+    grading_ms: float
+
+
+class Flashcard(BaseModel):
+    """A card with the user's current schedule for it."""
+    card_id: str
+    front: str
+    options: Optional[List[str]] = None
+    back: str
+    explanation: str = ""
+    source: str
+    is_new: bool
+    ease: float
+    interval_days: float
+    repetitions: int
+    lapses: int
+    due: float  # Unix time; 0 for a card never reviewed
+
+
+class FlashcardNextResponse(BaseModel):
+    """The card to study next; card is None when nothing is due."""
+    user_id: str
+    card: Optional[Flashcard] = None
+    next_due: Optional[float] = None  # Earliest due time among reviewed cards
+    reviewed_cards: int
+    new_remaining: int
+
+
+class FlashcardReviewRequest(BaseModel):
+    """How well the user recalled a card: a rating, or an SM-2 quality 0-5."""
+    user_id: str = Field(..., min_length=1, max_length=128)
+    card_id: str
+    rating: Optional[str] = Field(default=None, pattern="^(again|hard|good|easy)$")
+    quality: Optional[int] = Field(default=None, ge=0, le=5)
+
+
+class FlashcardReviewResponse(BaseModel):
+    """The card's new schedule after a review."""
+    user_id: str
+    card_id: str
+    ease: float
+    interval_days: float
+    repetitions: int
+    lapses: int
+    due: float
+    last_review: Optional[float] = None
 
 
 class Topic(BaseModel):
@@ -101,6 +227,7 @@ class Topic(BaseModel):
     name: str
     icon: str
     description: Optional[str] = None
+    chunk_count: Optional[int] = None  # Chunks tagged with this service in the corpus
 
 
 class StudySession(BaseModel):
@@ -112,10 +239,37 @@ class StudySession(BaseModel):
     topics_covered: List[str]
 
 
+class IngestionJobStatus(BaseModel):
+    """Progress of a background ingestion job."""
+    job_id: str
+    stage: str  # queued, extracting, chunking, deduplicating, embedding, indexing, completed, failed
+    files: List[str]
+    current_file: Optional[str] = None
+    files_done: int
+    pages_done: int
+    pages_total: int
+    chunks_total: int
+    chunks_uploaded: int
+    chunks_collapsed: int = 0
+    pages_per_sec: float
+    chunks_per_sec: float
+    elapsed_sec: float
+    created_at: float
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+    # Set when the job completed but serving it (the engine reload) failed
+    reload_error: Optional[str] = None
+
+
 class HealthResponse(BaseModel):
     """Health check response."""
     status: str
     study_partner_initialized: bool
     pinecone_index: str
     embedding_model: str
+    embedding_dimension: Optional[int] = None
+    generation: Optional[int] = None  # engine generation, +1 per hot reload
+    index_version: Optional[str] = None
+    index_generation: Optional[str] = None  # local index build (gen-NNNN)
+    reloading: bool = False
     version: str
\ No newline at end of file
@@ -1,43 +1,117 @@
 import os
 from pathlib import Path
-from typing import List, Dict
-import pdfplumber
+from typing import Callable, List, Dict, Optional
 import json
 from langchain_text_splitters import RecursiveCharacterTextSplitter  # ← CORRECTED
 from dotenv import load_dotenv
+from services.dedup import collapse_duplicates, dedup_enabled, print_report
+from services.service_tagger import ServiceTagger, ServiceIndex
+from services.partitions import infer_certification, infer_doc_type
+from services.pdf_extractors import EXTRACTORS, get_extractor
+from services.token_chunker import TokenChunker
+from services.tracing import NOOP_SPAN, span
 
 load_dotenv()
 
+# Pages per child span of an extraction trace
+TRACE_PAGE_BATCH = 50
+
 class PDFProcessor:
-    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
+    def __init__(
+        self, 
+        chunk_size: int = 1000, 
+        chunk_overlap: int = 200,
+        chunker: Optional[str] = None,
+        chunk_tokens: int = 256,
+        overlap_tokens: int = 32,
+        extractor: Optional[str] = None
+    ):
+        """
+        Args:
+            chunk_size: Characters per chunk for the "recursive" chunker
+            chunk_overlap: Character overlap for the "recursive" chunker
+            chunker: "recursive" (default) or "token"; falls back to $CHUNKER.
+                The chunkers cut different boundaries and chunk_ids, so
+                switching one corpus over invalidates golden-set refs and
+                means re-ingesting every file
+            chunk_tokens: Tokens per chunk for the "token" chunker
+            overlap_tokens: Token overlap for the "token" chunker
+            extractor: "auto" (default), "pypdf" or "pdfplumber"; falls back
+                to $PDF_EXTRACTOR (see services.pdf_extractors)
+        """
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        self.chunker = chunker or os.getenv("CHUNKER", "recursive")
+        if self.chunker not in ("recursive", "token"):
+            raise ValueError(f"Unknown chunker '{self.chunker}', expected 'recursive' or 'token'")
+        self.chunk_tokens = chunk_tokens
+        self.overlap_tokens = overlap_tokens
+        self._token_chunker = None
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=chunk_size,
             chunk_overlap=chunk_overlap,
             separators=["\n\n", "\n", ". ", " ", ""],
             length_function=len,
         )
+        self.service_tagger = ServiceTagger()
+        self.extractor = get_extractor(extractor)
     
-    def extract_text_from_pdf(self, pdf_path: str) -> str:
-        """Extract text from a PDF file."""
-        print(f"Extracting text from {pdf_path}...")
-        text = ""
+    @property
+    def token_chunker(self) -> TokenChunker:
+        """Built on first use, so the recursive path never loads a tokenizer."""
+        if self._token_chunker is None:
+            self._token_chunker = TokenChunker(chunk_tokens=self.chunk_tokens, overlap_tokens=self.overlap_tokens)
+        return self._token_chunker
+    
+    def extract_pages(
+        self, 
+        pdf_path: str, 
+        progress: Optional[Callable[[int, int], None]] = None
+    ) -> List[str]:
+        """
+        Extract text from a PDF file, one string per page.
         
-        with pdfplumber.open(pdf_path) as pdf:
-            total_pages = len(pdf.pages)
-            print(f"Total pages to process: {total_pages}")
-            
-            for i, page in enumerate(pdf.pages):
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n\n"
-                
-                if (i + 1) % 100 == 0:
-                    print(f"Processed {i + 1}/{total_pages} pages...")
+        Args:
+            pdf_path: Path to the PDF
+            progress: Optional callback(pages_done, total_pages) run per page
+        """
+        print(f"Extracting text from {pdf_path} ({self.extractor.name})...")
+        fallback_before = self.extractor.pages_fallback
         
-        print(f"Extraction complete. Total characters: {len(text)}")
-        return text
+        with span("extract", file=Path(pdf_path).name, extractor=self.extractor.name) as trace:
+            # One child span per TRACE_PAGE_BATCH pages shows where a slow document stalls
+            batch = [span("extract.pages", first_page=1)]
+            
+            def on_page(done: int, total: int):
+                if progress:
+                    progress(done, total)
+                if done % 100 == 0:
+                    print(f"Processed {done}/{total} pages...")
+                if trace.recording and (done % TRACE_PAGE_BATCH == 0 or done == total):
+                    batch[0].set(last_page=done).end()
+                    batch[0] = span("extract.pages", first_page=done + 1) if done < total else NOOP_SPAN
+            
+            try:
+                pages = self.extractor.extract(pdf_path, on_page)
+            finally:
+                # Still open when extraction failed or stopped reporting pages early
+                batch[0].end()
+            
+            fallback = self.extractor.pages_fallback - fallback_before
+            characters = sum(len(p) for p in pages)
+            trace.set(pages=len(pages), chars=characters, fallback_pages=fallback)
+        print(f"Extraction complete. Pages: {len(pages)}, total characters: "
+              f"{characters}" + (f", {fallback} via pdfplumber fallback" if fallback else ""))
+        return pages
+    
+    def extract_text_from_pdf(
+        self, 
+        pdf_path: str, 
+        progress: Optional[Callable[[int, int], None]] = None
+    ) -> str:
+        """Extract text from a PDF file."""
+        pages = self.extract_pages(pdf_path, progress)
+        return "".join(page + "\n\n" for page in pages if page)
     
     def chunk_text(self, text: str, metadata: Dict = None) -> List[Dict]:
         """Split text into chunks with metadata."""
@@ -47,39 +121,101 @@ class PDFProcessor:
         
         chunked_docs = []
         for i, chunk in enumerate(chunks):
+            # Tag once at ingestion so queries never rescan chunk text
             doc = {
                 "text": chunk,
                 "chunk_id": i,
-                "metadata": metadata or {}
+                "metadata": {
+                    **(metadata or {}),
+                    "services": self.service_tagger.tag(chunk)
+                }
             }
             chunked_docs.append(doc)
         
         print(f"Created {len(chunked_docs)} chunks")
         return chunked_docs
     
-    def process_main_guide(self, pdf_path: str) -> List[Dict]:
+    def chunk_pages(self, pages: List[str], metadata: Dict = None) -> List[Dict]:
+        """Split pages into token-sized chunks with page spans and metadata."""
+        print(f"Chunking text into {self.token_chunker.chunk_tokens} token chunks...")
+        
+        chunks = self.token_chunker.chunk_pages(pages)
+        
+        chunked_docs = []
+        for i, chunk in enumerate(chunks):
+            doc = {
+                "text": chunk["text"],
+                "chunk_id": i,
+                "metadata": {
+                    **(metadata or {}),
+                    "services": self.service_tagger.tag(chunk["text"]),
+                    "token_count": chunk["token_count"],
+                    "page_start": chunk["page_start"],
+                    "page_end": chunk["page_end"],
+                    "heading": chunk["heading"] or ""
+                }
+            }
+            chunked_docs.append(doc)
+        
+        print(f"Created {len(chunked_docs)} chunks")
+        return chunked_docs
+    
+    def chunk_document(self, pages: List[str], metadata: Dict = None) -> List[Dict]:
+        """Chunk extracted pages with the configured chunker."""
+        with span("chunk", chunker=self.chunker) as trace:
+            if self.chunker == "recursive":
+                chunks = self.chunk_text("".join(page + "\n\n" for page in pages if page), metadata)
+            else:
+                chunks = self.chunk_pages(pages, metadata)
+            trace.set(chunks=len(chunks))
+            if trace.recording and self.chunker != "recursive":
+                trace.set(tokens=sum(chunk["metadata"]["token_count"] for chunk in chunks))
+            return chunks
+    
+    def process_main_guide(
+        self, 
+        pdf_path: str, 
+        progress: Optional[Callable[[int, int], None]] = None
+    ) -> List[Dict]:
         """Process the main AWS certification guide."""
-        text = self.extract_text_from_pdf(pdf_path)
+        pages = self.extract_pages(pdf_path, progress)
         
         metadata = {
             "source": "aws_certification_guide",
             "doc_type": "study_guide",
-            "filename": Path(pdf_path).name
+            "filename": Path(pdf_path).name,
+            "certification": infer_certification(Path(pdf_path).name)
         }
         
-        return self.chunk_text(text, metadata)
+        return self.chunk_document(pages, metadata)
     
-    def process_practice_test(self, pdf_path: str) -> List[Dict]:
+    def process_practice_test(
+        self, 
+        pdf_path: str, 
+        progress: Optional[Callable[[int, int], None]] = None
+    ) -> List[Dict]:
         """Process practice test PDFs."""
-        text = self.extract_text_from_pdf(pdf_path)
+        pages = self.extract_pages(pdf_path, progress)
         
         metadata = {
             "source": "practice_test",
             "doc_type": "questions",
-            "filename": Path(pdf_path).name
+            "filename": Path(pdf_path).name,
+            "certification": infer_certification(Path(pdf_path).name)
         }
         
-        return self.chunk_text(text, metadata)
+        return self.chunk_document(pages, metadata)
+    
+    def process_pdf(
+        self, 
+        pdf_path: str, 
+        progress: Optional[Callable[[int, int], None]] = None
+    ) -> List[Dict]:
+        """Process a PDF, choosing practice test or study guide handling by filename."""
+        with span("ingest.file", file=Path(pdf_path).name):
+            if infer_doc_type(Path(pdf_path).name) == "questions":
+                return self.process_practice_test(pdf_path, progress)
+            return self.process_main_guide(pdf_path, progress)
     
     def save_chunks(self, chunks: List[Dict], output_path: str):
         """Save chunks to JSON file."""
@@ -90,7 +226,14 @@ class PDFProcessor:
 
 def main():
     """Process all PDFs in the raw data directory."""
-    processor = PDFProcessor(chunk_size=1000, chunk_overlap=200)
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Extract and chunk the PDFs in data/raw")
+    parser.add_argument("--extractor", choices=EXTRACTORS, help="PDF text extraction backend")
+    parser.add_argument("--no-dedup", action="store_true", help="Keep near-duplicate chunks")
+    args = parser.parse_args()
+    
+    processor = PDFProcessor(chunk_size=1000, chunk_overlap=200, extractor=args.extractor)
     
     raw_data_dir = Path("data/raw")
     processed_dir = Path("data/processed")
@@ -115,10 +258,7 @@ def main():
         
         try:
             # Determine document type and process accordingly
-            if "practice" in pdf_file.name.lower() or "test" in pdf_file.name.lower():
-                chunks = processor.process_practice_test(str(pdf_file))
-            else:
-                chunks = processor.process_main_guide(str(pdf_file))
+            chunks = processor.process_pdf(str(pdf_file))
             
             all_chunks.extend(chunks)
             
@@ -132,9 +272,19 @@ def main():
     
     # Save all chunks together
     if all_chunks:
+        # Collapse repeated passages before anything is embedded
+        if dedup_enabled() and not args.no_dedup:
+            all_chunks, report = collapse_duplicates(all_chunks)
+            print_report(report)
+        
         all_chunks_file = processed_dir / "all_chunks.json"
         processor.save_chunks(all_chunks, str(all_chunks_file))
         
+        # Build service -> chunk inverted index
+        service_index = ServiceIndex()
+        service_index.add_chunks(all_chunks)
+        service_index.save(str(processed_dir / "service_index.json"))
+        
         print(f"\n{'='*60}")
         print(f"✅ Processing complete!")
         print(f"Total chunks created: {len(all_chunks)}")
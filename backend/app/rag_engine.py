@@ -1,71 +1,310 @@
 """Enhanced RAG Query Engine with conversation history and streaming."""
+import contextvars
+import copy
+import hashlib
+import json
 import os
+import threading
 import time
 import uuid
-from typing import List, Dict, Optional
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, List, Dict, Iterator, Optional
 from dotenv import load_dotenv
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain_pinecone import Pinecone as PineconeVectorStore
+from langchain_core.documents import Document
+
+from services.service_tagger import ServiceTagger, ServiceIndex, chunk_key
+from services.partitions import PartitionRouter
+from services.question_bank import QuestionBank
+from services.local_index import LocalVectorIndex
+from services.deadlines import Deadline, checkpoint, current_deadline, deadline_scope
+from services.rate_governor import BATCH, request_priority
+from services.response_cache import ResponseCache, open_response_cache, read_index_epoch
+from services.tracing import current_span, span
+from utils.clients import get_clients
+from utils.embedding_config import check_index_dimension, embedding_dimension, embedding_model
+from utils.tokens import count_tokens, truncate_to_tokens
 
 load_dotenv()
 
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+PROCESSED_DIR = DATA_DIR / "processed"
+
 
 class ConversationHistory:
-    """Manages conversation history for a session."""
+    """
+    Manages conversation history for a session.
+    
+    The last `recent_turns` turns are kept verbatim. With a summarizer,
+    turns that fall out of that window are folded into a rolling
+    per-session summary on a background pool, so long sessions keep their
+    context while the history part of the prompt stays within
+    `token_budget` tokens.
+    """
     
-    def __init__(self, max_history: int = 5):
+    def __init__(
+        self,
+        max_history: int = 5,
+        recent_turns: int = 3,
+        token_budget: int = 600,
+        summarizer: Optional[Callable[[str, List[Dict]], str]] = None
+    ):
         self.sessions = {}
-        self.max_history = max_history
+        self.topic_counts = {}
+        self.turn_counts = Counter()
+        self.max_history = max(max_history, recent_turns)
+        self.recent_turns = recent_turns
+        self.token_budget = token_budget
+        
+        # Rolling summary state: session -> summary text, and turns that left
+        # the recent window but haven't been folded into it yet
+        self.summarizer = summarizer
+        self.summaries = {}
+        self.pending = {}
+        self._summarizing = set()
+        # Sessions whose last summary update failed (logged once per streak)
+        self._summary_failing = set()
+        self._lock = threading.Lock()
+        self._summary_pool = ThreadPoolExecutor(max_workers=2) if summarizer else None
     
-    def add_message(self, session_id: str, question: str, answer: str):
+    def add_message(
+        self, 
+        session_id: str, 
+        question: str, 
+        answer: str, 
+        topics: Optional[List[str]] = None
+    ):
         """Add Q&A to session history."""
-        if session_id not in self.sessions:
-            self.sessions[session_id] = []
+        with self._lock:
+            if session_id not in self.sessions:
+                self.sessions[session_id] = []
+                self.topic_counts[session_id] = Counter()
+            
+            # Topic counts cover the whole session, not just the retained window
+            if topics:
+                self.topic_counts[session_id].update(topics)
+            self.turn_counts[session_id] += 1
+            
+            turns = self.sessions[session_id]
+            turns.append({
+                "question": question,
+                "answer": answer,
+                "timestamp": time.time()
+            })
+            
+            # The turn that just left the verbatim window goes to the summarizer
+            if self.summarizer and len(turns) > self.recent_turns:
+                self.pending.setdefault(session_id, []).append(turns[-self.recent_turns - 1])
+            
+            # Keep only recent history
+            if len(turns) > self.max_history:
+                self.sessions[session_id] = turns[-self.max_history:]
         
-        self.sessions[session_id].append({
-            "question": question,
-            "answer": answer,
-            "timestamp": time.time()
-        })
+        if self.summarizer:
+            self._schedule_summary(session_id)
+    
+    def _schedule_summary(self, session_id: str):
+        """Start a background summary update unless one is already running."""
+        with self._lock:
+            if session_id in self._summarizing or not self.pending.get(session_id):
+                return
+            self._summarizing.add(session_id)
+        self._summary_pool.submit(self._update_summary, session_id)
+    
+    def _update_summary(self, session_id: str):
+        """Fold pending turns into the session summary until none are left."""
+        try:
+            while True:
+                with self._lock:
+                    batch = self.pending.pop(session_id, [])
+                    previous = self.summaries.get(session_id, "")
+                if not batch:
+                    return
+                
+                try:
+                    summary = self.summarizer(previous, batch)
+                except Exception as e:
+                    # Put the turns back for the next add_message to retry,
+                    # but no more of them than the history budget can show
+                    with self._lock:
+                        if session_id not in self.sessions:
+                            return
+                        self.pending[session_id] = batch + self.pending.get(session_id, [])
+                        self._trim_pending(session_id)
+                        first_failure = session_id not in self._summary_failing
+                        self._summary_failing.add(session_id)
+                    if first_failure:
+                        print(f"⚠️  Summary update failed for session {session_id}: {e}; "
+                              f"retrying on later turns, keeping at most {self.token_budget} tokens of them")
+                    return
+                
+                with self._lock:
+                    # The session may have been cleared meanwhile
+                    if session_id in self.sessions:
+                        self.summaries[session_id] = summary.strip()
+                        self._summary_failing.discard(session_id)
+        finally:
+            with self._lock:
+                self._summarizing.discard(session_id)
+    
+    def _trim_pending(self, session_id: str) -> int:
+        """
+        Drop the oldest pending turns beyond token_budget (the most
+        build_context could ever show); returns how many were dropped.
+        Called with the lock held.
+        """
+        turns = self.pending.get(session_id, [])
+        budget = self.token_budget
+        keep = 0
+        for entry in reversed(turns):
+            budget -= count_tokens(entry["question"]) + count_tokens(entry["answer"])
+            if budget < 0 and keep:
+                break
+            keep += 1
+        dropped = len(turns) - keep
+        if dropped:
+            self.pending[session_id] = turns[dropped:]
+        return dropped
+    
+    def build_context(self, session_id: str) -> str:
+        """
+        History section of the prompt, within token_budget tokens.
+        
+        Holds the rolling summary (at most a third of the budget), then as
+        many turns as fit, newest first. Turns still waiting to be
+        summarized are included verbatim so nothing goes missing while an
+        update is in flight.
+        """
+        with self._lock:
+            summary = self.summaries.get(session_id, "")
+            turns = list(self.pending.get(session_id, []))
+            turns += self.sessions.get(session_id, [])[-self.recent_turns:]
+        if not summary and not turns:
+            return ""
+        
+        budget = self.token_budget
+        parts = []
+        if summary:
+            summary = truncate_to_tokens(summary, budget // 3)
+            parts.append(f"Summary of earlier conversation: {summary}")
+            budget -= count_tokens(summary)
         
-        # Keep only recent history
-        if len(self.sessions[session_id]) > self.max_history:
-            self.sessions[session_id] = self.sessions[session_id][-self.max_history:]
+        rendered = []
+        for entry in reversed(turns):
+            question = f"Q: {entry['question']}"
+            remaining = budget - count_tokens(question) - 2
+            if remaining < 16:
+                break
+            answer = truncate_to_tokens(entry["answer"], remaining)
+            rendered.append(f"{question}\nA: {answer}")
+            budget = remaining - count_tokens(answer)
+        
+        if rendered:
+            parts.append("Recent turns:\n" + "\n".join(reversed(rendered)))
+        return "\n\nPrevious conversation:\n" + "\n".join(parts) + "\n"
     
     def get_history(self, session_id: str) -> List[Dict]:
         """Get conversation history for session."""
         return self.sessions.get(session_id, [])
     
+    def get_summary(self, session_id: str) -> str:
+        """Current rolling summary for session (empty if none yet)."""
+        return self.summaries.get(session_id, "")
+    
+    def get_topics(self, session_id: str) -> Counter:
+        """Get service tag counts for session."""
+        return self.topic_counts.get(session_id, Counter())
+    
     def clear_session(self, session_id: str):
         """Clear session history."""
-        if session_id in self.sessions:
-            del self.sessions[session_id]
+        with self._lock:
+            if session_id in self.sessions:
+                del self.sessions[session_id]
+            self.topic_counts.pop(session_id, None)
+            self.turn_counts.pop(session_id, None)
+            self.summaries.pop(session_id, None)
+            self.pending.pop(session_id, None)
+            self._summary_failing.discard(session_id)
 
 
 class EnhancedAWSStudyPartner:
     """Enhanced RAG-based AWS Study Partner with advanced features."""
     
-    def __init__(self):
+    def __init__(self, local_index: Optional[LocalVectorIndex] = None, embeddings=None, llm=None):
+        """
+        Args:
+            local_index: An already opened local index to search instead of
+                         the one configured by VECTOR_BACKEND (the CLI opens
+                         its index before the engine is built)
+            embeddings: Used instead of the OpenAI embeddings
+            llm: Used instead of the OpenAI chat model (load tests pass
+                 latency stand-ins for both, see services.standins)
+        """
+        # Embeddings, LLM and Pinecone share pooled long-lived HTTP clients
+        self.clients = get_clients()
+        
         # Initialize embeddings
-        self.embeddings = OpenAIEmbeddings(
-            model=os.getenv("EMBEDDING_MODEL", "text-embedding-3-large")
-        )
+        self.embedding_model = embedding_model()
+        self.embedding_dimension = embedding_dimension(self.embedding_model)
+        self.embeddings = embeddings or self.clients.embeddings(self.embedding_model, self.embedding_dimension)
         
-        # Initialize vector store
-        self.vectorstore = PineconeVectorStore.from_existing_index(
-            index_name=os.getenv("PINECONE_INDEX_NAME", "aws-study-partner"),
-            embedding=self.embeddings
-        )
+        # Initialize vector store: hosted Pinecone, or a local quantized index
+        # (VECTOR_BACKEND=local, built with `vector_store.py --local`)
+        self.local_index = local_index
+        self.vectorstore = None
+        self.index = None
+        if local_index is None and os.getenv("VECTOR_BACKEND", "pinecone") == "local":
+            self.local_index = LocalVectorIndex(
+                os.getenv("LOCAL_INDEX_PATH", str(DATA_DIR / "index")),
+                mode=os.getenv("LOCAL_INDEX_MODE", "int8")
+            )
+        elif local_index is None:
+            self.index_name = os.getenv("PINECONE_INDEX_NAME", "aws-study-partner")
+            self.vectorstore = self.clients.vectorstore(self.index_name, self.embeddings)
+            self.index = self.clients.index(self.index_name)
+        
+        # Refuse to start if the index was built at a different dimension
+        self._check_index_dimension()
+        
+        # Partition (namespace) routing and a pool for fan-out searches.
+        # Multi-query retrieval gets its own pool: each of its searches fans
+        # out on search_pool, and waiting on that pool from inside it could
+        # deadlock.
+        self.partitions = self._load_partitions()
+        self.search_pool = ThreadPoolExecutor(max_workers=4)
+        self.retrieval_pool = ThreadPoolExecutor(max_workers=4)
         
         # Initialize LLM
-        self.llm = ChatOpenAI(
-            model_name="gpt-3.5-turbo",
-            temperature=0.7,
-            max_tokens=500
+        self.llm_model = "gpt-3.5-turbo"
+        self.llm_params = {"temperature": 0.7, "max_tokens": 500}
+        self.llm = llm or self.clients.chat_model(self.llm_model, **self.llm_params)
+        
+        # Initialize conversation history. CONVERSATION_MEMORY=summary (default)
+        # keeps a rolling LLM summary of older turns; "window" keeps only the
+        # recent turns. Either way the history is capped at
+        # HISTORY_TOKEN_BUDGET tokens of the prompt.
+        memory_mode = os.getenv("CONVERSATION_MEMORY", "summary")
+        self.conversation_history = ConversationHistory(
+            recent_turns=int(os.getenv("HISTORY_RECENT_TURNS", "3")),
+            token_budget=int(os.getenv("HISTORY_TOKEN_BUDGET", "600")),
+            summarizer=self._summarize_turns if memory_mode == "summary" else None
         )
         
-        # Initialize conversation history
-        self.conversation_history = ConversationHistory()
+        # AWS service tagger and service -> chunk index built at ingestion
+        self.service_tagger = ServiceTagger()
+        self.service_index_path = os.getenv(
+            "SERVICE_INDEX_PATH", str(PROCESSED_DIR / "service_index.json")
+        )
+        self.service_index = ServiceIndex.load_or_empty(self.service_index_path)
+        
+        # Practice questions with answer keys, parsed from the processed chunks
+        self.question_bank = QuestionBank.from_processed(PROCESSED_DIR)
+        
+        # Disk-backed cache for the templated explain/compare answers,
+        # invalidated whenever the index contents change
+        self.response_cache = open_response_cache(DATA_DIR / "cache" / "responses.sqlite3")
+        self.index_version = self._index_version()
         
         # System prompt
         self.system_prompt = """You are an expert AWS certification study partner. 
@@ -81,12 +320,42 @@ If you're unsure, say so rather than making up information."""
         
         print("✅ Enhanced AWS Study Partner initialized")
     
+    @classmethod
+    def retrieval_only(cls, local_index: LocalVectorIndex, embeddings=None) -> "EnhancedAWSStudyPartner":
+        """
+        Build an engine with only the retrieval layer, over a local index.
+        
+        No LLM or Pinecone client is created. Pass precomputed embeddings to
+        retrieve() (or leave embeddings=None) to run with no network at all.
+        """
+        partner = cls.__new__(cls)
+        partner.embeddings = embeddings
+        partner.local_index = local_index
+        partner.vectorstore = None
+        partner.index = None
+        partner.partitions = PartitionRouter()
+        partner.search_pool = ThreadPoolExecutor(max_workers=4)
+        partner.retrieval_pool = ThreadPoolExecutor(max_workers=4)
+        partner.service_tagger = ServiceTagger()
+        partner.service_index_path = os.getenv(
+            "SERVICE_INDEX_PATH", str(PROCESSED_DIR / "service_index.json")
+        )
+        partner.service_index = ServiceIndex.load_or_empty(partner.service_index_path)
+        partner.question_bank = QuestionBank.from_processed(PROCESSED_DIR)
+        return partner
+    
     def query(
         self, 
         question: str, 
         session_id: Optional[str] = None,
         top_k: int = 5,
-        include_history: bool = True
+        include_history: bool = True,
+        services: Optional[List[str]] = None,
+        doc_types: Optional[List[str]] = None,
+        certification: Optional[str] = None,
+        on_token: Optional[Callable[[str], None]] = None,
+        retrieval_queries: Optional[List[Dict]] = None,
+        per_query_k: Optional[int] = None
     ) -> Dict:
         """
         Query with optional conversation history.
@@ -94,8 +363,16 @@ If you're unsure, say so rather than making up information."""
         Args:
             question: User's question
             session_id: Optional session ID for history
-            top_k: Number of chunks to retrieve
+            top_k: Number of chunks to retrieve (in total, with retrieval_queries)
             include_history: Include conversation history in context
+            services: Restrict retrieval to chunks tagged with these services
+            doc_types: Restrict retrieval to these partitions (None for all)
+            certification: Restrict retrieval to one certification
+            on_token: Called with each piece of the answer as it streams in
+            retrieval_queries: Search with these instead of the question
+                               (see retrieve_many); the question is still
+                               what the LLM answers
+            per_query_k: Chunks retrieved per retrieval query
             
         Returns:
             Dictionary with answer, sources, and metadata
@@ -106,23 +383,67 @@ If you're unsure, say so rather than making up information."""
         if not session_id:
             session_id = str(uuid.uuid4())
         
-        # Build context from history if available
-        history_context = ""
-        if include_history and session_id:
-            history = self.conversation_history.get_history(session_id)
-            if history:
-                history_context = "\n\nPrevious conversation:\n"
-                for entry in history[-3:]:
-                    history_context += f"Q: {entry['question']}\nA: {entry['answer'][:100]}...\n"
+        with span("rag.query", **{"session.id": session_id}, top_k=top_k) as trace:
+            # Retrieve relevant chunks
+            if retrieval_queries:
+                docs = self.retrieve_many(
+                    retrieval_queries,
+                    k=top_k,
+                    per_query_k=per_query_k,
+                    doc_types=doc_types,
+                    certification=certification,
+                    services=services
+                )
+            else:
+                docs = self.retrieve(
+                    question,
+                    k=top_k,
+                    doc_types=doc_types,
+                    certification=certification,
+                    services=services
+                )
+        
+            with span("prompt", chunks=len(docs)) as prompt_trace:
+                # Build context from history if available
+                history_context = ""
+                if include_history and session_id:
+                    history_context = self.conversation_history.build_context(session_id)
+                full_prompt = self._build_prompt(question, docs, history_context)
+                if prompt_trace.recording:
+                    prompt_trace.set(
+                        prompt_tokens=count_tokens(full_prompt),
+                        history_tokens=count_tokens(history_context)
+                    )
         
-        # Retrieve relevant chunks
-        docs = self.vectorstore.similarity_search(question, k=top_k)
+            # Generate answer
+            response = self._generate(full_prompt, on_token=on_token)
         
-        # Extract context
+            sources = self._format_sources(docs)
+        
+            # Save to history
+            self.conversation_history.add_message(
+                session_id, question, response,
+                topics=self.service_tagger.tag(question)
+            )
+        
+            # Calculate processing time
+            processing_time = (time.time() - start_time) * 1000
+            trace.set(sources=len(sources), answer_chars=len(response))
+        
+            return {
+                "question": question,
+                "answer": response,
+                "sources": sources,
+                "num_sources": len(sources),
+                "session_id": session_id,
+                "processing_time_ms": round(processing_time, 2)
+            }
+    
+    def _build_prompt(self, question: str, docs: List, history_context: str = "") -> str:
+        """Assemble the generation prompt from retrieved chunks and history."""
         context = "\n\n".join([doc.page_content for doc in docs])
         
-        # Build prompt
-        full_prompt = f"""{self.system_prompt}
+        return f"""{self.system_prompt}
 
 Context from AWS study materials:
 {context}
@@ -132,40 +453,448 @@ Context from AWS study materials:
 Current question: {question}
 
 Provide a clear, helpful answer:"""
+    
+    def _generate(self, prompt: str, on_token: Optional[Callable[[str], None]] = None) -> str:
+        """
+        LLM completion for a prompt.
         
-        # Generate answer
-        response = self.llm.predict(full_prompt)
-        
-        # Extract sources with relevance
+        Under a request deadline, or with an on_token callback, the
+        completion is streamed. Deadlines are checked between chunks;
+        abandoning the stream closes the HTTP response, so the upstream
+        stops generating for a client that has gone away.
+        """
+        deadline = current_deadline()
+        streamed = deadline is not None or on_token is not None
+        with span("llm.generate", model=self.llm_model, streamed=streamed) as trace:
+            if not streamed:
+                answer = self.llm.predict(prompt)
+                trace.set(answer_chars=len(answer))
+                return answer
+            
+            if deadline is not None:
+                deadline.check("generation")
+            parts = []
+            stream = self.llm.stream(prompt)
+            try:
+                for chunk in stream:
+                    if not parts and trace.recording:
+                        trace.set(first_token_ms=round(trace.duration_ms, 1))
+                    parts.append(chunk.content)
+                    if on_token is not None:
+                        on_token(chunk.content)
+                    if deadline is not None:
+                        deadline.check("generation")
+            finally:
+                stream.close()
+            answer = "".join(parts)
+            trace.set(answer_chars=len(answer), chunks=len(parts))
+            return answer
+    
+    def _summarize_turns(self, previous: str, turns: List[Dict]) -> str:
+        """Fold turns into the running session summary (runs off the request path)."""
+        transcript = "\n".join(
+            f"Q: {entry['question']}\nA: {truncate_to_tokens(entry['answer'], 300)}"
+            for entry in turns
+        )
+        prompt = f"""You maintain a running summary of an AWS certification study session.
+
+Current summary:
+{previous or "(none yet)"}
+
+New exchanges:
+{transcript}
+
+Rewrite the summary to include the new exchanges. Keep the topics and services
+discussed, key facts the student learned, and any open questions or weak areas.
+Use at most 120 words. Return only the summary:"""
+        with request_priority(BATCH):
+            return self.llm.predict(prompt)
+    
+    def _format_sources(self, docs: List) -> List[Dict]:
+        """Extract sources with relevance (full text; the API trims them per request)."""
         sources = []
         for i, doc in enumerate(docs):
             sources.append({
-                "text": doc.page_content[:300] + "...",
+                "id": chunk_key(doc.metadata, doc.metadata.get("chunk_id", -1)),
+                "text": doc.page_content,
                 "source": doc.metadata.get("source", "unknown"),
                 "doc_type": doc.metadata.get("doc_type", "unknown"),
                 "chunk_id": doc.metadata.get("chunk_id", -1),
                 "relevance_score": 1.0 - (i * 0.1)
             })
+        return sources
+    
+    def query_batch(
+        self,
+        questions: List[str],
+        top_k: int = 5,
+        max_concurrency: int = 8,
+        services: Optional[List[str]] = None,
+        certification: Optional[str] = None,
+        deadline: Optional[Deadline] = None
+    ) -> Iterator[Dict]:
+        """
+        Answer a list of independent questions, yielding results as they complete.
         
-        # Save to history
-        self.conversation_history.add_message(session_id, question, response)
+        All questions are embedded in one call and every retrieval is issued
+        up front; LLM generation is limited to max_concurrency calls in
+        flight. Batch items don't read or write conversation history.
         
-        # Calculate processing time
-        processing_time = (time.time() - start_time) * 1000
+        Args:
+            questions: Questions to answer
+            top_k: Number of chunks to retrieve per question
+            max_concurrency: Maximum concurrent LLM calls
+            services: Restrict retrieval to chunks tagged with these services
+            certification: Restrict retrieval to one certification
+            deadline: Shared deadline for the whole batch; cancelled (and
+                unstarted items dropped) if the consumer stops iterating
+            
+        Yields:
+            {"index", "status": "ok", "result"} or {"index", "status": "error", "error"}
+        """
+        batch_start = time.time()
+        deadline = deadline or Deadline()
         
-        return {
-            "question": question,
-            "answer": response,
-            "sources": sources,
-            "num_sources": len(sources),
-            "session_id": session_id,
-            "processing_time_ms": round(processing_time, 2)
+        try:
+            with request_priority(BATCH):
+                vectors = self.embeddings.embed_documents(questions)
+        except Exception as e:
+            for index in range(len(questions)):
+                yield {"index": index, "status": "error", "error": f"Embedding failed: {e}"}
+            return
+        
+        def search(question: str, vector) -> List[Document]:
+            with deadline_scope(deadline):
+                return self.retrieve(
+                    question, k=top_k, certification=certification, services=services, embedding=vector
+                )
+        
+        def answer(index: int) -> Dict:
+            docs = retrievals[index].result()
+            with deadline_scope(deadline), request_priority(BATCH):
+                response = self._generate(self._build_prompt(questions[index], docs))
+            sources = self._format_sources(docs)
+            return {
+                "question": questions[index],
+                "answer": response,
+                "sources": sources,
+                "num_sources": len(sources),
+                "processing_time_ms": round((time.time() - batch_start) * 1000, 2)
+            }
+        
+        # Retrieval gets its own pool: retrieve() fans out on search_pool, and
+        # waiting on that pool from inside it could deadlock
+        with ThreadPoolExecutor(max_workers=min(16, len(questions) or 1)) as retrieval_pool, \
+                ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as llm_pool:
+            # Bulk retrieval: every search is in flight before generation starts
+            retrievals = [
+                retrieval_pool.submit(search, question, vector)
+                for question, vector in zip(questions, vectors)
+            ]
+            
+            futures = {llm_pool.submit(answer, index): index for index in range(len(questions))}
+            try:
+                for future in as_completed(futures):
+                    index = futures[future]
+                    try:
+                        yield {"index": index, "status": "ok", "result": future.result()}
+                    except Exception as e:
+                        yield {"index": index, "status": "error", "error": str(e)}
+            finally:
+                # Consumer went away: stop in-flight items, drop unstarted ones
+                if not all(future.done() for future in futures):
+                    deadline.cancel("client_disconnected")
+                    for future in list(futures) + retrievals:
+                        future.cancel()
+    
+    def next_generation(self) -> "EnhancedAWSStudyPartner":
+        """
+        A copy of the engine over the index as it is now on disk, for a hot reload.
+        
+        The local index is reopened at its live generation, and partitions,
+        service index and question bank are reloaded. Clients, thread pools,
+        conversation history and the response cache are shared with this
+        engine, which is left untouched and keeps serving meanwhile.
+        """
+        partner = copy.copy(self)
+        if self.local_index is not None:
+            partner.local_index = LocalVectorIndex(
+                self.local_index.root, mode=self.local_index.mode, rescore_factor=self.local_index.rescore_factor
+            )
+            partner._check_index_dimension()
+        partner.partitions = partner._load_partitions()
+        partner.service_index = ServiceIndex.load_or_empty(self.service_index_path)
+        partner.question_bank = QuestionBank.from_processed(PROCESSED_DIR)
+        partner.index_version = partner._index_version()
+        return partner
+    
+    def purge_stale_responses(self):
+        """Drop cached answers from other index versions, once this engine is live."""
+        if self.response_cache is not None:
+            stale = self.response_cache.purge(keep_version=self.index_version)
+            print(f"🧹 Index changed, dropped {stale} cached responses")
+    
+    def release(self):
+        """Drop a retired generation's memory maps, records and lookup indexes."""
+        self.local_index = None
+        self.partitions = None
+        self.service_index = None
+        self.question_bank = None
+    
+    def _index_version(self) -> str:
+        """
+        Fingerprint of the index contents, used to invalidate cached answers.
+        
+        Built from the index epoch (bumped by every ingestion, upload and
+        admin reload) and, for a local index, the generation being served;
+        never from vector counts, which a re-ingest under the same chunk ids
+        leaves unchanged.
+        """
+        state = {"epoch": read_index_epoch(PROCESSED_DIR)}
+        if self.local_index is not None:
+            state["local"] = [str(self.local_index.path), self.local_index.meta]
+        else:
+            state["index"] = self.index_name
+        state["embedding"] = [self.embedding_model, self.embedding_dimension]
+        digest = hashlib.sha256(json.dumps(state, sort_keys=True, default=str).encode("utf-8"))
+        return digest.hexdigest()[:16]
+    
+    def cached_query(
+        self,
+        question: str,
+        top_k: int = 5,
+        doc_types: Optional[List[str]] = None,
+        on_token: Optional[Callable[[str], None]] = None,
+        retrieval_queries: Optional[List[Dict]] = None,
+        per_query_k: Optional[int] = None
+    ) -> Dict:
+        """
+        query() for deterministic prompt templates, served from the response cache.
+        
+        The key covers the model, LLM parameters, retrieval parameters
+        (including the retrieval queries) and the templated question; with
+        the index version fixed those determine the final prompt, so a hit
+        skips both embedding and generation (and on_token receives the
+        whole cached answer at once).
+        """
+        def run_query():
+            return self.query(
+                question, top_k=top_k, doc_types=doc_types, include_history=False, on_token=on_token,
+                retrieval_queries=retrieval_queries, per_query_k=per_query_k
+            )
+        
+        if self.response_cache is None:
+            return run_query()
+        
+        start_time = time.time()
+        params = {
+            **self.llm_params,
+            "top_k": top_k,
+            "doc_types": doc_types,
+            "retrieval_queries": retrieval_queries,
+            "per_query_k": per_query_k,
+            # Entries from before sources kept their full text held 300-character excerpts
+            "source_text": "full"
         }
+        key = ResponseCache.make_key(self.llm_model, params, question)
+        with span("cache.lookup") as trace:
+            cached = self.response_cache.get(key, self.index_version)
+            trace.set(hit=cached is not None)
+        if cached is not None:
+            if on_token is not None:
+                on_token(cached["answer"])
+            return {
+                **cached,
+                "session_id": str(uuid.uuid4()),
+                "processing_time_ms": round((time.time() - start_time) * 1000, 2)
+            }
+        
+        result = run_query()
+        self.response_cache.put(
+            key, self.index_version,
+            {field: result[field] for field in ("question", "answer", "sources", "num_sources")},
+            model=self.llm_model
+        )
+        return result
+    
+    def _check_index_dimension(self):
+        """Startup check that the index and EMBEDDING_DIMENSIONS agree."""
+        if self.local_index is not None:
+            check_index_dimension(
+                self.local_index.dimension, self.embedding_dimension, str(self.local_index.path)
+            )
+            return
+        try:
+            index_dimension = self.index.describe_index_stats().dimension
+        except Exception as e:
+            print(f"⚠️  Could not read index dimension: {e}")
+            return
+        check_index_dimension(index_dimension, self.embedding_dimension, self.index_name)
+    
+    def _load_partitions(self) -> PartitionRouter:
+        """Read the namespaces present in the index."""
+        if self.index is None:
+            # Local index: doc_type is applied as a metadata filter
+            return PartitionRouter()
+        try:
+            stats = self.index.describe_index_stats()
+            return PartitionRouter({
+                name: summary.vector_count
+                for name, summary in stats.namespaces.items()
+            })
+        except Exception as e:
+            print(f"⚠️  Could not read index partitions, searching whole index: {e}")
+            return PartitionRouter()
+    
+    def retrieve(
+        self,
+        query: str,
+        k: int = 5,
+        doc_types: Optional[List[str]] = None,
+        certification: Optional[str] = None,
+        services: Optional[List[str]] = None,
+        embedding: Optional[List[float]] = None
+    ) -> List:
+        """
+        Retrieve the top-k chunks from the relevant partitions.
+        
+        Filters are pushed down to Pinecone. When several partitions are
+        routed, the query is embedded once and the per-partition searches
+        run concurrently, then merged by score. Pass a precomputed
+        embedding to skip the embedding call entirely.
+        """
+        backend = "local" if self.local_index is not None else "pinecone"
+        with span("retrieval", k=k, backend=backend, services=services or []) as trace:
+            docs = self._retrieve(query, k, doc_types, certification, services, embedding)
+            trace.set(chunks=len(docs))
+            return docs
+    
+    def _retrieve(self, query, k, doc_types, certification, services, embedding) -> List:
+        checkpoint("retrieval")
+        routes = self.partitions.route(doc_types, certification, self.service_filter(services))
+        current_span().set(partitions=len(routes))
+        
+        if self.local_index is not None:
+            if embedding is None:
+                embedding = self._embed_query(query)
+            _, metadata_filter = routes[0]
+            return [
+                self._local_document(row)
+                for row, _ in self.local_index.search(embedding, k=k, metadata_filter=metadata_filter)
+            ]
+        
+        if len(routes) == 1 and embedding is None:
+            namespace, metadata_filter = routes[0]
+            return self.vectorstore.similarity_search(
+                query, k=k, filter=metadata_filter, namespace=namespace
+            )
+        
+        if embedding is None:
+            embedding = self._embed_query(query)
+            checkpoint("retrieval")
+        
+        if len(routes) == 1:
+            namespace, metadata_filter = routes[0]
+            hits = self.vectorstore.similarity_search_by_vector_with_score(
+                embedding, k=k, filter=metadata_filter, namespace=namespace
+            )
+            return [doc for doc, _ in hits]
+        
+        def search(route):
+            namespace, metadata_filter = route
+            return self.vectorstore.similarity_search_by_vector_with_score(
+                embedding, k=k, filter=metadata_filter, namespace=namespace
+            )
+        
+        hits = [hit for partition_hits in self.search_pool.map(search, routes) for hit in partition_hits]
+        hits.sort(key=lambda hit: hit[1], reverse=True)
+        return [doc for doc, _ in hits[:k]]
+    
+    def _embed_query(self, query: str) -> List[float]:
+        with span("embed", texts=1, chars=len(query)):
+            return self.embeddings.embed_query(query)
+    
+    def retrieve_many(
+        self,
+        queries: List[Dict],
+        k: int = 6,
+        per_query_k: Optional[int] = None,
+        doc_types: Optional[List[str]] = None,
+        certification: Optional[str] = None,
+        services: Optional[List[str]] = None
+    ) -> List:
+        """
+        Retrieve for several search queries concurrently, merged under one budget.
+        
+        Each query is {"query": text, "services": optional service ids to
+        restrict it to (default: services)}. All queries are embedded in one
+        call and searched in parallel, each for per_query_k chunks (default
+        k). Hits are then taken rank by rank across the queries (every
+        query's best hit, then every query's second, ...), skipping chunks
+        already taken, until k are selected, so each query gets a fair share
+        of the budget.
+        """
+        if len(queries) == 1:
+            query = queries[0]
+            return self.retrieve(
+                query["query"], k=k, doc_types=doc_types, certification=certification,
+                services=query.get("services", services)
+            )
+        
+        per_query_k = per_query_k or k
+        with span("retrieval.multi", queries=len(queries), k=k, per_query_k=per_query_k) as trace:
+            checkpoint("retrieval")
+            texts = [query["query"] for query in queries]
+            with span("embed", texts=len(texts), chars=sum(len(text) for text in texts)):
+                vectors = self.embeddings.embed_documents(texts)
+            
+            def search(query: Dict, vector) -> List[Document]:
+                return self.retrieve(
+                    query["query"], k=per_query_k, doc_types=doc_types, certification=certification,
+                    services=query.get("services", services), embedding=vector
+                )
+            
+            # Each search runs in a copy of this context, so it sees the
+            # request's deadline, rate priority and trace
+            futures = [
+                self.retrieval_pool.submit(contextvars.copy_context().run, search, query, vector)
+                for query, vector in zip(queries, vectors)
+            ]
+            ranked = [future.result() for future in futures]
+            
+            merged, seen = [], set()
+            for rank in range(per_query_k):
+                for hits in ranked:
+                    if rank < len(hits) and hits[rank].page_content not in seen and len(merged) < k:
+                        seen.add(hits[rank].page_content)
+                        merged.append(hits[rank])
+            trace.set(candidates=sum(len(hits) for hits in ranked), chunks=len(merged))
+            return merged
+    
+    def _local_document(self, row: int) -> Document:
+        record = self.local_index.record(row)
+        return Document(page_content=record["text"], metadata=record["metadata"])
+    
+    def service_filter(self, services: Optional[List[str]]) -> Optional[Dict]:
+        """
+        Build a metadata filter for tag-filtered retrieval.
+        
+        Services with no indexed chunks are dropped so that an index built
+        before tagging existed still returns results.
+        """
+        if not services:
+            return None
+        
+        tagged = [s for s in services if self.service_index.chunk_count(s) > 0]
+        if not tagged:
+            return None
+        return {"services": {"$in": tagged}}
     
     def explain_concept(
         self, 
         concept: str, 
-        detail_level: str = "medium"
+        detail_level: str = "medium",
+        on_token: Optional[Callable[[str], None]] = None
     ) -> Dict:
         """
         Get detailed explanation of AWS concept.
@@ -173,6 +902,7 @@ Provide a clear, helpful answer:"""
         Args:
             concept: AWS concept to explain
             detail_level: brief, medium, or detailed
+            on_token: Called with each piece of the answer as it streams in
             
         Returns:
             Dictionary with explanation
@@ -201,13 +931,18 @@ Include:
 
 Keep the explanation clear and educational."""
         
-        return self.query(question, top_k=6)
+        # Search for the concept itself, not the instruction template
+        return self.cached_query(
+            question, top_k=6, doc_types=["study_guide"], on_token=on_token,
+            retrieval_queries=[{"query": concept}]
+        )
     
     def compare_services(
         self, 
         service1: str, 
         service2: str,
-        aspects: Optional[List[str]] = None
+        aspects: Optional[List[str]] = None,
+        on_token: Optional[Callable[[str], None]] = None
     ) -> Dict:
         """
         Compare two AWS services.
@@ -216,6 +951,7 @@ Keep the explanation clear and educational."""
             service1: First service
             service2: Second service
             aspects: Specific aspects to compare
+            on_token: Called with each piece of the answer as it streams in
             
         Returns:
             Comparison details
@@ -235,13 +971,25 @@ Include:
 
 Provide a clear comparison table format."""
         
-        return self.query(question, top_k=8)
+        # One search per service, restricted to chunks tagged with it, plus
+        # one for passages that compare the two; 3 hits each, 6 in total
+        focus = f" {', '.join(aspects)}" if aspects else ""
+        retrieval_queries = [
+            {"query": f"{service}{focus}", "services": self.service_tagger.resolve(service)}
+            for service in (service1, service2)
+        ]
+        retrieval_queries.append({"query": f"{service1} vs {service2}{focus}"})
+        return self.cached_query(
+            question, top_k=6, doc_types=["study_guide"], on_token=on_token,
+            retrieval_queries=retrieval_queries, per_query_k=3
+        )
     
     def generate_quiz(
         self, 
         topic: Optional[str] = None,
         num_questions: int = 5,
-        difficulty: Optional[str] = None
+        difficulty: Optional[str] = None,
+        certification: Optional[str] = None
     ) -> Dict:
         """
         Generate practice quiz questions.
@@ -250,6 +998,7 @@ Provide a clear comparison table format."""
             topic: Specific topic or None for general
             num_questions: Number of questions
             difficulty: easy, medium, hard, or None
+            certification: Restrict to one certification's question bank
             
         Returns:
             Quiz with questions
@@ -266,27 +1015,54 @@ Provide a clear comparison table format."""
         if difficulty:
             search_query += f" {difficulty}"
         
-        # Retrieve practice questions
-        docs = self.vectorstore.similarity_search(
+        # Retrieve from the question bank partition only, narrowed to chunks
+        # tagged with the topic. Several chunks can belong to one question,
+        # so fetch extra and keep distinct questions.
+        docs = self.retrieve(
             search_query,
-            k=num_questions * 3
+            k=num_questions * 3,
+            doc_types=["questions"],
+            certification=certification,
+            services=self.service_tagger.resolve(topic)
         )
         
+        # Questions parsed with an answer key first, raw chunks to fill up
+        parsed, unparsed, seen = [], [], set()
+        for doc in docs:
+            question = self.question_bank.match(doc.page_content)
+            if question is None:
+                unparsed.append({"question": doc.page_content, "source": doc.metadata.get("filename", "unknown")})
+            elif question["question"].lower() not in seen:
+                # The same question can appear in several exports
+                seen.add(question["question"].lower())
+                parsed.append(question)
+        
         questions = []
-        for i, doc in enumerate(docs[:num_questions]):
+        answer_key = []
+        for i, item in enumerate((parsed + unparsed)[:num_questions]):
+            q_id = f"q{i+1}"
             questions.append({
-                "id": f"q{i+1}",
-                "question": doc.page_content,
+                "id": q_id,
+                "question": item["question"],
+                "options": item.get("options"),
                 "topic": topic or "General AWS",
                 "difficulty": difficulty or "medium",
-                "source": doc.metadata.get("filename", "unknown")
+                "source": item["source"]
+            })
+            # Kept server-side for grading, never returned to the quiz taker
+            answer_key.append({
+                "question_id": q_id,
+                "options": item.get("options"),
+                "answer": item.get("answer"),
+                "explanation": item.get("explanation")
             })
         
         return {
             "quiz_id": quiz_id,
             "topic": topic or "General AWS",
             "questions": questions,
-            "total_questions": len(questions)
+            "total_questions": len(questions),
+            "answer_key": answer_key
         }
     
     def get_session_info(self, session_id: str) -> Dict:
@@ -299,18 +1075,17 @@ Provide a clear comparison table format."""
                 "exists": False
             }
         
-        topics = set()
-        for entry in history:
-            question_lower = entry["question"].lower()
-            for service in ["s3", "ec2", "vpc", "iam", "rds", "lambda"]:
-                if service in question_lower:
-                    topics.add(service.upper())
+        topics = self.conversation_history.get_topics(session_id)
         
         return {
             "session_id": session_id,
             "exists": True,
-            "questions_asked": len(history),
-            "topics_covered": list(topics),
+            "questions_asked": self.conversation_history.turn_counts[session_id],
+            "topics_covered": [
+                self.service_tagger.label(service_id)
+                for service_id, _ in topics.most_common()
+            ],
+            "conversation_summary": self.conversation_history.get_summary(session_id) or None,
             "first_question_time": history[0]["timestamp"] if history else None,
             "last_active": history[-1]["timestamp"] if history else None
         }
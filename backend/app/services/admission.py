@@ -0,0 +1,208 @@
+"""Admission control for expensive endpoints: concurrency limits, bounded queues, load shedding."""
+import asyncio
+import os
+import time
+from collections import Counter, OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+import numpy as np
+
+
+class Rejected(Exception):
+    """The request was shed; retry_after is a hint in seconds."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """One admitted request. release() may be called from any thread."""
+
+    def __init__(self, controller: "AdmissionController", session_key, loop):
+        self.controller = controller
+        self.session_key = session_key
+        self.loop = loop
+        self.admitted_at = time.monotonic()
+        self._released = False
+
+    def release(self):
+        if self._released:
+            return
+        self._released = True
+        self.loop.call_soon_threadsafe(self.controller._release, self)
+
+
+class AdmissionController:
+    """
+    At most `limit` requests run at once; up to `queue_size` more wait.
+
+    Waiting requests are served round-robin across sessions, so one
+    session firing many requests cannot starve others, and a session can
+    hold at most `session_limit` running-or-queued requests. A request
+    that can't be queued, or waits longer than its timeout, is rejected
+    with a Retry-After estimate from the recent service time.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        limit: int,
+        queue_size: int,
+        queue_timeout: float = 10.0,
+        session_limit: Optional[int] = None
+    ):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.session_limit = session_limit
+
+        self.active = 0
+        self._queues = OrderedDict()  # session key -> deque of waiter futures
+        self._queued = 0
+        self._per_session = Counter()
+        self._anonymous = 0
+
+        self.admitted = 0
+        self.rejected = Counter()
+        self._waits = deque(maxlen=1000)
+        self._service_time = None  # EWMA, seconds
+
+    @classmethod
+    def from_env(cls, name: str, limit: int, queue_size: int) -> "AdmissionController":
+        """
+        Limits overridable as ADMISSION_<NAME>_CONCURRENCY / _QUEUE.
+        ADMISSION_SESSION_LIMIT caps each session's requests (0, the default, is no cap).
+        """
+        prefix = f"ADMISSION_{name.upper()}"
+        session_limit = int(os.getenv("ADMISSION_SESSION_LIMIT", "0"))
+        return cls(
+            name,
+            limit=int(os.getenv(f"{prefix}_CONCURRENCY", str(limit))),
+            queue_size=int(os.getenv(f"{prefix}_QUEUE", str(queue_size))),
+            queue_timeout=float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "10")),
+            session_limit=session_limit or None
+        )
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free, from queue length and service time."""
+        service_time = self._service_time or 1.0
+        return max(1, int(np.ceil(service_time * (self._queued + 1) / self.limit)))
+
+    def _reject(self, reason: str):
+        self.rejected[reason] += 1
+        raise Rejected(reason, self.retry_after())
+
+    async def acquire(self, session_id: Optional[str] = None, timeout: Optional[float] = None) -> Ticket:
+        """Wait for a slot; raises Rejected when shedding load."""
+        loop = asyncio.get_running_loop()
+        if session_id is None:
+            self._anonymous += 1
+            session_key = ("anonymous", self._anonymous)
+        else:
+            session_key = session_id
+            if self.session_limit and self._per_session[session_key] >= self.session_limit:
+                self._reject("session_limit")
+
+        ticket = Ticket(self, session_key, loop)
+        if self.active < self.limit and not self._queued:
+            self._admit(ticket, waited=0.0)
+            return ticket
+        if self._queued >= self.queue_size:
+            self._reject("queue_full")
+
+        waiter = loop.create_future()
+        self._queues.setdefault(session_key, deque()).append(waiter)
+        self._queued += 1
+        self._per_session[session_key] += 1
+        start = time.monotonic()
+        timeout = self.queue_timeout if timeout is None else min(timeout, self.queue_timeout)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=max(timeout, 0))
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # Slot was handed over just as we gave up: pass it on
+                self._dec(session_key)
+                self._release(ticket, finished=False)
+            else:
+                waiter.cancel()
+                self._forget(session_key, waiter)
+            if isinstance(e, asyncio.CancelledError):
+                self.rejected["cancelled"] += 1
+                raise
+            self._reject("queue_timeout")
+
+        # _release already counted the slot as active
+        self._dec(session_key)
+        self._admit(ticket, waited=time.monotonic() - start, counted=True)
+        return ticket
+
+    def _admit(self, ticket: Ticket, waited: float, counted: bool = False):
+        if not counted:
+            self.active += 1
+        self.admitted += 1
+        self._per_session[ticket.session_key] += 1
+        self._waits.append(waited)
+        ticket.admitted_at = time.monotonic()
+
+    def _dec(self, session_key):
+        self._per_session[session_key] -= 1
+        if self._per_session[session_key] <= 0:
+            del self._per_session[session_key]
+
+    def _forget(self, session_key, waiter):
+        queue = self._queues.get(session_key)
+        if queue and waiter in queue:
+            queue.remove(waiter)
+            self._queued -= 1
+            self._dec(session_key)
+            if not queue:
+                del self._queues[session_key]
+
+    def _release(self, ticket: Ticket, finished: bool = True):
+        """Free a slot and hand it to the next session in round-robin order."""
+        if finished:
+            elapsed = time.monotonic() - ticket.admitted_at
+            self._service_time = elapsed if self._service_time is None else 0.8 * self._service_time + 0.2 * elapsed
+            self._dec(ticket.session_key)
+        self.active -= 1
+
+        while self._queues:
+            session_key, queue = next(iter(self._queues.items()))
+            waiter = queue.popleft()
+            self._queued -= 1
+            # Rotate: this session goes to the back of the line
+            del self._queues[session_key]
+            if queue:
+                self._queues[session_key] = queue
+            if not waiter.done():
+                self.active += 1
+                waiter.set_result(True)
+                return
+            self._dec(session_key)
+
+    @asynccontextmanager
+    async def admit(self, session_id: Optional[str] = None, timeout: Optional[float] = None):
+        ticket = await self.acquire(session_id, timeout)
+        try:
+            yield ticket
+        finally:
+            ticket.release()
+
+    def stats(self) -> Dict:
+        waits = np.array(self._waits) * 1000 if self._waits else None
+        return {
+            "limit": self.limit,
+            "queue_size": self.queue_size,
+            "active": self.active,
+            "queued": self._queued,
+            "queued_sessions": len(self._queues),
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "queue_wait_p50_ms": round(float(np.percentile(waits, 50)), 1) if waits is not None else None,
+            "queue_wait_p95_ms": round(float(np.percentile(waits, 95)), 1) if waits is not None else None,
+            "service_time_ms": round(self._service_time * 1000, 1) if self._service_time else None
+        }
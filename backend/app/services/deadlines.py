@@ -0,0 +1,135 @@
+"""Per-request deadlines and cancellation, propagated to upstream calls.
+
+A Deadline is bound to the worker thread with deadline_scope(). The
+engine checks it between pipeline stages and while streaming generation.
+The shared HTTP transport (utils.clients) caps every OpenAI call's
+timeouts at the time remaining. The API cancels a deadline when the
+client disconnects, so abandoned requests stop consuming LLM capacity.
+"""
+import contextvars
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+
+class RequestCancelled(Exception):
+    """The request was cancelled (client went away) or ran out of time."""
+
+    def __init__(self, reason: str, stage: Optional[str] = None):
+        super().__init__(f"Request {reason}" + (f" during {stage}" if stage else ""))
+        self.reason = reason
+        self.stage = stage
+
+
+class Deadline:
+    """Absolute time limit plus an explicit cancellation flag."""
+
+    def __init__(self, timeout: Optional[float] = None):
+        self.expires_at = time.monotonic() + timeout if timeout is not None else None
+        self.reason = None
+        self._cancelled = threading.Event()
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left (None if there is no time limit)."""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    @property
+    def stopped(self) -> bool:
+        return self.cancelled or self.expired
+
+    def cancel(self, reason: str = "cancelled"):
+        if not self._cancelled.is_set():
+            self.reason = reason
+            self._cancelled.set()
+
+    def check(self, stage: Optional[str] = None):
+        """Raise RequestCancelled if the request should stop now."""
+        if self._cancelled.is_set():
+            raise RequestCancelled(self.reason, stage)
+        if self.expired:
+            self.cancel("deadline_exceeded")
+            raise RequestCancelled(self.reason, stage)
+
+    def cap(self, seconds: Optional[float]) -> Optional[float]:
+        """seconds, lowered to the time remaining."""
+        remaining = self.remaining()
+        if remaining is None:
+            return seconds
+        return remaining if seconds is None else min(seconds, remaining)
+
+
+_current_deadline = contextvars.ContextVar("request_deadline", default=None)
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[Deadline]):
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current_deadline.get()
+
+
+def cancellation_cause(error: Optional[BaseException]) -> Optional[RequestCancelled]:
+    """
+    The RequestCancelled behind an error. SDKs wrap exceptions raised in
+    the HTTP transport (openai raises APIConnectionError from them).
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        if isinstance(error, RequestCancelled):
+            return error
+        seen.add(id(error))
+        error = error.__cause__ or error.__context__
+    return None
+
+
+def checkpoint(stage: Optional[str] = None):
+    """Stop here if the current request was cancelled or timed out."""
+    deadline = _current_deadline.get()
+    if deadline is not None:
+        deadline.check(stage)
+
+
+class CancellationStats:
+    """How requests ended, and at which stage cancelled ones stopped."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.outcomes = Counter()
+        self.stages = Counter()
+
+    def record(self, outcome: str, stage: Optional[str] = None):
+        with self._lock:
+            self.outcomes[outcome] += 1
+            if stage:
+                self.stages[f"{outcome}:{stage}"] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = sum(self.outcomes.values())
+            stopped = total - self.outcomes.get("completed", 0)
+            return {
+                "outcomes": dict(self.outcomes),
+                "stopped_at": dict(self.stages),
+                "cancel_rate": round(stopped / total, 4) if total else None
+            }
+
+
+cancellation_stats = CancellationStats()
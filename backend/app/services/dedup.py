@@ -0,0 +1,274 @@
+"""Near-duplicate chunk detection with MinHash signatures and LSH banding.
+
+Practice exams and review PDFs repeat the same questions and explanations
+across files. collapse_duplicates() keeps one canonical chunk per group of
+near-duplicates (estimated Jaccard similarity of word shingles at or above
+a threshold) and lists the others on it as source references, so each
+passage is embedded and stored once.
+
+Every chunk is hashed once, and candidate pairs come from sorting LSH band
+keys, so the work grows linearly with the number of chunks. Chunks are
+only collapsed within a Pinecone partition, so partition-filtered searches
+still find them.
+
+Configured with $DEDUP (on/off) and $DEDUP_THRESHOLD.
+"""
+import json
+import os
+import re
+import time
+import zlib
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from services.partitions import partition_namespace
+from services.service_tagger import chunk_key
+from utils.embedding_config import embedding_dimension, embedding_model, embedding_price
+from utils.tokens import count_tokens
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+# Pinecone caps metadata at 40 KB per vector; the count stays exact
+MAX_SOURCE_REFS = 100
+
+
+@lru_cache(maxsize=None)
+def _word_hash(word: str) -> int:
+    # Memoised: corpora reuse a small vocabulary, and crc32 per word dominates otherwise
+    return zlib.crc32(word.encode())
+
+
+def dedup_enabled() -> bool:
+    return os.getenv("DEDUP", "on").lower() not in ("0", "off", "false", "no")
+
+
+def dedup_threshold() -> float:
+    return float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+
+
+def chunk_refs(metadata: Dict) -> List[Tuple[str, int]]:
+    """(filename, chunk_id) of a stored chunk followed by the duplicates it stands for."""
+    refs = [(metadata.get("filename"), int(metadata.get("chunk_id", -1)))]
+    for ref in metadata.get("source_refs") or []:
+        filename, _, chunk_id = ref.rpartition("#")
+        refs.append((filename, int(chunk_id)))
+    return refs
+
+
+class NearDuplicateDetector:
+    """
+    MinHash over word shingles with LSH banding.
+
+    With the defaults (64 hashes in 16 bands of 4), pairs above ~0.5
+    similarity usually share a bucket; candidates are then kept only if
+    their signatures agree on at least `threshold` of the hashes.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.8,
+        num_perm: int = 64,
+        bands: int = 16,
+        shingle_size: int = 5,
+        seed: int = 1
+    ):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        rng = np.random.default_rng(seed)
+        # Multiply-shift hashing: the high 32 bits of (a*x + b) mod 2^64
+        self._a = rng.integers(0, 2**64, size=(num_perm, 1), dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2**64, size=(num_perm, 1), dtype=np.uint64)
+        self._shingle_mix = rng.integers(0, 2**64, size=shingle_size, dtype=np.uint64) | np.uint64(1)
+        self._band_mix = rng.integers(0, 2**64, size=self.rows, dtype=np.uint64) | np.uint64(1)
+
+    def shingles(self, text: str) -> np.ndarray:
+        """64-bit hashes of the word k-shingles of text (repeats don't change a MinHash)."""
+        words = _WORD_RE.findall(text.lower())
+        if not words:
+            return np.empty(0, dtype=np.uint64)
+        word_hashes = np.fromiter(map(_word_hash, words), dtype=np.uint64, count=len(words))
+        size = min(self.shingle_size, len(words))
+        count = len(words) - size + 1
+        hashes = np.zeros(count, dtype=np.uint64)
+        for offset in range(size):
+            hashes += word_hashes[offset:offset + count] * self._shingle_mix[offset]
+        return hashes
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """MinHash signature (num_perm uint32), or None for text without words."""
+        signatures, valid = self.signatures([text])
+        return signatures[0] if valid[0] else None
+
+    def signatures(self, texts: List[str], block: int = 256) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Signatures for many texts, plus a mask of texts that had words.
+
+        Shingles of a block of texts are hashed in one vectorised pass and
+        reduced per text, instead of one small array operation per text.
+        """
+        n = len(texts)
+        signatures = np.zeros((n, self.num_perm), dtype=np.uint32)
+        valid = np.zeros(n, dtype=bool)
+        for start in range(0, n, block):
+            shingles = [self.shingles(text) for text in texts[start:start + block]]
+            sizes = np.array([len(s) for s in shingles])
+            present = np.flatnonzero(sizes)
+            if not len(present):
+                continue
+            offsets = np.concatenate(([0], np.cumsum(sizes[present])[:-1]))
+            hashed = (self._a * np.concatenate([shingles[i] for i in present]) + self._b) >> np.uint64(32)
+            signatures[start + present] = np.minimum.reduceat(hashed, offsets, axis=1).T
+            valid[start + present] = True
+        return signatures, valid
+
+    def _band_keys(self, signatures: np.ndarray) -> np.ndarray:
+        """One 64-bit key per (chunk, band)."""
+        banded = signatures.reshape(len(signatures), self.bands, self.rows).astype(np.uint64)
+        return (banded * self._band_mix).sum(axis=2, dtype=np.uint64)
+
+    def find(self, texts: List[str], groups: Optional[List[str]] = None) -> np.ndarray:
+        """
+        Canonical index for each text: its own index, or that of the
+        earliest near-duplicate it collapses into. Texts are only compared
+        within the same group.
+        """
+        n = len(texts)
+        signatures, valid = self.signatures(texts)
+
+        group_ids = np.zeros(n, dtype=np.uint64)
+        if groups is not None:
+            group_ids = np.fromiter((zlib.crc32(g.encode()) for g in groups), dtype=np.uint64, count=n)
+
+        indices = np.flatnonzero(valid)
+        band_keys = self._band_keys(signatures[indices]) ^ (group_ids[indices, None] << np.uint64(32))
+
+        # Candidates: every chunk paired with its bucket's first chunk and its predecessor
+        pairs = []
+        for band in range(self.bands):
+            order = np.argsort(band_keys[:, band], kind="stable")
+            keys = band_keys[order, band]
+            members = indices[order]
+            same = keys[1:] == keys[:-1]
+            if not same.any():
+                continue
+            starts = np.flatnonzero(np.concatenate(([True], ~same)))
+            leaders = members[starts][np.cumsum(np.concatenate(([True], ~same))) - 1]
+            later = np.flatnonzero(same) + 1
+            pairs.append(np.stack([leaders[later], members[later]], axis=1))
+            pairs.append(np.stack([members[later - 1], members[later]], axis=1))
+
+        canonical = np.arange(n)
+        if not pairs:
+            return canonical
+        pairs = np.unique(np.concatenate(pairs), axis=0)
+        pairs = pairs[pairs[:, 0] != pairs[:, 1]]
+
+        # Verify candidates on the full signature, in blocks to bound memory
+        keep = np.zeros(len(pairs), dtype=bool)
+        for start in range(0, len(pairs), 100_000):
+            block = pairs[start:start + 100_000]
+            similarity = (signatures[block[:, 0]] == signatures[block[:, 1]]).mean(axis=1)
+            keep[start:start + 100_000] = (
+                (similarity >= self.threshold) & (group_ids[block[:, 0]] == group_ids[block[:, 1]])
+            )
+        pairs = pairs[keep]
+
+        # Greedy assignment in document order: a chunk joins the earliest
+        # canonical it matches directly, so groups never chain
+        pairs = pairs[np.lexsort((pairs[:, 0], pairs[:, 1]))]
+        for first, second in pairs.tolist():
+            if canonical[second] == second and canonical[first] == first and first < second:
+                canonical[second] = first
+        return canonical
+
+
+def collapse_duplicates(
+    chunks: List[Dict],
+    threshold: Optional[float] = None,
+    detector: Optional[NearDuplicateDetector] = None
+) -> Tuple[List[Dict], Dict]:
+    """
+    Collapse near-duplicate chunks into their first occurrence.
+
+    The canonical chunk gets `source_refs` ("<filename>#<chunk_id>" of the
+    collapsed chunks), `duplicate_count`, and the union of their service
+    tags. Returns the kept chunks (in their original order) and a report of
+    the embedding spend and index size saved.
+    """
+    start = time.perf_counter()
+    detector = detector or NearDuplicateDetector(threshold=threshold or dedup_threshold())
+    canonical = detector.find(
+        [chunk["text"] for chunk in chunks],
+        [partition_namespace(chunk["metadata"]) for chunk in chunks]
+    )
+
+    duplicates: Dict[int, List[Dict]] = {}
+    for i, target in enumerate(canonical.tolist()):
+        if target != i:
+            duplicates.setdefault(target, []).append(chunks[i])
+
+    kept = []
+    for i, chunk in enumerate(chunks):
+        if canonical[i] != i:
+            continue
+        group = duplicates.get(i)
+        if group:
+            metadata = chunk["metadata"]
+            services = set(metadata.get("services", []))
+            for duplicate in group:
+                services.update(duplicate["metadata"].get("services", []))
+            chunk = {
+                **chunk,
+                "metadata": {
+                    **metadata,
+                    "services": sorted(services),
+                    "duplicate_count": len(group),
+                    "source_refs": [
+                        chunk_key(d["metadata"], d["chunk_id"]) for d in group[:MAX_SOURCE_REFS]
+                    ]
+                }
+            }
+        kept.append(chunk)
+
+    removed = [chunk for i, chunk in enumerate(chunks) if canonical[i] != i]
+    tokens_saved = sum(
+        chunk["metadata"].get("token_count") or count_tokens(chunk["text"]) for chunk in removed
+    )
+    model = embedding_model()
+    # Each vector costs 4 bytes per dimension plus its text and metadata
+    vector_bytes = embedding_dimension(model) * 4
+    index_bytes_saved = sum(
+        vector_bytes + len(chunk["text"].encode()) + len(json.dumps(chunk["metadata"]))
+        for chunk in removed
+    )
+    seconds = time.perf_counter() - start
+    report = {
+        "threshold": detector.threshold,
+        "chunks_in": len(chunks),
+        "chunks_out": len(kept),
+        "collapsed": len(removed),
+        "groups": len(duplicates),
+        "tokens_saved": tokens_saved,
+        "embedding_cost_saved_usd": round(tokens_saved / 1_000_000 * embedding_price(model), 4),
+        "index_bytes_saved": index_bytes_saved,
+        "seconds": round(seconds, 2),
+        "chunks_per_sec": round(len(chunks) / seconds, 1) if seconds > 0 else None
+    }
+    return kept, report
+
+
+def print_report(report: Dict):
+    print(f"🧬 Deduplicated {report['chunks_in']} chunks -> {report['chunks_out']} "
+          f"({report['collapsed']} collapsed into {report['groups']} groups, "
+          f"{report['chunks_per_sec'] or 0:,.0f} chunks/s)")
+    print(f"   Saved ~{report['tokens_saved']:,} embedding tokens "
+          f"(${report['embedding_cost_saved_usd']:.4f}) and "
+          f"{report['index_bytes_saved'] / 1e6:.2f} MB of index")
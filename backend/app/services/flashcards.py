@@ -0,0 +1,342 @@
+"""Spaced-repetition flashcards: SM-2 scheduling, per-user due heaps, SQLite persistence.
+
+Cards come from the question bank (question and options on the front,
+answer and explanation on the back) and from study-guide chunks that
+carry a section heading. Each user's reviewed cards sit in a min-heap
+keyed by due time, so finding the next card is O(log n) however many
+card states there are. A user's states are loaded from the store on first
+access; each review is written through.
+"""
+import heapq
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from services.grading import LETTERS
+from services.question_bank import QuestionBank, load_processed_chunks
+
+DAY = 86400.0
+# A failed card comes back after this many seconds, not a day later
+RELEARN_DELAY = 600.0
+
+# Review ratings and the SM-2 quality (0-5) each maps to
+RATINGS = {"again": 1, "hard": 3, "good": 4, "easy": 5}
+
+
+def cards_from_questions(questions: List[Dict]) -> List[Dict]:
+    cards = []
+    for question in questions:
+        answer = "; ".join(f"{LETTERS[i]}. {question['options'][i]}" for i in question["answer"])
+        cards.append({
+            "card_id": question["id"],
+            "front": question["question"],
+            "options": question["options"],
+            "back": answer,
+            "explanation": question.get("explanation") or "",
+            "source": question["source"]
+        })
+    return cards
+
+
+def cards_from_chunks(chunks: List[Dict]) -> List[Dict]:
+    """Study-guide chunks with a section heading become "explain <heading>" cards."""
+    cards = []
+    for chunk in chunks:
+        metadata = chunk["metadata"]
+        heading = (metadata.get("heading") or "").strip()
+        if metadata.get("doc_type") != "study_guide" or not heading:
+            continue
+        cards.append({
+            "card_id": f"{metadata.get('filename', 'unknown')}#{chunk['chunk_id']}",
+            "front": heading,
+            "options": None,
+            "back": chunk["text"],
+            "explanation": "",
+            "source": metadata.get("filename", "unknown")
+        })
+    return cards
+
+
+def build_deck(question_bank: QuestionBank, processed_dir) -> List[Dict]:
+    """Question-bank cards (one per distinct question) followed by study-guide cards."""
+    cards, seen = [], set()
+    for card in cards_from_questions(question_bank.questions):
+        if card["front"].lower() not in seen:
+            seen.add(card["front"].lower())
+            cards.append(card)
+    return cards + cards_from_chunks(load_processed_chunks(processed_dir))
+
+
+class CardState:
+    """SM-2 state of one card for one user."""
+
+    __slots__ = ("ease", "interval", "repetitions", "lapses", "due", "last_review", "introduced")
+
+    def __init__(self, ease=2.5, interval=0.0, repetitions=0, lapses=0, due=0.0, last_review=None, introduced=None):
+        self.ease = ease
+        self.interval = interval  # days
+        self.repetitions = repetitions
+        self.lapses = lapses
+        self.due = due
+        self.last_review = last_review
+        self.introduced = introduced
+
+    def review(self, quality: int, now: float):
+        """Apply one SM-2 review with quality 0-5."""
+        if quality < 3:
+            self.repetitions = 0
+            self.lapses += 1
+            self.interval = 0.0
+            self.due = now + RELEARN_DELAY
+        else:
+            if self.repetitions == 0:
+                self.interval = 1.0
+            elif self.repetitions == 1:
+                self.interval = 6.0
+            else:
+                self.interval = round(self.interval * self.ease, 2)
+            self.repetitions += 1
+            self.due = now + self.interval * DAY
+        self.ease = max(1.3, self.ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+        self.last_review = now
+        if self.introduced is None:
+            self.introduced = now
+
+    def to_dict(self) -> Dict:
+        return {
+            "ease": round(self.ease, 3),
+            "interval_days": self.interval,
+            "repetitions": self.repetitions,
+            "lapses": self.lapses,
+            "due": self.due,
+            "last_review": self.last_review
+        }
+
+
+class FlashcardStore:
+    """Card states in SQLite, one row per (user, card)."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS card_states (
+                user_id TEXT NOT NULL,
+                card_id TEXT NOT NULL,
+                ease REAL NOT NULL,
+                interval REAL NOT NULL,
+                repetitions INTEGER NOT NULL,
+                lapses INTEGER NOT NULL,
+                due REAL NOT NULL,
+                last_review REAL,
+                introduced REAL,
+                PRIMARY KEY (user_id, card_id)
+            )"""
+        )
+
+    def load_user(self, user_id: str) -> Dict[str, CardState]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT card_id, ease, interval, repetitions, lapses, due, last_review, introduced "
+                "FROM card_states WHERE user_id = ?",
+                (user_id,)
+            ).fetchall()
+        return {row[0]: CardState(*row[1:]) for row in rows}
+
+    def put_many(self, rows: List[Tuple[str, str, CardState]]):
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO card_states VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (user_id, card_id, s.ease, s.interval, s.repetitions, s.lapses, s.due, s.last_review, s.introduced)
+                    for user_id, card_id, s in rows
+                ]
+            )
+            self._conn.execute("COMMIT")
+
+    def put(self, user_id: str, card_id: str, state: CardState):
+        self.put_many([(user_id, card_id, state)])
+
+    def count(self) -> Tuple[int, int]:
+        """(card states, users)."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT user_id) FROM card_states"
+            ).fetchone()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class UserQueue:
+    """One user's card states and their due-time heap."""
+
+    def __init__(self, states: Dict[str, CardState]):
+        self.states = states
+        # (due, card_id); entries go stale when a card is re-reviewed and
+        # are dropped lazily when they reach the top
+        self.rebuild()
+        self.new_cursor = 0  # deck position before which every card has been seen
+        self._day = None
+        self._introduced_today = 0
+
+    def rebuild(self):
+        self.heap = [(state.due, card_id) for card_id, state in self.states.items()]
+        heapq.heapify(self.heap)
+
+    def push(self, card_id: str, state: CardState):
+        heapq.heappush(self.heap, (state.due, card_id))
+        # Rebuild when stale entries outnumber live ones, so the heap stays O(states)
+        if len(self.heap) > 2 * len(self.states) + 64:
+            self.rebuild()
+
+    def peek(self, deck: Dict[str, Dict]) -> Optional[Tuple[float, str]]:
+        """Earliest-due (due, card_id) still in the deck."""
+        heap = self.heap
+        while heap:
+            due, card_id = heap[0]
+            state = self.states.get(card_id)
+            if state is not None and state.due == due and card_id in deck:
+                return heap[0]
+            heapq.heappop(heap)
+        return None
+
+    def introduced_today(self, day_start: float) -> int:
+        """New cards first reviewed since day_start (rescanned once per day)."""
+        if self._day != day_start:
+            self._day = day_start
+            self._introduced_today = sum(
+                1 for state in self.states.values() if state.introduced and state.introduced >= day_start
+            )
+        return self._introduced_today
+
+    def note_introduced(self, now: float):
+        if self._day is not None and now >= self._day:
+            self._introduced_today += 1
+
+
+class FlashcardScheduler:
+    """
+    Picks each user's next card and applies reviews.
+
+    Due cards come first (most overdue first); when none are due, unseen
+    cards are introduced in deck order, up to new_per_day per user.
+    """
+
+    def __init__(
+        self,
+        cards: List[Dict],
+        store: FlashcardStore,
+        new_per_day: int = 20,
+        max_loaded_users: int = 10000
+    ):
+        self.store = store
+        self.new_per_day = new_per_day
+        self.max_loaded_users = max_loaded_users
+        self._lock = threading.Lock()
+        # Least recently active users are dropped first; every review is
+        # already in the store, so they simply reload on their next request
+        self._users: "OrderedDict[str, UserQueue]" = OrderedDict()
+        self.reviews = 0
+        self.set_deck(cards)
+
+    @classmethod
+    def from_env(cls, cards: List[Dict], default_path) -> "FlashcardScheduler":
+        """Store path from $FLASHCARD_DB; daily new-card limit from $FLASHCARD_NEW_PER_DAY."""
+        store = FlashcardStore(os.getenv("FLASHCARD_DB", str(default_path)))
+        return cls(cards, store, new_per_day=int(os.getenv("FLASHCARD_NEW_PER_DAY", "20")))
+
+    def set_deck(self, cards: List[Dict]):
+        """Replace the deck (e.g. after ingestion); review history is kept."""
+        with self._lock:
+            self.deck = {card["card_id"]: card for card in cards}
+            self.order = [card["card_id"] for card in cards]
+            for queue in self._users.values():
+                queue.new_cursor = 0
+                queue.rebuild()
+
+    def _queue(self, user_id: str) -> UserQueue:
+        queue = self._users.get(user_id)
+        if queue is None:
+            queue = self._users[user_id] = UserQueue(self.store.load_user(user_id))
+            if len(self._users) > self.max_loaded_users:
+                self._users.popitem(last=False)
+        else:
+            self._users.move_to_end(user_id)
+        return queue
+
+    def _next_new(self, queue: UserQueue) -> Optional[str]:
+        while queue.new_cursor < len(self.order):
+            card_id = self.order[queue.new_cursor]
+            if card_id not in queue.states:
+                return card_id
+            queue.new_cursor += 1
+        return None
+
+    def next_card(self, user_id: str, now: Optional[float] = None) -> Dict:
+        """The card to show now, plus queue counts; "card" is None when nothing is due."""
+        now = time.time() if now is None else now
+        with self._lock:
+            queue = self._queue(user_id)
+            top = queue.peek(self.deck)
+            card_id, is_new = None, False
+            if top is not None and top[0] <= now:
+                card_id = top[1]
+            else:
+                day_start = now - now % DAY
+                if queue.introduced_today(day_start) < self.new_per_day:
+                    card_id = self._next_new(queue)
+                    is_new = card_id is not None
+
+            state = queue.states.get(card_id) if card_id else None
+            return {
+                "card": {**self.deck[card_id], "is_new": is_new, **(state or CardState()).to_dict()} if card_id else None,
+                "next_due": top[0] if top is not None else None,
+                "reviewed_cards": len(queue.states),
+                "new_remaining": len(self.order) - len(queue.states)
+            }
+
+    def review(self, user_id: str, card_id: str, quality: int, now: Optional[float] = None) -> Dict:
+        """Record a review (SM-2 quality 0-5) and return the card's new schedule."""
+        if card_id not in self.deck:
+            raise KeyError(card_id)
+        if not 0 <= quality <= 5:
+            raise ValueError(f"quality must be 0-5, got {quality}")
+        now = time.time() if now is None else now
+        with self._lock:
+            queue = self._queue(user_id)
+            state = queue.states.get(card_id)
+            if state is None:
+                state = queue.states[card_id] = CardState()
+                queue.note_introduced(now)
+            state.review(quality, now)
+            queue.push(card_id, state)
+            self.reviews += 1
+            self.store.put(user_id, card_id, state)
+        return {"card_id": card_id, **state.to_dict()}
+
+    def evict(self, user_id: str):
+        """Drop a user's in-memory queue; it is reloaded from the store on next access."""
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            loaded_states = sum(len(queue.states) for queue in self._users.values())
+            return {
+                "deck_size": len(self.order),
+                "loaded_users": len(self._users),
+                "loaded_card_states": loaded_states,
+                "reviews": self.reviews,
+                "new_per_day": self.new_per_day
+            }
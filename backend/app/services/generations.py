@@ -0,0 +1,173 @@
+"""Hot-swappable generations of a long-lived object, with reference-counted leases.
+
+The API serves every request from the engine generation that was current
+when the request started:
+
+    lease = generations.checkout()
+    try:
+        lease.value.query(...)
+    finally:
+        lease.release()
+
+reload() builds the next generation on a background thread while the
+current one keeps serving, then swaps it in under a lock. The old
+generation is retired: it takes no new requests, and its release hook
+runs when the last request still holding it finishes, which frees its
+memory without ever pulling data out from under an in-flight request.
+"""
+import threading
+import time
+import traceback
+from typing import Any, Callable, Dict, List, Optional
+
+
+class Generation:
+    """One loaded generation and the requests holding it."""
+
+    def __init__(self, number: int, value: Any):
+        self.number = number
+        self.value = value
+        self.loaded_at = time.time()
+        self.refs = 0
+        self.retired = False
+
+
+class Lease:
+    """A request's hold on one generation. release() may be called from any thread, more than once."""
+
+    def __init__(self, manager: "GenerationManager", generation: Generation):
+        self._manager = manager
+        self.generation = generation
+        self.value = generation.value
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._manager._release(self.generation)
+
+    def __enter__(self) -> Any:
+        return self.value
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+class GenerationManager:
+    """
+    Holds the current generation and builds the next one on demand.
+
+    Args:
+        loader: Builds a new value from the current one (None when there
+                is no current value); runs on the reload thread
+        release: Frees a retired value once no request holds it
+        on_swap: Called with (new, old) values right after a swap
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[Optional[Any]], Any],
+        release: Optional[Callable[[Any], None]] = None,
+        on_swap: Optional[Callable[[Any, Optional[Any]], None]] = None
+    ):
+        self.loader = loader
+        self.release_hook = release
+        self.on_swap = on_swap
+        self._lock = threading.Lock()
+        self._current: Optional[Generation] = None
+        self._retired: List[Generation] = []
+        self._next_number = 1
+        self._loader_thread: Optional[threading.Thread] = None
+        self.last_reload: Optional[Dict] = None
+
+    @property
+    def current(self) -> Optional[Any]:
+        """The current value, without a lease (for state shared by every generation)."""
+        generation = self._current
+        return generation.value if generation is not None else None
+
+    @property
+    def generation(self) -> Optional[int]:
+        generation = self._current
+        return generation.number if generation is not None else None
+
+    def install(self, value: Any) -> Generation:
+        """Make value the current generation immediately (e.g. the one built at startup)."""
+        with self._lock:
+            generation = Generation(self._next_number, value)
+            self._next_number += 1
+            old, self._current = self._current, generation
+            if old is not None:
+                old.retired = True
+                self._retired.append(old)
+        if self.on_swap:
+            self.on_swap(value, old.value if old is not None else None)
+        if old is not None:
+            self._release(old, acquired=False)
+        return generation
+
+    def checkout(self) -> Optional[Lease]:
+        """Lease on the current generation, or None when there is none."""
+        with self._lock:
+            generation = self._current
+            if generation is None:
+                return None
+            generation.refs += 1
+        return Lease(self, generation)
+
+    def _release(self, generation: Generation, acquired: bool = True):
+        with self._lock:
+            if acquired:
+                generation.refs -= 1
+            if not (generation.retired and generation.refs == 0 and generation in self._retired):
+                return
+            self._retired.remove(generation)
+        if self.release_hook:
+            self.release_hook(generation.value)
+
+    @property
+    def loading(self) -> bool:
+        thread = self._loader_thread
+        return thread is not None and thread.is_alive()
+
+    def reload(self) -> bool:
+        """Start building the next generation in the background; False if a reload is already running."""
+        with self._lock:
+            if self.loading:
+                return False
+            self.last_reload = {"started_at": time.time(), "state": "loading"}
+            self._loader_thread = threading.Thread(target=self._load, name="generation-loader", daemon=True)
+            self._loader_thread.start()
+        return True
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait for a running reload; True once none is running."""
+        thread = self._loader_thread
+        if thread is not None:
+            thread.join(timeout)
+        return not self.loading
+
+    def _load(self):
+        started = time.perf_counter()
+        status = self.last_reload
+        try:
+            value = self.loader(self.current)
+        except Exception as e:
+            traceback.print_exc()
+            status.update(state="failed", error=str(e), seconds=round(time.perf_counter() - started, 3))
+            return
+        generation = self.install(value)
+        status.update(state="completed", generation=generation.number, seconds=round(time.perf_counter() - started, 3))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            current = self._current
+            return {
+                "generation": current.number if current is not None else None,
+                "loaded_at": current.loaded_at if current is not None else None,
+                "in_flight": current.refs if current is not None else 0,
+                "loading": self.loading,
+                # Swapped out, waiting for their last requests
+                "draining": [{"generation": g.number, "in_flight": g.refs} for g in self._retired],
+                "last_reload": dict(self.last_reload) if self.last_reload else None
+            }
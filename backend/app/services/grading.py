@@ -0,0 +1,270 @@
+"""Answer-key grading for quizzes: single submissions and whole classes, no LLM calls.
+
+An AnswerKey is built when a quiz is generated. Each distinct answer
+string is resolved once per question to a bitmask of the options it names
+("B", "b)", "Option 2", the option's text in any case or spacing, or
+several of those for select-two questions). A class's submissions become
+a matrix of ids into that vocabulary, graded with array operations.
+"""
+import re
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from services.question_bank import squash
+
+LETTERS = "ABCDEFGHIJ"
+PASSING_SCORE = 70.0
+# Cached answer resolutions per quiz; answers are user text, so the cache starts over when full
+MAX_CACHED_ANSWERS = 50_000
+
+_LETTER_RE = re.compile(r"^(?:option\s+)?\(?([a-j])\)?[.):]?$")
+_NUMBER_RE = re.compile(r"^(?:option\s+)?\(?(\d{1,2})\)?[.):]?$")
+_LABEL_PREFIX_RE = re.compile(r"^(?:option\s+)?\(?([a-j]|\d{1,2})[.)]\s+")
+_MULTI_SPLIT_RE = re.compile(r"\s*(?:[,;/&+]|\band\b)\s*")
+_LETTER_RUN_RE = re.compile(r"^[a-j](?:\s*[a-j])+$")
+_EDGE_PUNCTUATION = " .,;:!?\"'`"
+# Option letters that are also words
+_WORD_LETTERS = ("a", "i")
+
+# Resolutions of answers that name no option
+BLANK = 0
+UNRECOGNISED = -1
+
+
+def normalize_answer(text: Optional[str]) -> str:
+    """Case-folded, whitespace-collapsed answer with surrounding punctuation removed."""
+    if not text:
+        return ""
+    text = text.replace("’", "'").replace("–", "-").replace("—", "-")
+    return squash(text).strip(_EDGE_PUNCTUATION)
+
+
+class Vocabulary:
+    """Distinct answers in one grading call: (question, normalized answer) -> id."""
+
+    def __init__(self, key: "AnswerKey"):
+        self.key = key
+        self.ids: Optional[np.ndarray] = None
+        self._lookup: Dict[tuple, int] = {}
+        self.question: List[int] = []
+        self.mask: List[int] = []
+        self.text: List[str] = []
+
+    def answer_id(self, index: int, raw: Optional[str]) -> int:
+        answer = normalize_answer(raw)
+        lookup = (index, answer)
+        answer_id = self._lookup.get(lookup)
+        if answer_id is None:
+            answer_id = len(self.text)
+            self._lookup[lookup] = answer_id
+            self.question.append(index)
+            self.mask.append(self.key.resolve_cached(index, answer))
+            self.text.append(answer)
+        return answer_id
+
+
+class AnswerKey:
+    """
+    Normalized answer key for one quiz, with a cache of resolved answers.
+
+    Safe to share between threads: each grade() call builds its own
+    vocabulary, and the resolution caches are locked.
+    """
+
+    def __init__(self, questions: List[Dict]):
+        """
+        Args:
+            questions: [{"question_id", "options", "answer" (option indices),
+                         "explanation"}]; questions without options or an
+                         answer are shown but not graded
+        """
+        self.questions = questions
+        self.question_ids = [q["question_id"] for q in questions]
+        self._positions = {question_id: index for index, question_id in enumerate(self.question_ids)}
+        self.options = [[normalize_answer(o) for o in q.get("options") or []] for q in questions]
+        self.masks = np.array(
+            [sum(1 << i for i in q.get("answer") or []) for q in questions], dtype=np.int64
+        )
+        self.gradable = self.masks > 0
+
+        # Shared by every request grading this quiz, so bounded and locked:
+        # (question, normalized answer) -> option mask / out-of-range flag
+        self._resolved: Dict[tuple, int] = {}
+        self._range_checks: Dict[tuple, bool] = {}
+        self._cache_lock = threading.Lock()
+
+    @classmethod
+    def from_quiz(cls, quiz: Dict) -> "AnswerKey":
+        return cls(quiz.get("answer_key") or [
+            {"question_id": q["id"], "options": q.get("options")} for q in quiz["questions"]
+        ])
+
+    def resolve(self, index: int, answer: str) -> int:
+        """Bitmask of the options a normalized answer names, BLANK or UNRECOGNISED."""
+        if not answer:
+            return BLANK
+        options = self.options[index]
+        if not options:
+            return UNRECOGNISED
+
+        exact = self._option_index(options, answer)
+        if exact is not None:
+            return 1 << exact
+        if bin(int(self.masks[index])).count("1") < 2:
+            return UNRECOGNISED
+        # Select-N questions: "A, C", "AC", "2 and 4", or option texts separated by ";"
+        if _LETTER_RUN_RE.match(answer):
+            parts = answer.replace(" ", "")
+        else:
+            parts = _MULTI_SPLIT_RE.split(answer)
+        mask = 0
+        for part in parts:
+            if not part:
+                continue
+            option = self._option_index(options, part)
+            if option is None:
+                return UNRECOGNISED
+            mask |= 1 << option
+        return mask
+
+    def resolve_cached(self, index: int, answer: str) -> int:
+        return self._cached(self._resolved, (index, answer), lambda: self.resolve(index, answer))
+
+    @staticmethod
+    def _option_index(options: List[str], answer: str) -> Optional[int]:
+        match = _LETTER_RE.match(answer)
+        if match:
+            position = ord(match.group(1)) - ord("a")
+            return position if position < len(options) else None
+        match = _NUMBER_RE.match(answer)
+        if match:
+            position = int(match.group(1)) - 1
+            return position if 0 <= position < len(options) else None
+        if answer in options:
+            return options.index(answer)
+        # "B. <option text>" or "2) <option text>"
+        stripped = _LABEL_PREFIX_RE.sub("", answer)
+        if stripped != answer and stripped in options:
+            return options.index(stripped)
+        return None
+
+    def check(self, answers: Dict[str, str]) -> Dict[str, List[str]]:
+        """
+        Problems with a submission, empty when there are none: question ids
+        not in the quiz, and answers naming an option label past the end of
+        the question's options ("E" or "5" on a 4-option question), which
+        grade as wrong. An unrecognised free-text answer is just wrong.
+        """
+        problems: Dict[str, List[str]] = {}
+        for question_id, raw in answers.items():
+            index = self._positions.get(question_id)
+            if index is None:
+                problems.setdefault("unknown_question_ids", []).append(question_id)
+            elif self._out_of_range(index, raw):
+                problems.setdefault("out_of_range_answers", []).append(question_id)
+        return problems
+
+    def _cached(self, cache: Dict[tuple, object], key: tuple, compute):
+        with self._cache_lock:
+            if key in cache:
+                return cache[key]
+        value = compute()
+        with self._cache_lock:
+            if len(cache) >= MAX_CACHED_ANSWERS:
+                cache.clear()
+            cache[key] = value
+        return value
+
+    def _out_of_range(self, index: int, raw: Optional[str]) -> bool:
+        answer = normalize_answer(raw)
+        return self._cached(
+            self._range_checks, (index, answer), lambda: self._names_missing_option(index, answer)
+        )
+
+    def _names_missing_option(self, index: int, answer: str) -> bool:
+        options = self.options[index]
+        if not answer or not options:
+            return False
+        parts = answer.replace(" ", "") if _LETTER_RUN_RE.match(answer) else _MULTI_SPLIT_RE.split(answer)
+        for part in parts:
+            match = _LETTER_RE.match(part)
+            # A bare "I" past the options is the word, not option I
+            if match and part not in _WORD_LETTERS and ord(match.group(1)) - ord("a") >= len(options):
+                return True
+            match = _NUMBER_RE.match(part)
+            if match and not 1 <= int(match.group(1)) <= len(options):
+                return True
+        return False
+
+    def encode(self, submissions: List[Dict[str, str]]) -> "Vocabulary":
+        """(submissions x questions) matrix of answer ids, with the vocabulary they index."""
+        vocabulary = Vocabulary(self)
+        vocabulary.ids = np.empty((len(submissions), len(self.question_ids)), dtype=np.int32)
+        for row, answers in enumerate(submissions):
+            for column, question_id in enumerate(self.question_ids):
+                vocabulary.ids[row, column] = vocabulary.answer_id(column, answers.get(question_id))
+        return vocabulary
+
+    def label(self, index: int, mask: int) -> str:
+        """Human-readable answer for an option bitmask: "C. <option text>"."""
+        options = self.questions[index].get("options") or []
+        picked = [i for i in range(len(options)) if mask >> i & 1]
+        return "; ".join(f"{LETTERS[i]}. {options[i]}" for i in picked)
+
+    def grade(self, submissions: List[Dict[str, str]], top_wrong: int = 3) -> Dict:
+        """
+        Grade a batch of submissions.
+
+        Returns per-submission scores (percent of gradable questions) and a
+        per-question rollup: percent correct, blanks, and the most common
+        wrong answers.
+        """
+        vocabulary = self.encode(submissions)
+        ids = vocabulary.ids
+        masks = np.array(vocabulary.mask, dtype=np.int64)
+        question_of = np.array(vocabulary.question, dtype=np.int64)
+
+        correct = masks[ids] == self.masks[None, :]
+        correct &= self.gradable[None, :]
+        blank = masks[ids] == BLANK
+
+        gradable_count = int(self.gradable.sum())
+        correct_counts = correct.sum(axis=1)
+        scores = correct_counts * 100.0 / gradable_count if gradable_count else np.zeros(len(submissions))
+
+        wrong = ~correct & ~blank & self.gradable[None, :]
+        wrong_counts = np.bincount(ids[wrong], minlength=len(masks))
+
+        count = max(len(submissions), 1)
+        question_stats = []
+        for index, question_id in enumerate(self.question_ids):
+            # "b", "B)" and the option text are the same wrong answer
+            tally: Dict[str, list] = {}
+            for i in np.flatnonzero((question_of == index) & (wrong_counts > 0)):
+                recognised = masks[i] > 0
+                answer = self.label(index, int(masks[i])) if recognised else vocabulary.text[i]
+                entry = tally.setdefault(answer, [bool(recognised), 0])
+                entry[1] += int(wrong_counts[i])
+            common = sorted(tally.items(), key=lambda item: -item[1][1])[:top_wrong]
+            question_stats.append({
+                "question_id": question_id,
+                "graded": bool(self.gradable[index]),
+                "correct_answer": self.label(index, int(self.masks[index])) or None,
+                "percent_correct": round(float(correct[:, index].sum()) * 100 / count, 1),
+                "blank": int(blank[:, index].sum()),
+                "common_wrong_answers": [
+                    {"answer": answer, "recognised": recognised, "count": total}
+                    for answer, (recognised, total) in common
+                ]
+            })
+
+        return {
+            "graded_questions": gradable_count,
+            "ids": ids,
+            "correct": correct,
+            "scores": scores,
+            "correct_counts": correct_counts,
+            "question_stats": question_stats
+        }
@@ -0,0 +1,259 @@
+"""Background ingestion jobs: extract -> chunk -> dedupe -> embed -> upsert."""
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from services.dedup import collapse_duplicates, dedup_enabled, print_report
+from services.response_cache import bump_index_epoch
+from services.service_tagger import ServiceIndex
+from services.tracing import span
+
+
+class JobStage:
+    """Pipeline stages reported by an ingestion job."""
+    QUEUED = "queued"
+    EXTRACTING = "extracting"
+    CHUNKING = "chunking"
+    DEDUPLICATING = "deduplicating"
+    EMBEDDING = "embedding"
+    INDEXING = "indexing"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class IngestionJob:
+    """Progress and throughput for one ingestion run."""
+
+    def __init__(self, job_id: str, files: List[str]):
+        self.job_id = job_id
+        self.files = files
+        self.stage = JobStage.QUEUED
+        self.current_file: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self.reload_error: Optional[str] = None
+
+        self.files_done = 0
+        self.pages_done = 0
+        self.pages_total = 0
+        self.chunks_total = 0
+        self.chunks_uploaded = 0
+        self.chunks_collapsed = 0
+
+        # Wall time spent in each throughput-relevant stage
+        self.extract_seconds = 0.0
+        self.upload_seconds = 0.0
+        self._stage_start = 0.0
+        self._lock = threading.Lock()
+
+    def set_stage(self, stage: str):
+        with self._lock:
+            now = time.time()
+            self._close_stage(now)
+            self.stage = stage
+            self._stage_start = now
+
+    def _close_stage(self, now: float):
+        if self.stage == JobStage.EXTRACTING:
+            self.extract_seconds += now - self._stage_start
+        elif self.stage == JobStage.EMBEDDING:
+            self.upload_seconds += now - self._stage_start
+
+    def finish(self, stage: str, error: Optional[str] = None):
+        self.set_stage(stage)
+        self.error = error
+        self.finished_at = time.time()
+
+    def _rate(self, count: int, seconds: float, active: bool) -> float:
+        if active:
+            seconds += time.time() - self._stage_start
+        return round(count / seconds, 2) if seconds > 0 else 0.0
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            end = self.finished_at or time.time()
+            return {
+                "job_id": self.job_id,
+                "stage": self.stage,
+                "files": [Path(f).name for f in self.files],
+                "current_file": self.current_file,
+                "files_done": self.files_done,
+                "pages_done": self.pages_done,
+                "pages_total": self.pages_total,
+                "chunks_total": self.chunks_total,
+                "chunks_uploaded": self.chunks_uploaded,
+                "chunks_collapsed": self.chunks_collapsed,
+                "pages_per_sec": self._rate(
+                    self.pages_done, self.extract_seconds, self.stage == JobStage.EXTRACTING
+                ),
+                "chunks_per_sec": self._rate(
+                    self.chunks_uploaded, self.upload_seconds, self.stage == JobStage.EMBEDDING
+                ),
+                "elapsed_sec": round(end - (self.started_at or end), 2),
+                "created_at": self.created_at,
+                "finished_at": self.finished_at,
+                "error": self.error,
+                "reload_error": self.reload_error
+            }
+
+
+class IngestionManager:
+    """
+    Runs ingestion jobs on a small background worker pool.
+
+    Heavy dependencies (pdfplumber, the embedding client, Pinecone) are only
+    created the first time a job runs, so the API process doesn't pay for
+    them at startup and serving threads are never used for ingestion.
+
+    With local_index_path set (VECTOR_BACKEND=local) chunks are not sent to
+    Pinecone: each job publishes a new generation of the local index, the
+    live build with the job's files replaced, for the API to hot-reload.
+    """
+
+    def __init__(
+        self,
+        processed_dir: Path,
+        max_workers: int = 1,
+        on_complete: Optional[Callable[[IngestionJob], None]] = None,
+        local_index_path: Optional[Path] = None
+    ):
+        self.processed_dir = Path(processed_dir)
+        self.local_index_path = local_index_path
+        self.on_complete = on_complete
+        self.jobs: Dict[str, IngestionJob] = {}
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest")
+        self._processor = None
+        self._vector_manager = None
+        self._init_lock = threading.Lock()
+        self._index_lock = threading.Lock()
+
+    def submit(self, files: List[str]) -> IngestionJob:
+        """Queue a job for the given PDF paths."""
+        job = IngestionJob(str(uuid.uuid4()), files)
+        self.jobs[job.job_id] = job
+        self.pool.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        return self.jobs.get(job_id)
+
+    def _components(self):
+        with self._init_lock:
+            if self._processor is None:
+                from pdf_processor import PDFProcessor
+                from vector_store import VectorStoreManager
+
+                self._processor = PDFProcessor(chunk_size=1000, chunk_overlap=200)
+                self._vector_manager = VectorStoreManager(require_pinecone=self.local_index_path is None)
+                if self.local_index_path is None:
+                    self._vector_manager.create_index()
+        return self._processor, self._vector_manager
+
+    def _run(self, job: IngestionJob):
+        job.started_at = time.time()
+        try:
+            # Root span of the job's trace; "job.id" is copied to every span below it
+            with span("ingest.job", **{"job.id": job.job_id}, files=len(job.files)) as job_trace:
+                processor, vector_manager = self._components()
+
+                all_chunks = []
+                for path in job.files:
+                    job.current_file = Path(path).name
+                    job.set_stage(JobStage.EXTRACTING)
+                    pages_before = job.pages_done
+
+                    def on_page(done: int, total: int):
+                        if done == 1:
+                            job.pages_total += total
+                        job.pages_done = pages_before + done
+
+                    chunks = processor.process_pdf(path, progress=on_page)
+                    job.set_stage(JobStage.CHUNKING)
+                    processor.save_chunks(chunks, str(self.processed_dir / f"{Path(path).stem}_chunks.json"))
+                    all_chunks.extend(chunks)
+                    job.chunks_total = len(all_chunks)
+                    job.files_done += 1
+
+                job.current_file = None
+                if dedup_enabled():
+                    job.set_stage(JobStage.DEDUPLICATING)
+                    with span("dedup", chunks=len(all_chunks)) as trace:
+                        all_chunks, report = collapse_duplicates(all_chunks)
+                        trace.set(collapsed=report["collapsed"])
+                    print_report(report)
+                    job.chunks_collapsed = report["collapsed"]
+                    job.chunks_total = len(all_chunks)
+
+                job.set_stage(JobStage.EMBEDDING)
+
+                def on_batch(done: int, total: int):
+                    job.chunks_uploaded = done
+
+                if self.local_index_path is None:
+                    vector_manager.upload_documents(all_chunks, batch_size=50, progress=on_batch)
+                else:
+                    self._publish_local(job, vector_manager, all_chunks, on_batch)
+
+                job.set_stage(JobStage.INDEXING)
+                with span("index.services"):
+                    self._update_service_index(job, all_chunks)
+                # Cached answers predate this content
+                bump_index_epoch(self.processed_dir)
+
+                job_trace.set(chunks=job.chunks_total, pages=job.pages_done)
+        except Exception as e:
+            traceback.print_exc()
+            job.finish(JobStage.FAILED, error=str(e))
+            return
+
+        # The index already holds the job's chunks: a failed reload doesn't fail the job
+        job.finish(JobStage.COMPLETED)
+        if self.on_complete:
+            try:
+                self.on_complete(job)
+            except Exception as e:
+                traceback.print_exc()
+                job.reload_error = str(e)
+
+    def _publish_local(self, job: IngestionJob, vector_manager, chunks: List[Dict], on_batch):
+        """Embed the job's chunks and publish them in a new local index generation."""
+        from vector_store import merge_local_index
+
+        vectors, records = vector_manager.embed_local_records(chunks, batch_size=50, progress=on_batch)
+        # One merge at a time: each reads the live generation it replaces
+        with self._index_lock, span("index.local", chunks=len(records)) as trace:
+            generation = merge_local_index(
+                self.local_index_path, vectors, records, replace_files=[Path(f).name for f in job.files]
+            )
+            trace.set(generation=generation.name)
+
+    def _update_service_index(self, job: IngestionJob, chunks: List[Dict]):
+        """Merge the job's chunks into the on-disk service index."""
+        path = self.processed_dir / "service_index.json"
+        with self._index_lock:
+            service_index = ServiceIndex.load_or_empty(path)
+            for file_path in job.files:
+                service_index.remove_file(Path(file_path).name)
+            service_index.add_chunks(chunks)
+            service_index.save(str(path))
+
+    def stats(self) -> Dict:
+        stages = [job.stage for job in self.jobs.values()]
+        return {
+            "total_jobs": len(stages),
+            "running": sum(s not in (JobStage.QUEUED, JobStage.COMPLETED, JobStage.FAILED) for s in stages),
+            "queued": stages.count(JobStage.QUEUED),
+            "failed": stages.count(JobStage.FAILED)
+        }
+
+
+def ingest_workers() -> int:
+    """Worker pool size for ingestion jobs."""
+    return int(os.getenv("INGEST_WORKERS", "1"))
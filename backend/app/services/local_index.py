@@ -0,0 +1,293 @@
+"""Local vector index with int8 / binary quantization and full-precision rescoring."""
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+INDEX_VERSION = 1
+MODES = ("float32", "int8", "binary")
+
+# Rows scored per step: the int8 -> float32 conversion of each block stays
+# in cache, which keeps int8 scoring on par with float32 BLAS
+_BLOCK_ROWS = 128
+
+# Generations: an index root holds numbered builds (gen-0001, gen-0002, ...)
+# and a CURRENT file naming the live one. A rebuild never overwrites files
+# that a running server has memory-mapped; the server switches to the new
+# generation on a hot reload.
+CURRENT_FILE = "CURRENT"
+KEEP_GENERATIONS = 3
+
+
+def resolve_generation(root) -> Path:
+    """Directory of the live index under root: its CURRENT generation, or root itself."""
+    root = Path(root)
+    pointer = root / CURRENT_FILE
+    if pointer.exists():
+        return root / pointer.read_text(encoding="utf-8").strip()
+    return root
+
+
+def _generation_number(path: Path) -> int:
+    suffix = path.name[len("gen-"):]
+    return int(suffix) if path.name.startswith("gen-") and suffix.isdigit() else -1
+
+
+def publish_generation(root, generation: Path, keep: int = KEEP_GENERATIONS):
+    """Make a generation live (atomic rename of CURRENT), then delete all but the newest `keep`."""
+    root = Path(root)
+    pointer = root / (CURRENT_FILE + ".tmp")
+    pointer.write_text(Path(generation).name, encoding="utf-8")
+    os.replace(pointer, root / CURRENT_FILE)
+    # Servers still on an older generation keep their open files
+    generations = sorted(
+        (p for p in root.iterdir() if p.is_dir() and _generation_number(p) >= 0), key=_generation_number
+    )
+    for old in generations[:-keep]:
+        if old.name != Path(generation).name:
+            shutil.rmtree(old, ignore_errors=True)
+
+
+def popcount64(words: np.ndarray) -> np.ndarray:
+    """Per-element popcount of a uint64 array."""
+    if hasattr(np, "bitwise_count"):  # numpy >= 2.0
+        return np.bitwise_count(words)
+    words = words - ((words >> np.uint64(1)) & np.uint64(0x5555555555555555))
+    words = (words & np.uint64(0x3333333333333333)) + ((words >> np.uint64(2)) & np.uint64(0x3333333333333333))
+    words = (words + (words >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    return (words * np.uint64(0x0101010101010101)) >> np.uint64(56)
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalise rows so dot product equals cosine similarity."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def quantize_int8(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-dimension scalar quantization to int8."""
+    scale = np.abs(vectors).max(axis=0) / 127.0
+    scale[scale == 0] = 1.0
+    codes = np.clip(np.rint(vectors / scale), -127, 127).astype(np.int8)
+    return codes, scale.astype(np.float32)
+
+
+def quantize_binary(vectors: np.ndarray) -> np.ndarray:
+    """1 bit per dimension (sign), packed into uint64 words."""
+    packed = np.packbits(vectors > 0, axis=1)
+    pad = (-packed.shape[1]) % 8
+    if pad:
+        packed = np.pad(packed, ((0, 0), (0, pad)))
+    return np.ascontiguousarray(packed).view(np.uint64)
+
+
+def matches_filter(metadata: Dict, metadata_filter: Optional[Dict]) -> bool:
+    """
+    Evaluate a Pinecone-style metadata filter locally.
+
+    Supports equality, $eq, $ne, $in and $nin; list-valued fields (such as
+    "services") match when any element matches.
+    """
+    if not metadata_filter:
+        return True
+    for field, condition in metadata_filter.items():
+        value = metadata.get(field)
+        values = value if isinstance(value, list) else [value]
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for op, expected in condition.items():
+            if op == "$eq" and expected not in values:
+                return False
+            if op == "$ne" and expected in values:
+                return False
+            if op == "$in" and not any(v in expected for v in values):
+                return False
+            if op == "$nin" and any(v in expected for v in values):
+                return False
+    return True
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first."""
+    if k >= len(scores):
+        return np.argsort(-scores)
+    part = np.argpartition(-scores, k)[:k]
+    return part[np.argsort(-scores[part])]
+
+
+class LocalVectorIndex:
+    """
+    Flat vector index stored on disk under one directory.
+
+    Full-precision vectors live in a memory-mapped float32 file and are only
+    paged in for the rows being rescored. In "int8" mode, candidates are
+    ranked with 1-byte scalar codes (4x smaller); in "binary" mode with
+    1-bit sign codes and Hamming distance (32x smaller). In both cases the
+    top candidates are rescored exactly against the float32 vectors.
+    """
+
+    def __init__(self, path: Path, mode: str = "int8", rescore_factor: int = 10):
+        if mode not in MODES:
+            raise ValueError(f"Unknown index mode '{mode}', expected one of {MODES}")
+        # path may be a generations root; the live generation is opened
+        self.root = Path(path)
+        self.path = resolve_generation(self.root)
+        self.generation = self.path.name if self.path != self.root else None
+        self.mode = mode
+        self.rescore_factor = rescore_factor
+
+        with open(self.path / "meta.json", "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        with open(self.path / "records.json", "r", encoding="utf-8") as f:
+            self.records: List[Dict] = json.load(f)
+
+        self.count = self.meta["count"]
+        self.dimension = self.meta["dimension"]
+        self.vectors = np.memmap(
+            self.path / "vectors.f32", dtype=np.float32, mode="r",
+            shape=(self.count, self.dimension)
+        )
+
+        # Codes are memory-mapped too: opening an index reads no vector data,
+        # and the OS page cache keeps the codes resident once searched
+        self.int8_codes = self.int8_scale = self.binary_codes = None
+        if mode == "int8":
+            self.int8_codes = np.load(self.path / "int8.npy", mmap_mode="r")
+            self.int8_scale = np.load(self.path / "int8_scale.npy")
+        elif mode == "binary":
+            self.binary_codes = np.load(self.path / "binary.npy", mmap_mode="r")
+
+        self._filter_cache: Dict[str, np.ndarray] = {}
+
+    @staticmethod
+    def build(path, vectors, records: List[Dict], modes=MODES, info: Optional[Dict] = None) -> Path:
+        """
+        Write an index directory.
+
+        Args:
+            path: Output directory
+            vectors: (N, D) embeddings, normalised on write
+            records: One {"id", "text", "metadata"} dict per row
+            modes: Quantized code sets to precompute
+            info: Extra fields for meta.json, e.g. {"embedding_model": ...}
+        """
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        vectors = normalize(vectors)
+        if len(vectors) != len(records):
+            raise ValueError(f"{len(vectors)} vectors but {len(records)} records")
+
+        vectors.tofile(path / "vectors.f32")
+        if "int8" in modes:
+            codes, scale = quantize_int8(vectors)
+            np.save(path / "int8.npy", codes)
+            np.save(path / "int8_scale.npy", scale)
+        if "binary" in modes:
+            np.save(path / "binary.npy", quantize_binary(vectors))
+
+        with open(path / "records.json", "w", encoding="utf-8") as f:
+            json.dump(records, f, ensure_ascii=False)
+        with open(path / "meta.json", "w", encoding="utf-8") as f:
+            json.dump({
+                **(info or {}),
+                "version": INDEX_VERSION,
+                "count": int(vectors.shape[0]),
+                "dimension": int(vectors.shape[1]),
+                "modes": [m for m in MODES if m == "float32" or m in modes]
+            }, f, indent=2)
+        return path
+
+    @staticmethod
+    def build_generation(root, vectors, records: List[Dict], modes=MODES, info: Optional[Dict] = None) -> Path:
+        """Write the index as the next generation under root and make it live."""
+        root = Path(root)
+        root.mkdir(parents=True, exist_ok=True)
+        number = max([_generation_number(p) for p in root.iterdir()] + [0]) + 1
+        generation = LocalVectorIndex.build(root / f"gen-{number:04d}", vectors, records, modes, info)
+        publish_generation(root, generation)
+        return generation
+
+    def memory_bytes(self) -> Dict[str, int]:
+        """Resident bytes for the active search codes vs. float32 on disk."""
+        resident = {
+            "float32": self.count * self.dimension * 4,
+            "int8": self.count * self.dimension + self.dimension * 4,
+            "binary": self.count * ((self.dimension + 63) // 64) * 8,
+        }[self.mode]
+        return {
+            "mode_resident": resident,
+            "float32_full": self.count * self.dimension * 4
+        }
+
+    def filter_rows(self, metadata_filter: Optional[Dict]) -> Optional[np.ndarray]:
+        """Row ids matching a metadata filter (cached per filter), or None for all rows."""
+        if not metadata_filter:
+            return None
+        key = json.dumps(metadata_filter, sort_keys=True)
+        rows = self._filter_cache.get(key)
+        if rows is None:
+            rows = np.array([
+                i for i, record in enumerate(self.records)
+                if matches_filter(record.get("metadata", {}), metadata_filter)
+            ], dtype=np.int64)
+            self._filter_cache[key] = rows
+        return rows
+
+    def _approx_scores(self, query: np.ndarray, rows: Optional[np.ndarray]) -> np.ndarray:
+        if self.mode == "binary":
+            codes = self.binary_codes if rows is None else self.binary_codes[rows]
+            query_bits = quantize_binary(query[None, :])[0]
+            distance = popcount64(np.bitwise_xor(codes, query_bits)).sum(axis=1, dtype=np.int32)
+            return -distance.astype(np.float32)
+
+        if self.mode == "int8":
+            codes, weights = self.int8_codes, query * self.int8_scale
+        else:
+            codes, weights = self.vectors, query
+        if rows is not None:
+            codes = codes[rows]
+
+        scores = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), _BLOCK_ROWS):
+            block = codes[start:start + _BLOCK_ROWS]
+            scores[start:start + len(block)] = block.astype(np.float32, copy=False) @ weights
+        return scores
+
+    def search(
+        self,
+        query,
+        k: int = 5,
+        metadata_filter: Optional[Dict] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        Return (row, cosine score) pairs for the top-k rows, best first.
+
+        Quantized modes shortlist k * rescore_factor candidates and rescore
+        them against the memory-mapped float32 vectors.
+        """
+        query = normalize(np.asarray(query, dtype=np.float32))
+        rows = self.filter_rows(metadata_filter)
+        if rows is not None and len(rows) == 0:
+            return []
+
+        approx = self._approx_scores(query, rows)
+        if self.mode == "float32":
+            best = top_k(approx, k)
+            candidates = best if rows is None else rows[best]
+            return [(int(row), float(approx[i])) for row, i in zip(candidates, best)]
+
+        shortlist = top_k(approx, max(k, k * self.rescore_factor))
+        candidates = shortlist if rows is None else rows[shortlist]
+        candidates = np.sort(candidates)  # sequential memmap reads
+        exact = np.asarray(self.vectors[candidates]) @ query
+        best = top_k(exact, k)
+        return [(int(candidates[i]), float(exact[i])) for i in best]
+
+    def record(self, row: int) -> Dict:
+        return self.records[row]
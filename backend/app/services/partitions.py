@@ -0,0 +1,125 @@
+"""Index partitioning by document type and certification."""
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+
+DOC_TYPES = ["study_guide", "questions"]
+
+# Filename keywords -> certification code
+CERTIFICATION_PATTERNS = [
+    (r"machine learning|\bmla\b|mla-c01", "mla"),
+    (r"solutions architect professional|\bsap\b|sap-c02", "sap"),
+    (r"solutions architect|\bsaa\b|saa-c03", "saa"),
+    (r"developer|\bdva\b|dva-c02", "dva"),
+    (r"sysops|\bsoa\b|soa-c02", "soa"),
+    (r"cloud practitioner|\bclf\b|clf-c02", "clf"),
+    (r"data engineer|\bdea\b|dea-c01", "dea"),
+    (r"security specialty|\bscs\b|scs-c02", "scs"),
+]
+
+DEFAULT_CERTIFICATION = "general"
+
+# Filename keywords of practice exams and their answer reviews
+QUESTIONS_PATTERN = r"practice|test|exam|quiz|questions|answers"
+
+
+def partition_by_certification() -> bool:
+    """Whether namespaces are split by certification as well as doc_type."""
+    return os.getenv("PINECONE_PARTITION_BY_CERTIFICATION", "false").lower() == "true"
+
+
+def infer_certification(filename: str) -> str:
+    """Guess the certification a PDF belongs to from its filename."""
+    name = filename.lower()
+    for pattern, code in CERTIFICATION_PATTERNS:
+        if re.search(pattern, name):
+            return code
+    return DEFAULT_CERTIFICATION
+
+
+def infer_doc_type(filename: str) -> str:
+    """Guess a PDF's doc_type from its filename: practice exams are "questions"."""
+    return "questions" if re.search(QUESTIONS_PATTERN, filename.lower()) else "study_guide"
+
+
+def partition_namespace(metadata: Dict) -> str:
+    """Pinecone namespace a chunk is stored in."""
+    doc_type = metadata.get("doc_type", "unknown")
+    if partition_by_certification():
+        return f"{doc_type}.{metadata.get('certification', DEFAULT_CERTIFICATION)}"
+    return doc_type
+
+
+class PartitionRouter:
+    """
+    Routes a search to the namespaces that can contain matching chunks.
+
+    Built from the namespaces actually present in the index. An index that
+    was uploaded before partitioning (everything in the default namespace)
+    is still searchable: the doc_type restriction is pushed down as a
+    metadata filter instead. While a migration is partial (the default
+    namespace still holds vectors next to named ones) the default namespace
+    is searched alongside the routed ones, with the same pushed-down filter.
+    """
+
+    def __init__(self, namespaces: Optional[Dict[str, int]] = None):
+        # namespace -> vector count; "" is Pinecone's default namespace
+        self.namespaces = {ns: count for ns, count in (namespaces or {}).items() if count}
+
+    @property
+    def partitioned(self) -> bool:
+        return any(ns for ns in self.namespaces)
+
+    def route(
+        self,
+        doc_types: Optional[List[str]] = None,
+        certification: Optional[str] = None,
+        extra_filter: Optional[Dict] = None
+    ) -> List[Tuple[Optional[str], Optional[Dict]]]:
+        """
+        Return (namespace, metadata_filter) pairs to search.
+
+        Args:
+            doc_types: Restrict to these document types (None for all)
+            certification: Restrict to one certification code
+            extra_filter: Additional metadata filter to AND in
+        """
+        base_filter = dict(extra_filter or {})
+        # Every restriction as a metadata filter, for namespaces that don't encode them
+        pushed_down = dict(base_filter)
+        if doc_types:
+            pushed_down["doc_type"] = {"$in": list(doc_types)}
+        if certification:
+            pushed_down["certification"] = certification
+
+        if not self.partitioned:
+            return [(None, pushed_down or None)]
+
+        routes = []
+        for namespace in sorted(self.namespaces):
+            if not namespace:
+                continue
+            doc_type, _, ns_certification = namespace.partition(".")
+            if doc_types and doc_type not in doc_types:
+                continue
+            if certification and ns_certification and ns_certification != certification:
+                continue
+
+            ns_filter = dict(base_filter)
+            if certification and not ns_certification:
+                ns_filter["certification"] = certification
+            routes.append((namespace, ns_filter or None))
+
+        # Requested partition doesn't exist yet: search every namespace rather
+        # than none, still filtered to the requested doc_types/certification
+        if not routes:
+            routes = [(ns, pushed_down or None) for ns in sorted(self.namespaces) if ns]
+
+        # Not yet migrated out of the default namespace
+        if "" in self.namespaces:
+            routes.append(("", pushed_down or None))
+        return routes
+
+    def stats(self) -> Dict[str, int]:
+        return dict(sorted(self.namespaces.items()))
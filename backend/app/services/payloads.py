@@ -0,0 +1,105 @@
+"""Response payloads: source verbosity, fast JSON encoding and compression.
+
+Source levels, chosen per request with `include_sources`:
+
+    none       no sources (num_sources still counts them)
+    ids        chunk id ("<filename>#<chunk_id>"), doc_type and relevance only
+    excerpts   the first EXCERPT_CHARS characters of each chunk (the default,
+               and what include_sources=true means)
+    full       the whole chunk text
+
+Bodies are encoded with orjson when it is installed, plain json otherwise.
+A body of at least $COMPRESS_MIN_BYTES (default 1024) is compressed for a
+client that accepts it: br when the brotli package is installed, else
+gzip. Smaller bodies are sent as they are; at that size the header and
+the compression call cost about what they save.
+"""
+import gzip
+import json
+import os
+from typing import Dict, List, Optional, Tuple, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+SOURCE_LEVELS = ("none", "ids", "excerpts", "full")
+DEFAULT_SOURCE_LEVEL = "excerpts"
+EXCERPT_CHARS = 300
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+# On answer-sized JSON the gzip ratio stops improving at level 5 (level 1 is
+# about a quarter faster and 4% larger; see bench_payloads.py). Brotli
+# quality 4 is the fast end of its range, meant for per-response use.
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+
+def source_level(include_sources: Union[bool, str, None]) -> str:
+    """Normalise include_sources (a level, or the older true/false) to a level."""
+    if include_sources is None or include_sources is True:
+        return DEFAULT_SOURCE_LEVEL
+    if include_sources is False:
+        return "none"
+    if include_sources not in SOURCE_LEVELS:
+        raise ValueError(f"Unknown source level '{include_sources}', expected one of {SOURCE_LEVELS}")
+    return include_sources
+
+
+def shape_sources(sources: List[Dict], level: str) -> List[Dict]:
+    """Sources (as formatted by the engine, with full text) cut down to a level."""
+    if level == "none":
+        return []
+    if level == "ids":
+        return [
+            {"id": s["id"], "doc_type": s["doc_type"], "chunk_id": s["chunk_id"], "relevance_score": s["relevance_score"]}
+            for s in sources
+        ]
+    if level == "excerpts":
+        return [
+            {**s, "text": s["text"][:EXCERPT_CHARS] + "..."} if len(s["text"]) > EXCERPT_CHARS else s
+            for s in sources
+        ]
+    return sources
+
+
+def shape_result(result: Dict, level: str) -> Dict:
+    """An engine answer with its sources at the given level."""
+    return {**result, "sources": shape_sources(result["sources"], level)}
+
+
+def encode_json(content) -> bytes:
+    """Compact UTF-8 JSON; pydantic models are serialized by pydantic-core."""
+    if hasattr(content, "model_dump_json"):
+        return content.model_dump_json().encode("utf-8")
+    if orjson is not None:
+        return orjson.dumps(content, default=str, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def accepted_encodings(accept_encoding: str) -> set:
+    """Codings named in an Accept-Encoding header, minus any refused with q=0."""
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        if coding and params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            accepted.add(coding)
+    return accepted
+
+
+def compress(body: bytes, accept_encoding: str) -> Tuple[bytes, Optional[str]]:
+    """(body, Content-Encoding) for a client's Accept-Encoding; None when sent as is."""
+    if len(body) < COMPRESS_MIN_BYTES or not accept_encoding:
+        return body, None
+    accepted = accepted_encodings(accept_encoding)
+    if brotli is not None and "br" in accepted:
+        return brotli.compress(body, quality=BROTLI_QUALITY), "br"
+    if "gzip" in accepted or "*" in accepted:
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0), "gzip"
+    return body, None
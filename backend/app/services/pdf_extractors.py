@@ -0,0 +1,138 @@
+"""PDF text extraction backends.
+
+    pypdf       PyPDF2 text extraction; several times faster than pdfplumber
+    pdfplumber  full layout analysis per page; slower, more robust
+    auto        pypdf, re-extracting pages that come back empty or garbled
+                with pdfplumber (default)
+
+Selected per PDFProcessor, or with $PDF_EXTRACTOR.
+"""
+import os
+import re
+import unicodedata
+from typing import Callable, List, Optional
+
+
+EXTRACTORS = ("auto", "pypdf", "pdfplumber")
+
+# pdfminer placeholders for glyphs without a unicode mapping
+_CID_RE = re.compile(r"\(cid:\d+\)")
+
+
+def looks_garbled(text: str) -> bool:
+    """
+    Heuristic check for text a fast extractor got wrong.
+
+    Flags empty pages, unmapped glyphs, control/private-use characters
+    from broken font encodings, and runs of words glued together
+    (missing spaces).
+    """
+    stripped = text.strip()
+    if not stripped:
+        return True
+    if "\ufffd" in stripped or _CID_RE.search(stripped):
+        return True
+    broken = sum(
+        1 for c in stripped
+        if not c.isspace() and unicodedata.category(c) in ("Cc", "Co", "Cn", "Cs")
+    )
+    if broken / len(stripped) > 0.05:
+        return True
+    words = stripped.split()
+    return len(stripped) > 200 and len(stripped) / len(words) > 25
+
+
+class PDFExtractor:
+    """Extracts one string per page."""
+
+    name = "base"
+
+    def __init__(self):
+        self.pages_extracted = 0
+        self.pages_fallback = 0
+
+    def extract(self, pdf_path: str, progress: Optional[Callable[[int, int], None]] = None) -> List[str]:
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {
+            "extractor": self.name,
+            "pages": self.pages_extracted,
+            "fallback_pages": self.pages_fallback
+        }
+
+
+class PdfPlumberExtractor(PDFExtractor):
+    name = "pdfplumber"
+
+    def extract(self, pdf_path, progress=None):
+        import pdfplumber
+
+        pages = []
+        with pdfplumber.open(pdf_path) as pdf:
+            total_pages = len(pdf.pages)
+            for i, page in enumerate(pdf.pages):
+                pages.append(page.extract_text() or "")
+                # Drop the cached layout objects; long PDFs otherwise grow memory
+                page.flush_cache()
+                if progress:
+                    progress(i + 1, total_pages)
+        self.pages_extracted += len(pages)
+        return pages
+
+
+class PyPDFExtractor(PDFExtractor):
+    """
+    PyPDF2 fast path. With fallback=True, pages that look_garbled() are
+    re-extracted with pdfplumber, which is opened only if needed.
+    """
+
+    def __init__(self, fallback: bool = True):
+        super().__init__()
+        self.fallback = fallback
+        self.name = "auto" if fallback else "pypdf"
+
+    def extract(self, pdf_path, progress=None):
+        from PyPDF2 import PdfReader
+
+        reader = PdfReader(pdf_path)
+        total_pages = len(reader.pages)
+        pages = []
+        plumber = None
+        try:
+            for i, page in enumerate(reader.pages):
+                try:
+                    text = page.extract_text() or ""
+                except Exception:
+                    # PyPDF2 raises on some malformed content streams
+                    text = ""
+                if self.fallback and looks_garbled(text):
+                    if plumber is None:
+                        import pdfplumber
+                        plumber = pdfplumber.open(pdf_path)
+                    plumber_page = plumber.pages[i]
+                    retry = plumber_page.extract_text() or ""
+                    plumber_page.flush_cache()
+                    if retry.strip():
+                        text = retry
+                    self.pages_fallback += 1
+                pages.append(text)
+                if progress:
+                    progress(i + 1, total_pages)
+        finally:
+            if plumber is not None:
+                plumber.close()
+        self.pages_extracted += len(pages)
+        return pages
+
+
+def get_extractor(name: Optional[str] = None) -> PDFExtractor:
+    """Extractor by name, defaulting to $PDF_EXTRACTOR or "auto"."""
+    name = name or os.getenv("PDF_EXTRACTOR", "auto")
+    if name == "auto":
+        return PyPDFExtractor(fallback=True)
+    if name == "pypdf":
+        return PyPDFExtractor(fallback=False)
+    if name == "pdfplumber":
+        return PdfPlumberExtractor()
+    raise ValueError(f"Unknown PDF extractor '{name}' (expected one of {', '.join(EXTRACTORS)})")
@@ -0,0 +1,240 @@
+"""Structured practice questions (stem, options, answer key) parsed from the question bank.
+
+Practice exam PDFs come in two layouts:
+
+    numbered    options "1. ...", "2. ..." followed by "Correct: 3"
+    results     an exam results export: "Question N", the stem, unnumbered
+                options interleaved with "Your answer is correct" style
+                markers, then "Correct option(s):" / "Incorrect options:"
+                explanations that repeat each option's text
+
+Chunks overlap and split questions, so each file's text is stitched back
+together from its processed chunks before parsing. A retrieved chunk is
+mapped back to the question it came from with match().
+"""
+import json
+import re
+from pathlib import Path
+from typing import Dict, List, Optional
+
+_QUESTION_RE = re.compile(r"^Question \d+\s*$", re.MULTILINE)
+_STATUS_LINES = {"correct", "incorrect", "skipped"}
+_MARKER_RE = re.compile(
+    r"^(Your (answer|selection) is (correct|incorrect)|Correct (answer|selection))\s*$",
+    re.IGNORECASE
+)
+_STEM_END_RE = re.compile(r"(\?|\(select (two|three|four)\))\s*$", re.IGNORECASE)
+_EXPLANATION_RE = re.compile(r"^(Overall explanation|Explanation:?)\s*$", re.MULTILINE)
+_CORRECT_SECTION_RE = re.compile(
+    r"Correct options?:\s*(.*?)(?:Incorrect options?:|Reference|$)", re.IGNORECASE | re.DOTALL
+)
+_NUMBERED_OPTION_RE = re.compile(r"^(\d)\.\s+", re.MULTILINE)
+_NUMBERED_KEY_RE = re.compile(r"^Correct:\s*([\d,\s]+)$", re.MULTILINE)
+_TRAILER_RE = re.compile(r"\n(What's your guess\?.*|Domain\n.*)$", re.DOTALL)
+
+# Longest overlap looked for when stitching consecutive chunks
+MAX_OVERLAP = 2000
+
+
+def squash(text: str) -> str:
+    """Lowercase with all whitespace runs collapsed, for substring matching."""
+    return " ".join(text.split()).lower()
+
+
+def stitch(texts: List[str]) -> str:
+    """Join consecutive chunk texts, dropping the text each repeats from the previous one."""
+    document = ""
+    for text in texts:
+        overlap = 0
+        for size in range(min(len(text), len(document), MAX_OVERLAP), 19, -1):
+            if document.endswith(text[:size]):
+                overlap = size
+                break
+        document += text[overlap:] if overlap else ("\n" if document else "") + text
+    return document
+
+
+def _split_options(lines: List[str], explanation: str) -> List[str]:
+    """
+    Group wrapped option lines into options.
+
+    The explanation usually repeats every option's text, so a line
+    continues the current option exactly when the joined text still occurs
+    there. Where it doesn't, a line starting with a capital letter or a
+    digit starts a new option. Single-token lines (orderings like "3,2,1")
+    are always options of their own.
+    """
+    options = []
+    for line in lines:
+        if not options or " " not in line.strip() and " " not in options[-1].strip():
+            options.append(line)
+        elif squash(options[-1]) in explanation:
+            if squash(options[-1] + " " + line) in explanation:
+                options[-1] += " " + line
+            else:
+                options.append(line)
+        elif line[:1].isupper() or line[:1].isdigit():
+            options.append(line)
+        else:
+            options[-1] += " " + line
+    return [" ".join(option.split()) for option in options]
+
+
+def parse_results_question(block: str, source: str, number: int) -> Optional[Dict]:
+    lines = [line.strip() for line in block.splitlines() if line.strip()]
+    if lines and lines[0].lower() in _STATUS_LINES:
+        lines = lines[1:]
+    body = "\n".join(lines)
+    parts = _EXPLANATION_RE.split(body, maxsplit=1)
+    if len(parts) < 3:
+        return None
+    question_part, explanation = parts[0], parts[2]
+
+    question_lines = question_part.splitlines()
+    # "(Select two)" may wrap onto the next line
+    stem_end = next(
+        (i for i, line in enumerate(question_lines)
+         if _STEM_END_RE.search(line) or _STEM_END_RE.search(" ".join(question_lines[max(0, i - 1):i + 1]))),
+        None
+    )
+    if stem_end is None:
+        return None
+    stem = " ".join(question_lines[:stem_end + 1])
+
+    # Drop the "Your answer is correct" style markers between options
+    option_lines = [line for line in question_lines[stem_end + 1:] if not _MARKER_RE.match(line)]
+    squashed_explanation = squash(explanation)
+    options = _split_options(option_lines, squashed_explanation)
+    if len(options) < 2:
+        return None
+
+    # Answer key from the "Correct option(s):" section; it repeats the option text
+    answer = []
+    section = _CORRECT_SECTION_RE.search(explanation)
+    if section:
+        correct_text = squash(section.group(1))
+        answer = [i for i, option in enumerate(options) if squash(option) in correct_text]
+    if not answer:
+        return None
+
+    return {
+        "id": f"{source}#q{number}",
+        "question": stem,
+        "options": options,
+        "answer": answer,
+        "explanation": _TRAILER_RE.sub("", explanation).strip(),
+        "source": source
+    }
+
+
+def parse_numbered_question(block: str, source: str, number: int) -> Optional[Dict]:
+    key = _NUMBERED_KEY_RE.search(block)
+    starts = list(_NUMBERED_OPTION_RE.finditer(block, 0, key.start() if key else len(block)))
+    if not key or len(starts) < 2:
+        return None
+    stem = " ".join(block[:starts[0].start()].split())
+    stem = stem[stem.rfind("SAMPLE QUESTION:") + len("SAMPLE QUESTION:"):].strip() if "SAMPLE QUESTION:" in stem else stem
+    options = []
+    for i, match in enumerate(starts):
+        end = starts[i + 1].start() if i + 1 < len(starts) else key.start()
+        options.append(" ".join(_TRAILER_RE.sub("", block[match.end():end]).split()))
+    answer = [int(n) - 1 for n in re.findall(r"\d+", key.group(1)) if 0 < int(n) <= len(options)]
+    if not answer:
+        return None
+    return {
+        "id": f"{source}#q{number}",
+        "question": stem,
+        "options": options,
+        "answer": answer,
+        "explanation": _TRAILER_RE.sub("", block[key.end():]).strip(),
+        "source": source
+    }
+
+
+def parse_questions(text: str, source: str) -> List[Dict]:
+    """All questions with a recoverable answer key in one document's text."""
+    questions = []
+    headers = list(_QUESTION_RE.finditer(text))
+    first = headers[0].start() if headers else len(text)
+
+    # Sample questions before the first "Question N" header
+    for block in re.split(r"(?=SAMPLE QUESTION:)", text[:first]):
+        question = parse_numbered_question(block, source, len(questions) + 1)
+        if question:
+            questions.append(question)
+
+    for i, header in enumerate(headers):
+        end = headers[i + 1].start() if i + 1 < len(headers) else len(text)
+        question = parse_results_question(text[header.end():end], source, len(questions) + 1)
+        if question:
+            questions.append(question)
+    return questions
+
+
+def load_processed_chunks(processed_dir) -> List[Dict]:
+    """Chunks from every per-file <file>_chunks.json under processed_dir."""
+    chunks = []
+    for path in sorted(Path(processed_dir).glob("*_chunks.json")):
+        if path.name == "all_chunks.json":
+            continue
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                chunks.extend(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return chunks
+
+
+class QuestionBank:
+    """Parsed questions, looked up by the chunk text retrieval returned."""
+
+    def __init__(self, questions: Optional[List[Dict]] = None):
+        self.questions: List[Dict] = []
+        self._blocks: List[str] = []
+        for question in questions or []:
+            self.add(question)
+
+    def add(self, question: Dict):
+        self.questions.append(question)
+        self._blocks.append(squash(" ".join(
+            [question["question"], *question["options"], question["explanation"]]
+        )))
+
+    def __len__(self):
+        return len(self.questions)
+
+    @classmethod
+    def from_chunks(cls, chunks: List[Dict]) -> "QuestionBank":
+        """Parse questions from processed chunks of the question-bank doc type."""
+        by_file: Dict[str, List[Dict]] = {}
+        for chunk in chunks:
+            if chunk["metadata"].get("doc_type") == "questions":
+                by_file.setdefault(chunk["metadata"].get("filename", "unknown"), []).append(chunk)
+        bank = cls()
+        for filename, file_chunks in by_file.items():
+            file_chunks.sort(key=lambda chunk: chunk["chunk_id"])
+            for question in parse_questions(stitch([chunk["text"] for chunk in file_chunks]), filename):
+                bank.add(question)
+        return bank
+
+    @classmethod
+    def from_processed(cls, processed_dir) -> "QuestionBank":
+        """Bank built from every <file>_chunks.json under processed_dir."""
+        return cls.from_chunks(load_processed_chunks(processed_dir))
+
+    def match(self, text: str, probe_chars: int = 80) -> Optional[Dict]:
+        """
+        The question a chunk of text belongs to, or None.
+
+        Probes with a window from the middle of the chunk, which is least
+        likely to be overlap shared with a neighbouring question.
+        """
+        squashed = squash(text)
+        if len(squashed) < 20:
+            return None
+        start = max(0, (len(squashed) - probe_chars) // 2)
+        probe = squashed[start:start + probe_chars]
+        for question, block in zip(self.questions, self._blocks):
+            if probe in block:
+                return question
+        return None
@@ -0,0 +1,231 @@
+"""Token-bucket governor for the shared OpenAI requests/min and tokens/min quota.
+
+Callers are queued by priority class, so interactive queries go ahead of
+batch answers and bulk embedding. Bulk and batch traffic also leave a
+slice of each bucket unused (bulk_reserve) so an interactive request that
+arrives mid-ingestion is admitted immediately. A 429 pauses everyone for
+retry-after and halves the effective rate, which then recovers a little
+with every successful call.
+"""
+import contextvars
+import heapq
+import itertools
+import json
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+import numpy as np
+
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+BULK = "bulk"
+PRIORITIES = {INTERACTIVE: 0, BATCH: 1, BULK: 2}
+
+_current_priority = contextvars.ContextVar("rate_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def request_priority(name: str):
+    """Run OpenAI calls made in this block (in this thread) under a priority class."""
+    if name not in PRIORITIES:
+        raise ValueError(f"Unknown priority class '{name}'")
+    token = _current_priority.set(name)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def current_priority() -> str:
+    return _current_priority.get()
+
+
+class RateLimitTimeout(Exception):
+    """No capacity became available before the caller's timeout."""
+
+
+def estimate_tokens(payload: Dict) -> int:
+    """
+    Rough token cost of an OpenAI request body.
+
+    Embedding inputs may be strings or pre-tokenized id lists; chat
+    requests are charged their prompt plus max_tokens, like the API does.
+    """
+    if "input" in payload:
+        inputs = payload["input"]
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        return sum(len(item) if isinstance(item, list) else len(item) // 4 + 1 for item in inputs)
+    prompt = sum(len(str(message.get("content", ""))) for message in payload.get("messages", []))
+    return prompt // 4 + 1 + int(payload.get("max_tokens") or 0)
+
+
+def estimate_request_tokens(body: bytes) -> int:
+    try:
+        return estimate_tokens(json.loads(body))
+    except (ValueError, TypeError, AttributeError):
+        return 0
+
+
+def parse_retry_after(headers) -> float:
+    """Seconds to back off, from retry-after-ms / retry-after (default 1s)."""
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return 1.0
+
+
+class RateGovernor:
+    """
+    Requests/min and tokens/min buckets shared by every caller.
+
+    acquire() blocks until the caller is first in priority order and both
+    buckets hold enough capacity, then debits them.
+    """
+
+    def __init__(
+        self,
+        rpm: Optional[int] = None,
+        tpm: Optional[int] = None,
+        bulk_reserve: float = 0.2,
+        min_scale: float = 0.1
+    ):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.bulk_reserve = bulk_reserve
+        self.min_scale = min_scale
+
+        self._cond = threading.Condition()
+        self._requests = float(rpm or 0)
+        self._tokens = float(tpm or 0)
+        self._updated = time.monotonic()
+        self._scale = 1.0
+        self._blocked_until = 0.0
+
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._queued = Counter()
+        self._admitted = Counter()
+        self._waits = {name: deque(maxlen=1000) for name in PRIORITIES}
+        self.throttled = 0
+        self.timeouts = 0
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        self._updated = now
+        if self.rpm:
+            self._requests = min(self.rpm, self._requests + elapsed * self.rpm * self._scale / 60)
+        if self.tpm:
+            self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm * self._scale / 60)
+
+    def _shortfall(self, tokens: int, reserve: float) -> float:
+        """Seconds until both buckets can cover the request (0 if they can now)."""
+        wait = 0.0
+        if self.rpm:
+            missing = 1 + reserve * self.rpm - self._requests
+            wait = max(wait, missing * 60 / (self.rpm * self._scale))
+        if self.tpm:
+            missing = tokens + reserve * self.tpm - self._tokens
+            wait = max(wait, missing * 60 / (self.tpm * self._scale))
+        return wait
+
+    def acquire(self, tokens: int = 0, priority: Optional[str] = None, timeout: Optional[float] = None) -> float:
+        """
+        Wait for capacity for one request of `tokens` tokens.
+
+        Returns the time spent waiting in seconds. Raises RateLimitTimeout
+        if `timeout` expires first.
+        """
+        priority = priority or current_priority()
+        rank = PRIORITIES[priority]
+        reserve = self.bulk_reserve if rank > 0 else 0.0
+        if self.tpm:
+            # A request larger than the bucket could never be admitted
+            tokens = min(tokens, int(self.tpm * (1 - reserve)))
+
+        start = time.monotonic()
+        deadline = start + timeout if timeout is not None else None
+        entry = (rank, next(self._sequence))
+        with self._cond:
+            heapq.heappush(self._waiters, entry)
+            self._queued[priority] += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    if self._waiters[0] == entry:
+                        wait = max(self._blocked_until - now, self._shortfall(tokens, reserve))
+                        if wait <= 0:
+                            self._requests -= 1 if self.rpm else 0
+                            self._tokens -= tokens if self.tpm else 0
+                            break
+                    else:
+                        wait = 0.05
+                    if deadline is not None:
+                        if now >= deadline:
+                            self.timeouts += 1
+                            raise RateLimitTimeout(f"No {priority} capacity within {timeout:.1f}s")
+                        wait = min(wait, deadline - now)
+                    self._cond.wait(min(max(wait, 0.001), 1.0))
+            finally:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                self._queued[priority] -= 1
+                self._cond.notify_all()
+
+        waited = time.monotonic() - start
+        self._admitted[priority] += 1
+        self._waits[priority].append(waited)
+        return waited
+
+    def throttle(self, retry_after: float):
+        """Upstream returned 429: pause everyone and halve the effective rate."""
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            self._blocked_until = max(self._blocked_until, now + retry_after)
+            self._scale = max(self.min_scale, self._scale * 0.5)
+            self._requests = min(self._requests, 0.0)
+            self._tokens = min(self._tokens, 0.0)
+            self.throttled += 1
+            self._cond.notify_all()
+
+    def report_success(self):
+        """Additive recovery of the effective rate after a throttle."""
+        if self._scale < 1.0:
+            with self._cond:
+                self._scale = min(1.0, self._scale + 0.02)
+
+    def stats(self) -> Dict:
+        with self._cond:
+            queued = dict(self._queued)
+            scale = self._scale
+            blocked_for = max(0.0, self._blocked_until - time.monotonic())
+        waits = {}
+        for name, samples in self._waits.items():
+            if samples:
+                values = np.array(samples) * 1000
+                waits[name] = {
+                    "admitted": self._admitted[name],
+                    "mean_wait_ms": round(float(values.mean()), 1),
+                    "p95_wait_ms": round(float(np.percentile(values, 95)), 1),
+                    "max_wait_ms": round(float(values.max()), 1)
+                }
+        return {
+            "rpm_limit": self.rpm,
+            "tpm_limit": self.tpm,
+            "effective_scale": round(scale, 3),
+            "blocked_for_s": round(blocked_for, 2),
+            "queue_depth": {name: queued.get(name, 0) for name in PRIORITIES},
+            "waits": waits,
+            "throttled": self.throttled,
+            "timeouts": self.timeouts
+        }
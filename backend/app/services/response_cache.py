@@ -0,0 +1,129 @@
+"""Disk-backed LLM response cache (SQLite)."""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+
+class ResponseCache:
+    """
+    LLM responses keyed by hash(model, parameters, prompt).
+
+    Every entry records the index version it was generated against; a
+    lookup only hits when the version matches, so re-indexing invalidates
+    old answers without touching the file. purge() drops stale rows.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                index_version TEXT NOT NULL,
+                model TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )"""
+        )
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(model: str, params: Dict, prompt: str) -> str:
+        payload = json.dumps({"model": model, "params": params, "prompt": prompt}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, index_version: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM responses WHERE key = ? AND index_version = ?",
+                (key, index_version)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, index_version: str, value: Dict, model: str = ""):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, index_version, model, json.dumps(value), time.time())
+            )
+
+    def purge(self, keep_version: Optional[str] = None) -> int:
+        """Delete entries from other index versions (all entries if None)."""
+        with self._lock:
+            if keep_version is None:
+                cursor = self._conn.execute("DELETE FROM responses")
+            else:
+                cursor = self._conn.execute(
+                    "DELETE FROM responses WHERE index_version != ?", (keep_version,)
+                )
+            return cursor.rowcount
+
+    def stats(self, index_version: Optional[str] = None) -> Dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            current = entries
+            if index_version is not None:
+                current = self._conn.execute(
+                    "SELECT COUNT(*) FROM responses WHERE index_version = ?", (index_version,)
+                ).fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "path": str(self.path),
+            "entries": entries,
+            "current_entries": current,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "size_bytes": self.path.stat().st_size if self.path.exists() else 0
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# Index epoch: a counter bumped whenever index contents may have changed
+# (ingestion, uploads, an admin reload). Vector counts can't tell: a file
+# re-ingested under the same chunk ids keeps every count the same.
+INDEX_EPOCH_FILE = "index_epoch"
+_epoch_lock = threading.Lock()
+
+
+def read_index_epoch(directory) -> int:
+    try:
+        return int((Path(directory) / INDEX_EPOCH_FILE).read_text(encoding="utf-8").strip())
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def bump_index_epoch(directory) -> int:
+    """Record a change to the index contents; cached answers keyed to older epochs stop matching."""
+    path = Path(directory) / INDEX_EPOCH_FILE
+    with _epoch_lock:
+        epoch = read_index_epoch(directory) + 1
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(INDEX_EPOCH_FILE + ".tmp")
+        tmp.write_text(str(epoch), encoding="utf-8")
+        os.replace(tmp, path)
+    return epoch
+
+
+def open_response_cache(default_path) -> Optional[ResponseCache]:
+    """Cache at $RESPONSE_CACHE_PATH, or None when RESPONSE_CACHE=off."""
+    if os.getenv("RESPONSE_CACHE", "on").lower() in ("off", "0", "false"):
+        return None
+    return ResponseCache(os.getenv("RESPONSE_CACHE_PATH", str(default_path)))
@@ -0,0 +1,116 @@
+"""Offline retrieval evaluation: recall@k, MRR, nDCG@k and latency."""
+import json
+import math
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+# (filename, chunk_id) identifies a chunk across re-indexing
+ChunkRef = Tuple[str, int]
+
+
+def load_golden_set(path: str) -> List[Dict]:
+    """
+    Load a golden set file.
+
+    Format:
+        {"version": 1, "queries": [
+            {"id": "q1", "question": "...",
+             "relevant": [{"filename": "guide.pdf", "chunk_id": 12}, ...]}
+        ]}
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    queries = data["queries"] if isinstance(data, dict) else data
+    for item in queries:
+        item["relevant_refs"] = {(r["filename"], int(r["chunk_id"])) for r in item["relevant"]}
+    return queries
+
+
+def recall_at_k(retrieved: Sequence[ChunkRef], relevant: set, k: int) -> float:
+    if not relevant:
+        return 0.0
+    return len(set(retrieved[:k]) & relevant) / min(len(relevant), k)
+
+
+def reciprocal_rank(retrieved: Sequence[ChunkRef], relevant: set) -> float:
+    for rank, ref in enumerate(retrieved, start=1):
+        if ref in relevant:
+            return 1.0 / rank
+    return 0.0
+
+
+def ndcg_at_k(retrieved: Sequence[ChunkRef], relevant: set, k: int) -> float:
+    dcg = sum(1.0 / math.log2(rank + 1) for rank, ref in enumerate(retrieved[:k], start=1) if ref in relevant)
+    ideal = sum(1.0 / math.log2(rank + 1) for rank in range(1, min(len(relevant), k) + 1))
+    return dcg / ideal if ideal else 0.0
+
+
+def evaluate(
+    retrieve: Callable[[Dict, int], List[ChunkRef]],
+    golden: List[Dict],
+    k: int = 5
+) -> Dict:
+    """
+    Run every golden query through retrieve(item, k) and score the results.
+
+    Recall is normalised by min(|relevant|, k), so a query with more
+    relevant chunks than k can still reach 1.0.
+
+    Returns:
+        {"recall", "mrr", "ndcg", "mean_ms", "p50_ms", "p95_ms", "per_query": [...]}
+    """
+    per_query = []
+    for item in golden:
+        start = time.perf_counter()
+        retrieved = retrieve(item, k)
+        latency_ms = (time.perf_counter() - start) * 1000
+        relevant = item["relevant_refs"]
+        per_query.append({
+            "id": item.get("id"),
+            "question": item["question"],
+            "latency_ms": latency_ms,
+            "recall": recall_at_k(retrieved, relevant, k),
+            "rr": reciprocal_rank(retrieved, relevant),
+            "ndcg": ndcg_at_k(retrieved, relevant, k),
+            "retrieved": [list(ref) for ref in retrieved]
+        })
+
+    latencies = [q["latency_ms"] for q in per_query]
+    return {
+        "recall": float(np.mean([q["recall"] for q in per_query])),
+        "mrr": float(np.mean([q["rr"] for q in per_query])),
+        "ndcg": float(np.mean([q["ndcg"] for q in per_query])),
+        "mean_ms": float(np.mean(latencies)),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "per_query": per_query
+    }
+
+
+def format_table(results: List[Tuple[str, Dict]], k: int) -> str:
+    """One row per configuration."""
+    lines = [
+        f"{'configuration':<28} {f'recall@{k}':>9} {'MRR':>6} {f'nDCG@{k}':>8} "
+        f"{'mean ms':>8} {'p50 ms':>7} {'p95 ms':>7}"
+    ]
+    for name, r in results:
+        lines.append(
+            f"{name:<28} {r['recall']:>9.3f} {r['mrr']:>6.3f} {r['ndcg']:>8.3f} "
+            f"{r['mean_ms']:>8.2f} {r['p50_ms']:>7.2f} {r['p95_ms']:>7.2f}"
+        )
+    return "\n".join(lines)
+
+
+def load_query_embeddings(path: Path, golden: List[Dict]) -> Optional[Dict[str, np.ndarray]]:
+    """Stored query embeddings keyed by golden query id, if the snapshot exists."""
+    if not path.exists():
+        return None
+    stored = np.load(path)
+    missing = [item["id"] for item in golden if item["id"] not in stored.files]
+    if missing:
+        raise ValueError(f"Query embedding snapshot {path} is missing {missing}; re-run with --embed")
+    return {name: stored[name] for name in stored.files}
@@ -0,0 +1,307 @@
+"""AWS service tagging with a multi-pattern matcher and an inverted index."""
+import json
+from collections import deque
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+# Canonical service id -> (short label, aliases).
+# Aliases are matched case-insensitively on word boundaries. Generic English
+# words ("batch", "config", "glue") are only listed with their "aws"/"amazon"
+# prefix so ordinary prose doesn't produce false tags.
+AWS_SERVICES: Dict[str, Tuple[str, List[str]]] = {
+    # Storage
+    "s3": ("S3", ["s3", "simple storage service", "s3 glacier", "glacier", "s3 standard"]),
+    "ebs": ("EBS", ["ebs", "elastic block store"]),
+    "efs": ("EFS", ["efs", "elastic file system"]),
+    "fsx": ("FSx", ["fsx", "fsx for lustre", "fsx for windows"]),
+    "storage_gateway": ("Storage Gateway", ["storage gateway"]),
+    "snow_family": ("Snow Family", ["snowball", "snowcone", "snowmobile", "snow family"]),
+    "backup": ("Backup", ["aws backup"]),
+    # Compute
+    "ec2": ("EC2", ["ec2", "elastic compute cloud", "spot instance", "spot instances", "auto scaling group"]),
+    "lambda": ("Lambda", ["lambda", "aws lambda", "lambda function", "lambda functions"]),
+    "ecs": ("ECS", ["ecs", "elastic container service"]),
+    "eks": ("EKS", ["eks", "elastic kubernetes service"]),
+    "ecr": ("ECR", ["ecr", "elastic container registry"]),
+    "fargate": ("Fargate", ["fargate"]),
+    "batch": ("Batch", ["aws batch"]),
+    "elastic_beanstalk": ("Elastic Beanstalk", ["elastic beanstalk", "beanstalk"]),
+    "lightsail": ("Lightsail", ["lightsail"]),
+    "outposts": ("Outposts", ["outposts"]),
+    # Networking & content delivery
+    "vpc": ("VPC", ["vpc", "virtual private cloud", "vpc peering", "nat gateway", "internet gateway",
+                    "security group", "security groups", "network acl", "nacl", "privatelink", "vpc endpoint"]),
+    "cloudfront": ("CloudFront", ["cloudfront"]),
+    "route53": ("Route 53", ["route 53", "route53"]),
+    "elb": ("ELB", ["elb", "elastic load balancing", "elastic load balancer", "load balancer",
+                    "application load balancer", "network load balancer", "alb", "nlb", "gateway load balancer"]),
+    "api_gateway": ("API Gateway", ["api gateway"]),
+    "direct_connect": ("Direct Connect", ["direct connect"]),
+    "transit_gateway": ("Transit Gateway", ["transit gateway"]),
+    "global_accelerator": ("Global Accelerator", ["global accelerator"]),
+    "vpn": ("Site-to-Site VPN", ["site-to-site vpn", "client vpn", "aws vpn"]),
+    # Databases
+    "rds": ("RDS", ["rds", "relational database service", "multi-az", "read replica", "read replicas"]),
+    "aurora": ("Aurora", ["aurora", "aurora serverless"]),
+    "dynamodb": ("DynamoDB", ["dynamodb", "dynamo db", "dax"]),
+    "elasticache": ("ElastiCache", ["elasticache", "redis", "memcached"]),
+    "redshift": ("Redshift", ["redshift", "redshift spectrum"]),
+    "documentdb": ("DocumentDB", ["documentdb"]),
+    "neptune": ("Neptune", ["neptune"]),
+    "keyspaces": ("Keyspaces", ["keyspaces"]),
+    "timestream": ("Timestream", ["timestream"]),
+    "memorydb": ("MemoryDB", ["memorydb"]),
+    "dms": ("DMS", ["database migration service", "aws dms"]),
+    # Analytics
+    "athena": ("Athena", ["athena"]),
+    "emr": ("EMR", ["emr", "elastic mapreduce"]),
+    "glue": ("Glue", ["aws glue", "glue crawler", "glue crawlers", "glue data catalog", "glue databrew",
+                      "glue etl", "glue job", "glue jobs"]),
+    "kinesis": ("Kinesis", ["kinesis", "kinesis data streams", "kinesis data firehose", "firehose",
+                            "kinesis data analytics", "kinesis video streams"]),
+    "msk": ("MSK", ["msk", "managed streaming for apache kafka"]),
+    "opensearch": ("OpenSearch", ["opensearch", "elasticsearch service"]),
+    "quicksight": ("QuickSight", ["quicksight"]),
+    "lake_formation": ("Lake Formation", ["lake formation"]),
+    "data_pipeline": ("Data Pipeline", ["data pipeline"]),
+    # Machine learning
+    "sagemaker": ("SageMaker", ["sagemaker", "sage maker"]),
+    "bedrock": ("Bedrock", ["bedrock", "amazon bedrock"]),
+    "comprehend": ("Comprehend", ["amazon comprehend"]),
+    "rekognition": ("Rekognition", ["rekognition"]),
+    "textract": ("Textract", ["textract"]),
+    "transcribe": ("Transcribe", ["amazon transcribe"]),
+    "translate": ("Translate", ["amazon translate"]),
+    "polly": ("Polly", ["polly"]),
+    "lex": ("Lex", ["amazon lex"]),
+    "personalize": ("Personalize", ["amazon personalize"]),
+    "forecast": ("Forecast", ["amazon forecast"]),
+    "kendra": ("Kendra", ["kendra"]),
+    "fraud_detector": ("Fraud Detector", ["fraud detector"]),
+    "q": ("Amazon Q", ["amazon q"]),
+    # Application integration
+    "sns": ("SNS", ["sns", "simple notification service"]),
+    "sqs": ("SQS", ["sqs", "simple queue service", "fifo queue", "dead-letter queue"]),
+    "eventbridge": ("EventBridge", ["eventbridge", "cloudwatch events"]),
+    "step_functions": ("Step Functions", ["step functions", "step function"]),
+    "mq": ("Amazon MQ", ["amazon mq"]),
+    "appsync": ("AppSync", ["appsync"]),
+    "ses": ("SES", ["ses", "simple email service"]),
+    # Management & governance
+    "cloudwatch": ("CloudWatch", ["cloudwatch", "cloudwatch logs", "cloudwatch alarms", "cloudwatch metrics"]),
+    "cloudtrail": ("CloudTrail", ["cloudtrail"]),
+    "cloudformation": ("CloudFormation", ["cloudformation"]),
+    "config": ("Config", ["aws config", "config rules"]),
+    "systems_manager": ("Systems Manager", ["systems manager", "parameter store", "ssm"]),
+    "organizations": ("Organizations", ["aws organizations", "service control policy",
+                                        "service control policies", "scp", "scps"]),
+    "control_tower": ("Control Tower", ["control tower"]),
+    "trusted_advisor": ("Trusted Advisor", ["trusted advisor"]),
+    "cost_explorer": ("Cost Explorer", ["cost explorer", "aws budgets"]),
+    "cdk": ("CDK", ["cdk", "cloud development kit"]),
+    "x_ray": ("X-Ray", ["x-ray", "xray"]),
+    # Security, identity & compliance
+    "iam": ("IAM", ["iam", "identity and access management", "identity & access management",
+                    "iam role", "iam roles", "iam policy", "iam policies"]),
+    "cognito": ("Cognito", ["cognito"]),
+    "kms": ("KMS", ["kms", "key management service"]),
+    "secrets_manager": ("Secrets Manager", ["secrets manager"]),
+    "waf": ("WAF", ["waf", "web application firewall"]),
+    "shield": ("Shield", ["aws shield", "shield advanced"]),
+    "guardduty": ("GuardDuty", ["guardduty"]),
+    "inspector": ("Inspector", ["amazon inspector"]),
+    "macie": ("Macie", ["macie"]),
+    "security_hub": ("Security Hub", ["security hub"]),
+    "acm": ("ACM", ["certificate manager", "acm"]),
+    "cloudhsm": ("CloudHSM", ["cloudhsm"]),
+    "sso": ("IAM Identity Center", ["iam identity center", "aws sso", "single sign-on"]),
+    # Developer tools
+    "codepipeline": ("CodePipeline", ["codepipeline"]),
+    "codebuild": ("CodeBuild", ["codebuild"]),
+    "codedeploy": ("CodeDeploy", ["codedeploy"]),
+    "codecommit": ("CodeCommit", ["codecommit"]),
+}
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+class ServiceTagger:
+    """
+    Aho-Corasick matcher over the AWS service/alias dictionary.
+
+    The automaton is compiled once; tagging a chunk is a single linear pass
+    over its text regardless of how many aliases are registered.
+    """
+
+    def __init__(self, services: Optional[Dict[str, Tuple[str, List[str]]]] = None):
+        self.services = services or AWS_SERVICES
+        self.labels = {service_id: label for service_id, (label, _) in self.services.items()}
+
+        # Trie: goto transitions, failure links and output sets per state
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[str, int]]] = [[]]
+
+        for service_id, (label, aliases) in self.services.items():
+            for alias in set(aliases):
+                self._add_pattern(alias.lower(), service_id)
+
+        self._build_failure_links()
+
+    def _add_pattern(self, pattern: str, service_id: str):
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._goto[state][ch] = nxt
+            state = nxt
+        self._out[state].append((service_id, len(pattern)))
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def tag(self, text: str) -> List[str]:
+        """Return the sorted canonical service ids mentioned in text."""
+        if not text:
+            return []
+
+        lowered = text.lower()
+        found: Set[str] = set()
+        state = 0
+        goto, fail, out = self._goto, self._fail, self._out
+        length = len(lowered)
+
+        for i, ch in enumerate(lowered):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if not out[state]:
+                continue
+
+            # Only accept matches that sit on word boundaries
+            after_ok = i + 1 >= length or not _is_word_char(lowered[i + 1])
+            if not after_ok:
+                continue
+            for service_id, pattern_len in out[state]:
+                start = i - pattern_len + 1
+                if start == 0 or not _is_word_char(lowered[start - 1]):
+                    found.add(service_id)
+
+        return sorted(found)
+
+    def resolve(self, topic: str) -> List[str]:
+        """Map a free-form topic ("S3", "VPC peering") to canonical service ids."""
+        if not topic:
+            return []
+        key = topic.strip().lower().replace(" ", "_")
+        if key in self.services:
+            return [key]
+        return self.tag(topic)
+
+    def label(self, service_id: str) -> str:
+        """Short display label for a canonical service id."""
+        return self.labels.get(service_id, service_id.upper())
+
+
+def chunk_key(metadata: Dict, chunk_id: int) -> str:
+    """Stable key for a chunk across files: '<filename>#<chunk_id>'."""
+    return f"{metadata.get('filename', 'unknown')}#{chunk_id}"
+
+
+class ServiceIndex:
+    """Inverted index from canonical service id to the chunks that mention it."""
+
+    VERSION = 1
+
+    def __init__(self):
+        self.postings: Dict[str, List[str]] = {}
+        self.file_chunks: Dict[str, int] = {}
+
+    @property
+    def num_chunks(self) -> int:
+        return sum(self.file_chunks.values())
+
+    def add(self, key: str, services: Iterable[str]):
+        """Register one chunk under each of its service tags."""
+        filename = key.rsplit("#", 1)[0]
+        self.file_chunks[filename] = self.file_chunks.get(filename, 0) + 1
+        for service_id in services:
+            self.postings.setdefault(service_id, []).append(key)
+
+    def remove_file(self, filename: str):
+        """Drop every chunk of a source file, e.g. before re-ingesting it."""
+        if self.file_chunks.pop(filename, None) is None:
+            return
+        prefix = f"{filename}#"
+        for service_id in list(self.postings):
+            keys = [key for key in self.postings[service_id] if not key.startswith(prefix)]
+            if keys:
+                self.postings[service_id] = keys
+            else:
+                del self.postings[service_id]
+
+    def add_chunks(self, chunks: List[Dict]):
+        """Index chunks produced by PDFProcessor.chunk_text."""
+        for chunk in chunks:
+            metadata = chunk.get("metadata", {})
+            self.add(chunk_key(metadata, chunk["chunk_id"]), metadata.get("services", []))
+
+    def chunk_count(self, service_id: str) -> int:
+        return len(self.postings.get(service_id, ()))
+
+    def chunks_for(self, service_id: str) -> List[str]:
+        return self.postings.get(service_id, [])
+
+    def counts(self) -> Dict[str, int]:
+        """Chunk count per service, most frequent first."""
+        return dict(sorted(
+            ((service_id, len(keys)) for service_id, keys in self.postings.items()),
+            key=lambda item: item[1],
+            reverse=True
+        ))
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "version": self.VERSION,
+                "num_chunks": self.num_chunks,
+                "file_chunks": self.file_chunks,
+                "postings": self.postings
+            }, f, indent=2)
+        print(f"Saved service index ({len(self.postings)} services) to {path}")
+
+    @classmethod
+    def load(cls, path: str) -> "ServiceIndex":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        index = cls()
+        index.file_chunks = data.get("file_chunks", {})
+        index.postings = data.get("postings", {})
+        return index
+
+    @classmethod
+    def load_or_empty(cls, path) -> "ServiceIndex":
+        """Load the index if it exists, otherwise return an empty one."""
+        if path and Path(path).exists():
+            try:
+                return cls.load(str(path))
+            except Exception as e:
+                print(f"⚠️  Could not load service index {path}: {e}")
+        return cls()
@@ -0,0 +1,227 @@
+"""Portable index snapshots: IDs, vectors and metadata in one versioned, checksummed file.
+
+Layout (little-endian):
+
+    header      magic, format version, count, dimension, section offsets,
+                a SHA-256 of the vector block and of the metadata table,
+                and a CRC-32 of the header itself
+    info        JSON: embedding model, source index, creation time
+    vectors     count x dimension float32, contiguous, 64-byte aligned
+    offsets     (count + 1) uint64 byte offsets into the rows section
+    rows        one compact JSON object per vector: {"id", "namespace", "metadata"}
+
+The vector block is memory-mapped straight into a numpy array, and a row's
+metadata is decoded only when it is read, so opening a snapshot costs the
+same whatever its size (apart from checksum verification).
+"""
+import hashlib
+import json
+import os
+import struct
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+SNAPSHOT_VERSION = 1
+MAGIC = b"RAGSNAP\x00"
+
+# magic, version, flags, count, dimension, header CRC-32, info offset/bytes,
+# vectors offset, offsets offset, rows offset/bytes, vectors and table SHA-256
+_HEADER = struct.Struct("<8sIIQII6Q32s32s")
+_CRC_OFFSET = 28
+_VECTOR_ALIGN = 64
+_HASH_BLOCK = 16 * 1024 * 1024
+
+
+class SnapshotError(ValueError):
+    """A snapshot file is not a snapshot, is from a newer format, or is corrupt."""
+
+
+def _padding(position: int, alignment: int) -> bytes:
+    return b"\x00" * (-position % alignment)
+
+
+def _header_crc(raw: bytes) -> int:
+    """CRC-32 of a packed header with its own CRC field zeroed."""
+    return zlib.crc32(raw[:_CRC_OFFSET] + b"\x00" * 4 + raw[_CRC_OFFSET + 4:])
+
+
+def _encode_row(row_id: str, namespace: Optional[str], metadata: Dict) -> bytes:
+    return json.dumps(
+        {"id": row_id, "namespace": namespace or "", "metadata": metadata},
+        ensure_ascii=False, separators=(",", ":"), default=str
+    ).encode("utf-8")
+
+
+class SnapshotWriter:
+    """
+    Streams batches into a snapshot file.
+
+    Vectors are written as they arrive; rows are kept in memory until
+    close() writes the metadata table and the header. The file is written
+    under a temporary name and renamed into place, so an interrupted export
+    never leaves a truncated snapshot behind.
+    """
+
+    def __init__(self, path, dimension: int, info: Optional[Dict] = None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.dimension = dimension
+        self.count = 0
+        self.stats: Optional[Dict] = None  # set by close()
+        self._tmp = self.path.with_name(self.path.name + ".tmp")
+        self._file = open(self._tmp, "wb")
+        self._rows: List[bytes] = []
+        self._vector_hash = hashlib.sha256()
+
+        self._info = json.dumps({**(info or {}), "created_at": time.time()}).encode("utf-8")
+        self._file.write(b"\x00" * _HEADER.size)
+        self._info_offset = _HEADER.size
+        self._file.write(self._info)
+        self._file.write(_padding(self._file.tell(), _VECTOR_ALIGN))
+        self._vectors_offset = self._file.tell()
+
+    def add(self, ids: List[str], vectors, metadatas: List[Dict], namespaces: Optional[List[str]] = None):
+        vectors = np.ascontiguousarray(vectors, dtype="<f4")
+        if vectors.ndim != 2 or vectors.shape[1] != self.dimension:
+            raise ValueError(f"Expected (n, {self.dimension}) vectors, got {vectors.shape}")
+        if not len(ids) == len(vectors) == len(metadatas):
+            raise ValueError(f"{len(ids)} ids, {len(vectors)} vectors and {len(metadatas)} metadata rows")
+        self._file.write(vectors.data)
+        self._vector_hash.update(vectors.data)
+        namespaces = namespaces or [""] * len(ids)
+        self._rows.extend(_encode_row(*row) for row in zip(ids, namespaces, metadatas))
+        self.count += len(ids)
+
+    def close(self) -> Dict:
+        """Write the metadata table and header; returns the snapshot's size and counts."""
+        self._file.write(_padding(self._file.tell(), 8))
+        offsets_offset = self._file.tell()
+        offsets = np.zeros(self.count + 1, dtype="<u8")
+        offsets[1:] = np.cumsum([len(row) for row in self._rows])
+        rows = b"".join(self._rows)
+
+        table_hash = hashlib.sha256(self._info)
+        table_hash.update(offsets.data)
+        table_hash.update(rows)
+        self._file.write(offsets.data)
+        rows_offset = self._file.tell()
+        self._file.write(rows)
+
+        fields = [
+            MAGIC, SNAPSHOT_VERSION, 0, self.count, self.dimension, 0,
+            self._info_offset, len(self._info), self._vectors_offset, offsets_offset,
+            rows_offset, len(rows), self._vector_hash.digest(), table_hash.digest()
+        ]
+        fields[5] = _header_crc(_HEADER.pack(*fields))
+        self._file.seek(0)
+        self._file.write(_HEADER.pack(*fields))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self._tmp, self.path)
+        self._rows = []
+        self.stats = {
+            "path": str(self.path),
+            "count": self.count,
+            "dimension": self.dimension,
+            "bytes": self.path.stat().st_size
+        }
+        return self.stats
+
+    def abort(self):
+        self._file.close()
+        self._tmp.unlink(missing_ok=True)
+
+    def __enter__(self) -> "SnapshotWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class IndexSnapshot:
+    """A snapshot file opened read-only; vectors are a memory-mapped (count, dimension) array."""
+
+    def __init__(self, path, verify: bool = True):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            raw = f.read(_HEADER.size)
+        if len(raw) < _HEADER.size or raw[:len(MAGIC)] != MAGIC:
+            raise SnapshotError(f"{self.path} is not an index snapshot")
+        (_, self.version, _, self.count, self.dimension, crc, info_offset, info_bytes,
+         vectors_offset, offsets_offset, rows_offset, rows_bytes,
+         self._vectors_sha256, self._table_sha256) = _HEADER.unpack(raw)
+        if crc != _header_crc(raw):
+            raise SnapshotError(f"{self.path}: header checksum mismatch")
+        if self.version > SNAPSHOT_VERSION:
+            raise SnapshotError(
+                f"{self.path} is snapshot format {self.version}; this code reads up to {SNAPSHOT_VERSION}"
+            )
+        if self.path.stat().st_size < rows_offset + rows_bytes:
+            raise SnapshotError(f"{self.path} is truncated")
+
+        self._data = np.memmap(self.path, dtype=np.uint8, mode="r")
+        self._info = self._data[info_offset:info_offset + info_bytes]
+        vector_bytes = self.count * self.dimension * 4
+        self.vectors = self._data[vectors_offset:vectors_offset + vector_bytes].view("<f4").reshape(
+            self.count, self.dimension
+        )
+        self._offsets = self._data[offsets_offset:offsets_offset + (self.count + 1) * 8].view("<u8")
+        self._rows = self._data[rows_offset:rows_offset + rows_bytes]
+        self.info = json.loads(bytes(self._info))
+
+        if verify:
+            self.verify()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def verify(self):
+        """Check both section checksums; raises SnapshotError on a mismatch."""
+        vector_hash = hashlib.sha256()
+        flat = self.vectors.reshape(-1).view(np.uint8)
+        for start in range(0, len(flat), _HASH_BLOCK):
+            vector_hash.update(flat[start:start + _HASH_BLOCK])
+        if vector_hash.digest() != self._vectors_sha256:
+            raise SnapshotError(f"{self.path}: vector block checksum mismatch")
+
+        table_hash = hashlib.sha256(self._info)
+        table_hash.update(self._offsets)
+        for start in range(0, len(self._rows), _HASH_BLOCK):
+            table_hash.update(self._rows[start:start + _HASH_BLOCK])
+        if table_hash.digest() != self._table_sha256:
+            raise SnapshotError(f"{self.path}: metadata table checksum mismatch")
+
+    def row(self, i: int) -> Dict:
+        """{"id", "namespace", "metadata"} of row i."""
+        return json.loads(bytes(self._rows[self._offsets[i]:self._offsets[i + 1]]))
+
+    def rows(self, start: int = 0, stop: Optional[int] = None) -> List[Dict]:
+        stop = self.count if stop is None else min(stop, self.count)
+        if start >= stop:
+            return []
+        # Rows are contiguous: decode the whole range from one slice
+        base = int(self._offsets[start])
+        blob = bytes(self._rows[base:int(self._offsets[stop])])
+        bounds = (self._offsets[start:stop + 1] - base).tolist()
+        return [json.loads(blob[bounds[i]:bounds[i + 1]]) for i in range(stop - start)]
+
+    def batches(self, batch_size: int = 100) -> Iterator[Tuple[np.ndarray, List[Dict]]]:
+        """(vectors, rows) in file order, batch_size at a time."""
+        for start in range(0, self.count, batch_size):
+            yield self.vectors[start:start + batch_size], self.rows(start, start + batch_size)
+
+    def namespaces(self) -> Dict[str, int]:
+        """Row count per namespace."""
+        counts: Dict[str, int] = {}
+        for _, rows in self.batches(10000):
+            for row in rows:
+                counts[row["namespace"]] = counts.get(row["namespace"], 0) + 1
+        return counts
@@ -0,0 +1,160 @@
+"""Local stand-ins for the OpenAI embeddings and chat model, with configurable latency.
+
+For load tests and offline runs of the whole API. The engine is built over a
+local index of the processed chunks, embedded with hashed bag-of-words
+vectors (so questions still retrieve chunks that share their terms), and
+every upstream call sleeps like the real one would, so concurrency,
+admission control and streaming behave as they do against OpenAI:
+
+    STANDIN_EMBED_MS        (40)   per embedding request
+    STANDIN_FIRST_TOKEN_MS  (400)  chat time to first token
+    STANDIN_TOKEN_MS        (15)   per further streamed token
+    STANDIN_ANSWER_TOKENS   (120)  tokens per answer
+    STANDIN_JITTER          (0.2)  +/- share of each latency, uniformly random
+
+Start api.py on them with
+    STUDY_PARTNER_FACTORY=services.standins:standin_engine
+"""
+import atexit
+import hashlib
+import os
+import random
+import re
+import shutil
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+import numpy as np
+
+from services.question_bank import load_processed_chunks
+from services.service_tagger import chunk_key
+
+PROCESSED_DIR = Path(__file__).resolve().parent.parent.parent / "data" / "processed"
+
+_WORD = re.compile(r"[a-z0-9]+")
+_ANSWER_WORDS = (
+    "Amazon S3 stores objects in buckets with lifecycle rules that move data between storage classes "
+    "while IAM policies control access and CloudWatch reports metrics for every request"
+).split()
+
+
+@dataclass
+class StandInLatency:
+    embed_ms: float = 40.0
+    first_token_ms: float = 400.0
+    token_ms: float = 15.0
+    answer_tokens: int = 120
+    jitter: float = 0.2
+
+    @classmethod
+    def from_env(cls) -> "StandInLatency":
+        return cls(
+            embed_ms=float(os.getenv("STANDIN_EMBED_MS", "40")),
+            first_token_ms=float(os.getenv("STANDIN_FIRST_TOKEN_MS", "400")),
+            token_ms=float(os.getenv("STANDIN_TOKEN_MS", "15")),
+            answer_tokens=int(os.getenv("STANDIN_ANSWER_TOKENS", "120")),
+            jitter=float(os.getenv("STANDIN_JITTER", "0.2")),
+        )
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+    def sleep(self, ms: float):
+        if ms > 0:
+            time.sleep(ms * random.uniform(1 - self.jitter, 1 + self.jitter) / 1000)
+
+
+class StandInEmbeddings:
+    """embed_query / embed_documents returning feature-hashed term vectors."""
+
+    def __init__(self, dimension: int, latency: StandInLatency):
+        self.dimension = dimension
+        self.latency = latency
+
+    def vector(self, text: str) -> np.ndarray:
+        buckets = [
+            int.from_bytes(hashlib.blake2b(word.encode(), digest_size=4).digest(), "little") % self.dimension
+            for word in _WORD.findall(text.lower())
+        ]
+        vector = np.bincount(buckets, minlength=self.dimension).astype(np.float32) if buckets else \
+            np.ones(self.dimension, dtype=np.float32)
+        return vector / np.linalg.norm(vector)
+
+    def embed_query(self, text: str) -> List[float]:
+        self.latency.sleep(self.latency.embed_ms)
+        return self.vector(text).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.latency.sleep(self.latency.embed_ms)
+        return [self.vector(text).tolist() for text in texts]
+
+
+class _Chunk:
+    __slots__ = ("content",)
+
+    def __init__(self, content: str):
+        self.content = content
+
+
+class StandInChatModel:
+    """predict / stream with the latency profile of a streamed completion."""
+
+    def __init__(self, latency: StandInLatency):
+        self.latency = latency
+
+    def _tokens(self, prompt: str) -> List[str]:
+        rng = random.Random(len(prompt))
+        return [rng.choice(_ANSWER_WORDS) + " " for _ in range(self.latency.answer_tokens)]
+
+    def predict(self, prompt: str) -> str:
+        self.latency.sleep(self.latency.first_token_ms + self.latency.token_ms * (self.latency.answer_tokens - 1))
+        return "".join(self._tokens(prompt)).strip()
+
+    def stream(self, prompt: str) -> Iterator[_Chunk]:
+        self.latency.sleep(self.latency.first_token_ms)
+        for i, token in enumerate(self._tokens(prompt)):
+            if i:
+                self.latency.sleep(self.latency.token_ms)
+            yield _Chunk(token)
+
+
+def build_standin_index(path, embeddings: StandInEmbeddings, processed_dir=PROCESSED_DIR) -> Path:
+    """Local index of the processed chunks under the stand-in embeddings (built without latency)."""
+    from services.local_index import LocalVectorIndex
+
+    chunks = load_processed_chunks(processed_dir)
+    if not chunks:
+        raise RuntimeError(f"No processed chunks under {processed_dir}; run pdf_processor.py first")
+    records = [
+        {
+            "id": chunk_key(chunk["metadata"], chunk["chunk_id"]),
+            "text": chunk["text"],
+            "metadata": {**chunk["metadata"], "chunk_id": chunk["chunk_id"]}
+        }
+        for chunk in chunks
+    ]
+    vectors = np.stack([embeddings.vector(chunk["text"]) for chunk in chunks])
+    return LocalVectorIndex.build(path, vectors, records, modes=("int8",), info={"embedding_model": "standin"})
+
+
+def standin_engine():
+    """EnhancedAWSStudyPartner on stand-in embeddings and chat model (STUDY_PARTNER_FACTORY target)."""
+    from rag_engine import EnhancedAWSStudyPartner
+    from services.local_index import LocalVectorIndex
+    from utils.embedding_config import embedding_dimension
+
+    latency = StandInLatency.from_env()
+    embeddings = StandInEmbeddings(embedding_dimension(), latency)
+    index_dir = tempfile.mkdtemp(prefix="standin-index-")
+    atexit.register(shutil.rmtree, index_dir, ignore_errors=True)
+    build_standin_index(index_dir, embeddings)
+
+    print(f"🧪 Engine on local stand-ins: {latency.to_dict()}")
+    return EnhancedAWSStudyPartner(
+        local_index=LocalVectorIndex(index_dir, mode="int8"),
+        embeddings=embeddings,
+        llm=StandInChatModel(latency)
+    )
@@ -0,0 +1,185 @@
+"""Token-aware, structure-aware chunking for extracted PDF pages."""
+import re
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+# Section headings: markdown, "Chapter 3", "Domain 2:", "1.2 Amazon S3", ALL CAPS lines
+HEADING_RE = re.compile(
+    r"^(#{1,6}\s+\S"
+    r"|(?i:chapter|section|domain|module|part|lesson)\s+\d+\b"
+    r"|\d+(\.\d+)*\.?\s+[A-Z][^.]{0,80}$)"
+)
+
+SENTENCE_END = (".", "?", "!", ":")
+
+# (text, page number, is_heading)
+Block = Tuple[str, int, bool]
+
+
+def is_heading(line: str) -> bool:
+    """Heuristic heading detection for a single stripped line."""
+    if len(line) > 100:
+        return False
+    if HEADING_RE.match(line):
+        return True
+    if not line.isupper() or line.endswith("."):
+        return False
+    return sum(ch.isalpha() for ch in line) >= 4
+
+
+class TokenChunker:
+    """
+    Packs page text into chunks measured in embedding-model tokens.
+
+    Pages are split once into blocks (sentence-terminated runs of lines and
+    heading lines), all blocks are encoded in one batched tiktoken call, and
+    a single greedy pass packs blocks into chunks. Nothing is re-measured,
+    so the whole pipeline is linear in the input size.
+
+    Chunks never start mid-block, a heading closes the current chunk once it
+    holds at least min_tokens, and each chunk records its token count and
+    the pages it spans.
+    """
+
+    def __init__(
+        self,
+        chunk_tokens: int = 256,
+        overlap_tokens: int = 32,
+        min_tokens: Optional[int] = None,
+        encoding_name: str = "cl100k_base"
+    ):
+        if overlap_tokens >= chunk_tokens:
+            raise ValueError("overlap_tokens must be smaller than chunk_tokens")
+        self.chunk_tokens = chunk_tokens
+        self.overlap_tokens = overlap_tokens
+        self.min_tokens = min_tokens if min_tokens is not None else chunk_tokens // 4
+        self.encoding_name = encoding_name
+        self._encoding = None
+
+    @property
+    def encoding(self):
+        # Loaded lazily: tiktoken reads its BPE ranks (possibly from the
+        # network) on first use. Offline, cl100k_base falls back to the
+        # estimate in utils.tokens instead of failing.
+        if self._encoding is None:
+            if self.encoding_name == "cl100k_base":
+                from utils.tokens import get_encoding
+                self._encoding = get_encoding()
+            else:
+                import tiktoken
+                self._encoding = tiktoken.get_encoding(self.encoding_name)
+        return self._encoding
+
+    @encoding.setter
+    def encoding(self, encoding):
+        self._encoding = encoding
+
+    def split_blocks(self, pages: List[str]) -> Iterator[Block]:
+        """Split pages into blocks that never cross a page or heading boundary."""
+        for page_no, page in enumerate(pages, start=1):
+            current: List[str] = []
+            for raw in page.splitlines():
+                line = raw.strip()
+                if not line:
+                    if current:
+                        yield "\n".join(current), page_no, False
+                        current = []
+                    continue
+                if is_heading(line):
+                    if current:
+                        yield "\n".join(current), page_no, False
+                        current = []
+                    yield line, page_no, True
+                    continue
+                current.append(line)
+                if line.endswith(SENTENCE_END):
+                    yield "\n".join(current), page_no, False
+                    current = []
+            if current:
+                yield "\n".join(current), page_no, False
+
+    def chunk_pages(self, pages: List[str]) -> List[Dict]:
+        """
+        Chunk a document given as one string per page.
+
+        Returns:
+            Dicts with text, token_count, page_start, page_end and heading
+        """
+        blocks = list(self.split_blocks(pages))
+        if not blocks:
+            return []
+        token_ids = self.encoding.encode_ordinary_batch([text for text, _, _ in blocks])
+
+        chunks: List[Dict] = []
+        # Pending blocks: (text, tokens, page)
+        current: List[Tuple[str, int, int]] = []
+        current_tokens = 0
+        heading = None
+        chunk_heading = None
+
+        def flush(keep_overlap: bool):
+            nonlocal current, current_tokens, chunk_heading
+            if not current:
+                return
+            chunks.append({
+                "text": "\n".join(text for text, _, _ in current),
+                # Each "\n" separator costs roughly one token
+                "token_count": current_tokens + len(current) - 1,
+                "page_start": current[0][2],
+                "page_end": current[-1][2],
+                "heading": chunk_heading
+            })
+
+            carried: List[Tuple[str, int, int]] = []
+            carried_tokens = 0
+            if keep_overlap and self.overlap_tokens:
+                for block in reversed(current):
+                    if carried_tokens + block[1] > self.overlap_tokens:
+                        break
+                    carried.append(block)
+                    carried_tokens += block[1]
+                carried.reverse()
+            current, current_tokens = carried, carried_tokens
+            chunk_heading = heading
+
+        for (text, page_no, block_is_heading), ids in zip(blocks, token_ids):
+            n_tokens = len(ids)
+
+            if block_is_heading:
+                if current_tokens >= self.min_tokens:
+                    flush(keep_overlap=False)
+                heading = text
+                if not current:
+                    chunk_heading = heading
+
+            if n_tokens > self.chunk_tokens:
+                # A run with no usable boundary: cut it into token windows
+                flush(keep_overlap=False)
+                step = self.chunk_tokens - self.overlap_tokens
+                for start in range(0, n_tokens, step):
+                    window = ids[start:start + self.chunk_tokens]
+                    chunks.append({
+                        "text": self.encoding.decode(window),
+                        "token_count": len(window),
+                        "page_start": page_no,
+                        "page_end": page_no,
+                        "heading": heading
+                    })
+                    if start + self.chunk_tokens >= n_tokens:
+                        break
+                chunk_heading = heading
+                continue
+
+            if current_tokens + n_tokens + len(current) > self.chunk_tokens:
+                flush(keep_overlap=True)
+                # Overlap must still leave room for the incoming block
+                while current and current_tokens + n_tokens + len(current) > self.chunk_tokens:
+                    current_tokens -= current.pop(0)[1]
+
+            if not current:
+                chunk_heading = heading
+            current.append((text, n_tokens, page_no))
+            current_tokens += n_tokens
+
+        flush(keep_overlap=False)
+        return chunks
@@ -0,0 +1,214 @@
+"""Lightweight tracing: OpenTelemetry-shaped spans exported as JSON lines or to the console.
+
+    with span("retrieval", k=5) as s:
+        docs = search(...)
+        s.set(chunks=len(docs))
+
+Spans nest through a context variable, so the retrieval, prompt and
+generation spans of one request share its trace id and hang under its
+root span. A request or job id set on a span ("request.id", "job.id") is
+copied to every span below it. Each exported record carries the OTLP span
+fields (trace_id, span_id, parent_span_id, name, start/end_time_unix_nano,
+attributes, status), so traces can be forwarded to an OpenTelemetry
+collector as they are.
+
+Configured with $TRACING: off (default), console, or jsonl, written to
+$TRACE_FILE (default data/traces.jsonl). While tracing is off, span()
+returns one shared no-op span: no ids, clock reads or allocations.
+Attributes that cost something to compute should be guarded with
+`if s.recording:`.
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+DEFAULT_TRACE_FILE = Path(__file__).resolve().parent.parent.parent / "data" / "traces.jsonl"
+
+# Attributes inherited by child spans, so every span of a request or job carries its id
+CORRELATION_KEYS = ("request.id", "job.id")
+
+_current_span = contextvars.ContextVar("trace_span", default=None)
+
+
+class Span:
+    """One timed operation; use as a context manager, or call end() when done."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_span_id", "depth", "attributes",
+                 "status", "start_ns", "end_ns", "_token", "_exporter")
+    recording = True
+
+    def __init__(self, name: str, attributes: Dict, parent: Optional["Span"], exporter):
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        if parent is None:
+            self.trace_id = os.urandom(16).hex()
+            self.parent_span_id = None
+            self.depth = 0
+            self.attributes = attributes
+        else:
+            self.trace_id = parent.trace_id
+            self.parent_span_id = parent.span_id
+            self.depth = parent.depth + 1
+            inherited = {key: parent.attributes[key] for key in CORRELATION_KEYS if key in parent.attributes}
+            self.attributes = {**inherited, **attributes}
+        self.status = "OK"
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self._token = None
+        self._exporter = exporter
+
+    def set(self, **attributes) -> "Span":
+        self.attributes.update(attributes)
+        return self
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            self._exporter.export(self)
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def to_dict(self) -> Dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "name": self.name,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "status": self.status
+        }
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.status = "ERROR"
+            self.attributes["error.type"] = exc_type.__name__
+            self.attributes["error.message"] = str(exc)[:200]
+        _current_span.reset(self._token)
+        self.end()
+
+
+class _NoopSpan:
+    """Stand-in returned while tracing is off."""
+
+    __slots__ = ()
+    recording = False
+    trace_id = None
+
+    def set(self, **attributes) -> "_NoopSpan":
+        return self
+
+    def end(self):
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class JsonLinesExporter:
+    """Appends one JSON record per finished span to a file."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._file = open(self.path, "a", encoding="utf-8", buffering=1)
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class ConsoleExporter:
+    """Prints each finished span, indented under its parent (children print first)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        attributes = " ".join(
+            f"{key}={value}" for key, value in span.attributes.items() if key not in CORRELATION_KEYS
+        )
+        status = "" if span.status == "OK" else f" [{span.status}]"
+        with self._lock:
+            print(f"🔭 {span.trace_id[:8]} {'  ' * span.depth}{span.name} "
+                  f"{span.duration_ms:.1f}ms{status} {attributes}".rstrip(), flush=True)
+
+
+_UNSET = object()
+_exporter = _UNSET
+_configure_lock = threading.Lock()
+_first_use_lock = threading.Lock()
+
+
+def configure(mode: Optional[str] = None, path=None):
+    """
+    Set the exporter: "off", "console" or "jsonl" (default: $TRACING).
+    Returns the exporter, or None when tracing is off.
+    """
+    global _exporter
+    mode = (mode or os.getenv("TRACING", "off")).lower()
+    with _configure_lock:
+        if mode == "console":
+            _exporter = ConsoleExporter()
+        elif mode in ("jsonl", "json", "on"):
+            _exporter = JsonLinesExporter(path or os.getenv("TRACE_FILE", str(DEFAULT_TRACE_FILE)))
+        else:
+            _exporter = None
+    return _exporter
+
+
+def span(name: str, **attributes):
+    """
+    A child of the current span (or a new trace's root); a no-op while tracing is off.
+
+    Entering it makes it the current span. For work that doesn't fit a
+    with-block, keep the span and call end() when the work is done.
+    """
+    exporter = _exporter
+    if exporter is None:
+        return NOOP_SPAN
+    if exporter is _UNSET:
+        exporter = _configure_from_env()
+        if exporter is None:
+            return NOOP_SPAN
+    return Span(name, attributes, _current_span.get(), exporter)
+
+
+def current_span():
+    """The active span, or the no-op span."""
+    return _current_span.get() or NOOP_SPAN
+
+
+def _configure_from_env():
+    # First use: $TRACING is read now, after entry points have loaded .env
+    with _first_use_lock:
+        return configure() if _exporter is _UNSET else _exporter
+
+
+def tracing_enabled() -> bool:
+    exporter = _configure_from_env() if _exporter is _UNSET else _exporter
+    return exporter is not None
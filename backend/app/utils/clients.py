@@ -0,0 +1,369 @@
+"""Long-lived, pooled HTTP clients shared by the engine, ingestion and CLIs.
+
+One httpx client carries every OpenAI call (embeddings and chat), so DNS
+lookups, TCP connections and TLS sessions are reused across requests and
+components. One Pinecone client and one Index handle per index name are
+shared the same way. Pool sizes, keep-alive and timeouts come from the
+environment:
+
+    HTTP_MAX_CONNECTIONS      (20)   total OpenAI connections
+    HTTP_MAX_KEEPALIVE        (10)   idle connections kept open
+    HTTP_KEEPALIVE_EXPIRY     (30)   seconds an idle connection is kept
+    HTTP_CONNECT_TIMEOUT      (5)    seconds
+    HTTP_READ_TIMEOUT         (60)   seconds
+    HTTP_MAX_RETRIES          (2)    retries of connection errors, 408/409/429/5xx
+    HTTP2                     (on)   used when the h2 package is installed
+    PINECONE_POOL_THREADS     (4)    threads for async/parallel upserts
+    PINECONE_POOL_MAXSIZE     (20)   urllib3 connections per Pinecone host
+    OPENAI_RPM / OPENAI_TPM   (unset) account quota; enables the rate governor
+    RATE_BULK_RESERVE         (0.2)  share of the quota kept free for interactive calls
+"""
+import importlib.util
+import os
+import threading
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Optional
+
+from services.deadlines import RequestCancelled, current_deadline
+from services.rate_governor import RateGovernor, RateLimitTimeout, estimate_request_tokens, parse_retry_after
+
+# Statuses the OpenAI SDK would retry; retries happen in the transport instead
+RETRY_STATUSES = (408, 409, 429, 500, 502, 503, 504)
+
+
+def _env_flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() not in ("off", "0", "false")
+
+
+@dataclass
+class ClientConfig:
+    max_connections: int = 20
+    max_keepalive: int = 10
+    keepalive_expiry: float = 30.0
+    connect_timeout: float = 5.0
+    read_timeout: float = 60.0
+    max_retries: int = 2
+    http2: bool = True
+    pinecone_pool_threads: int = 4
+    pinecone_pool_maxsize: int = 20
+    openai_rpm: Optional[int] = None
+    openai_tpm: Optional[int] = None
+    bulk_reserve: float = 0.2
+
+    @classmethod
+    def from_env(cls) -> "ClientConfig":
+        return cls(
+            max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "20")),
+            max_keepalive=int(os.getenv("HTTP_MAX_KEEPALIVE", "10")),
+            keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30")),
+            connect_timeout=float(os.getenv("HTTP_CONNECT_TIMEOUT", "5")),
+            read_timeout=float(os.getenv("HTTP_READ_TIMEOUT", "60")),
+            max_retries=int(os.getenv("HTTP_MAX_RETRIES", "2")),
+            # HTTP/2 needs the optional h2 package
+            http2=_env_flag("HTTP2", "on") and importlib.util.find_spec("h2") is not None,
+            pinecone_pool_threads=int(os.getenv("PINECONE_POOL_THREADS", "4")),
+            pinecone_pool_maxsize=int(os.getenv("PINECONE_POOL_MAXSIZE", "20")),
+            openai_rpm=int(os.environ["OPENAI_RPM"]) if os.getenv("OPENAI_RPM") else None,
+            openai_tpm=int(os.environ["OPENAI_TPM"]) if os.getenv("OPENAI_TPM") else None,
+            bulk_reserve=float(os.getenv("RATE_BULK_RESERVE", "0.2")),
+        )
+
+
+@dataclass
+class _TransportStats:
+    requests: int = 0
+    connections_opened: int = 0
+    tls_handshakes: int = 0
+    request_seconds: float = 0.0
+    hosts: Counter = field(default_factory=Counter)
+
+
+def _counting_transport(config: ClientConfig, stats: _TransportStats, governor: Optional[RateGovernor]):
+    """
+    httpx transport that counts requests and new connections, passes
+    every attempt through the rate governor (if configured), caps
+    timeouts at the current request deadline, and retries failed attempts.
+
+    Retries live here rather than in the OpenAI SDK (whose clients are
+    built with max_retries=0): the SDK wraps any exception raised by the
+    transport, including a cancelled or expired deadline, as a retryable
+    connection error, and would keep a dead request's worker busy with
+    more attempts and backoff. Here every attempt re-checks the deadline,
+    and a backoff that would outlast it is not slept.
+    """
+    import httpx
+
+    class CountingTransport(httpx.HTTPTransport):
+        def handle_request(self, request):
+            deadline = current_deadline()
+            timeouts = request.extensions.get("timeout", {})
+            attempt = 0
+            while True:
+                try:
+                    response = self._attempt(request, deadline, timeouts)
+                except httpx.TransportError:
+                    # A timeout capped by the deadline is re-raised as such
+                    if deadline is not None:
+                        deadline.check("upstream")
+                    if attempt >= config.max_retries or not self._time_for(deadline, self._backoff(None, attempt)):
+                        raise
+                    time.sleep(self._backoff(None, attempt))
+                    attempt += 1
+                    continue
+                delay = self._backoff(response, attempt)
+                if not self._retryable(response, attempt) or not self._time_for(deadline, delay):
+                    return response
+                response.close()
+                time.sleep(delay)
+                attempt += 1
+
+        def _attempt(self, request, deadline, timeouts):
+            if deadline is not None:
+                deadline.check("upstream")
+                request.extensions["timeout"] = {
+                    name: deadline.cap(value) for name, value in timeouts.items()
+                }
+            if governor is not None:
+                try:
+                    governor.acquire(
+                        estimate_request_tokens(request.content),
+                        timeout=deadline.remaining() if deadline is not None else None
+                    )
+                except RateLimitTimeout:
+                    if deadline is None:
+                        raise
+                    # The deadline ran out while queued for capacity
+                    deadline.cancel("deadline_exceeded")
+                    raise RequestCancelled(deadline.reason, "rate_limit")
+            request.extensions["trace"] = self._trace
+            stats.requests += 1
+            stats.hosts[request.url.host] += 1
+            start = time.perf_counter()
+            try:
+                response = super().handle_request(request)
+            finally:
+                stats.request_seconds += time.perf_counter() - start
+            if governor is not None:
+                if response.status_code == 429:
+                    governor.throttle(parse_retry_after(response.headers))
+                elif response.status_code < 400:
+                    governor.report_success()
+            return response
+
+        @staticmethod
+        def _time_for(deadline, delay: float) -> bool:
+            """Whether the deadline leaves room to back off and try again."""
+            remaining = deadline.remaining() if deadline is not None else None
+            return remaining is None or remaining > delay
+
+        @staticmethod
+        def _retryable(response, attempt: int) -> bool:
+            if attempt >= config.max_retries:
+                return False
+            should_retry = response.headers.get("x-should-retry")
+            if should_retry in ("true", "false"):
+                return should_retry == "true"
+            return response.status_code in RETRY_STATUSES
+
+        @staticmethod
+        def _backoff(response, attempt: int) -> float:
+            if response is not None and response.status_code == 429:
+                # The governor already holds every caller back for Retry-After
+                return 0.0 if governor is not None else min(parse_retry_after(response.headers), 60.0)
+            return min(0.5 * 2 ** attempt, 8.0)
+
+        @staticmethod
+        def _trace(event_name, info):
+            if event_name == "connection.connect_tcp.complete":
+                stats.connections_opened += 1
+            elif event_name == "connection.start_tls.complete":
+                stats.tls_handshakes += 1
+
+    return CountingTransport(
+        http2=config.http2,
+        limits=httpx.Limits(
+            max_connections=config.max_connections,
+            max_keepalive_connections=config.max_keepalive,
+            keepalive_expiry=config.keepalive_expiry
+        )
+    )
+
+
+class ClientManager:
+    """Owns the shared clients; everything is created lazily on first use."""
+
+    def __init__(self, config: Optional[ClientConfig] = None):
+        self.config = config or ClientConfig.from_env()
+        self._lock = threading.RLock()
+        self._transport_stats = _TransportStats()
+        self.governor = None
+        if self.config.openai_rpm or self.config.openai_tpm:
+            self.governor = RateGovernor(
+                self.config.openai_rpm, self.config.openai_tpm, bulk_reserve=self.config.bulk_reserve
+            )
+        self._http_client = None
+        self._embeddings = {}
+        self._chat_models = {}
+        self._pinecone = None
+        self._indexes = {}
+        self._vectorstores = {}
+
+    @property
+    def http_client(self):
+        """The httpx.Client used for all OpenAI traffic."""
+        with self._lock:
+            if self._http_client is None:
+                import httpx
+
+                self._http_client = httpx.Client(
+                    transport=_counting_transport(self.config, self._transport_stats, self.governor),
+                    timeout=httpx.Timeout(
+                        self.config.read_timeout, connect=self.config.connect_timeout
+                    )
+                )
+            return self._http_client
+
+    def embeddings(self, model: Optional[str] = None, dimension: Optional[int] = None):
+        """OpenAIEmbeddings for (model, dimension) on the shared client."""
+        from utils.embedding_config import build_embeddings, embedding_dimension, embedding_model
+
+        model = model or embedding_model()
+        dimension = dimension or embedding_dimension(model)
+        with self._lock:
+            if (model, dimension) not in self._embeddings:
+                self._embeddings[(model, dimension)] = build_embeddings(
+                    model, dimension, http_client=self.http_client, max_retries=0
+                )
+            return self._embeddings[(model, dimension)]
+
+    def chat_model(self, model: str, **params):
+        """ChatOpenAI for (model, params) on the shared client."""
+        from langchain_openai import ChatOpenAI
+
+        key = (model, tuple(sorted(params.items())))
+        with self._lock:
+            if key not in self._chat_models:
+                # The shared transport retries (see _counting_transport)
+                self._chat_models[key] = ChatOpenAI(
+                    model_name=model, http_client=self.http_client, max_retries=0, **params
+                )
+            return self._chat_models[key]
+
+    @property
+    def pinecone(self):
+        """Shared Pinecone control-plane client."""
+        with self._lock:
+            if self._pinecone is None:
+                from pinecone import Pinecone as PineconeClient
+
+                kwargs = {
+                    "api_key": os.getenv("PINECONE_API_KEY"),
+                    "pool_threads": self.config.pinecone_pool_threads
+                }
+                try:
+                    from pinecone.core.client.configuration import Configuration
+
+                    openapi_config = Configuration()
+                    openapi_config.connection_pool_maxsize = self.config.pinecone_pool_maxsize
+                    kwargs["openapi_config"] = openapi_config
+                except ImportError:
+                    pass
+                self._pinecone = PineconeClient(**kwargs)
+            return self._pinecone
+
+    def index(self, name: str):
+        """Shared data-plane handle for one Pinecone index."""
+        with self._lock:
+            if name not in self._indexes:
+                self._indexes[name] = self.pinecone.Index(
+                    name, pool_threads=self.config.pinecone_pool_threads
+                )
+            return self._indexes[name]
+
+    def vectorstore(self, index_name: str, embeddings):
+        """LangChain Pinecone wrapper over the shared index handle."""
+        from langchain_pinecone import Pinecone as PineconeVectorStore
+
+        key = (index_name, id(embeddings))
+        with self._lock:
+            if key not in self._vectorstores:
+                self._vectorstores[key] = PineconeVectorStore(
+                    self.index(index_name), embeddings, "text"
+                )
+            return self._vectorstores[key]
+
+    def stats(self) -> Dict:
+        """Configuration and pool counters, for tuning the limits."""
+        stats = self._transport_stats
+        result = {
+            "config": asdict(self.config),
+            "openai": {
+                "requests": stats.requests,
+                "connections_opened": stats.connections_opened,
+                "tls_handshakes": stats.tls_handshakes,
+                "requests_per_connection": (
+                    round(stats.requests / stats.connections_opened, 2)
+                    if stats.connections_opened else None
+                ),
+                "mean_request_ms": (
+                    round(stats.request_seconds / stats.requests * 1000, 1)
+                    if stats.requests else None
+                ),
+                "hosts": dict(stats.hosts),
+                **self._httpx_pool_state()
+            },
+            "pinecone": {name: self._urllib3_pool_state(index) for name, index in self._indexes.items()},
+            "rate_governor": self.governor.stats() if self.governor else None
+        }
+        return result
+
+    def _httpx_pool_state(self) -> Dict:
+        if self._http_client is None:
+            return {"open_connections": 0, "idle_connections": 0}
+        try:
+            # httpcore connection pool behind the transport
+            connections = list(self._http_client._transport._pool.connections)
+        except AttributeError:
+            return {}
+        return {
+            "open_connections": len(connections),
+            "idle_connections": sum(1 for c in connections if c.is_idle()),
+            "http2_connections": sum(1 for c in connections if "HTTP/2" in repr(c))
+        }
+
+    @staticmethod
+    def _urllib3_pool_state(index) -> Dict:
+        try:
+            pool_manager = index._vector_api.api_client.rest_client.pool_manager
+        except AttributeError:
+            return {}
+        pools = [pool_manager.pools[key] for key in list(pool_manager.pools.keys())]
+        return {
+            "hosts": len(pools),
+            "connections_opened": sum(pool.num_connections for pool in pools),
+            "requests": sum(pool.num_requests for pool in pools)
+        }
+
+    def close(self):
+        with self._lock:
+            if self._http_client is not None:
+                self._http_client.close()
+                self._http_client = None
+            self._embeddings.clear()
+            self._chat_models.clear()
+            self._vectorstores.clear()
+
+
+_clients: Optional[ClientManager] = None
+_clients_lock = threading.Lock()
+
+
+def get_clients() -> ClientManager:
+    """Process-wide ClientManager."""
+    global _clients
+    with _clients_lock:
+        if _clients is None:
+            _clients = ClientManager()
+        return _clients
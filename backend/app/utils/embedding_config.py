@@ -0,0 +1,87 @@
+"""Embedding model and dimension configuration shared by ingestion and querying."""
+import os
+from typing import Optional
+
+
+DEFAULT_EMBEDDING_MODEL = "text-embedding-3-large"
+
+# Native output size per model
+NATIVE_DIMENSIONS = {
+    "text-embedding-3-large": 3072,
+    "text-embedding-3-small": 1536,
+    "text-embedding-ada-002": 1536,
+}
+
+# Models that accept the `dimensions` parameter (shortened embeddings)
+SHORTENABLE_MODELS = {"text-embedding-3-large", "text-embedding-3-small"}
+
+# USD per 1M input tokens
+EMBEDDING_PRICES = {
+    "text-embedding-3-large": 0.13,
+    "text-embedding-3-small": 0.02,
+    "text-embedding-ada-002": 0.10,
+}
+
+
+def embedding_model() -> str:
+    """Embedding model name from $EMBEDDING_MODEL."""
+    return os.getenv("EMBEDDING_MODEL", DEFAULT_EMBEDDING_MODEL)
+
+
+def embedding_dimension(model: Optional[str] = None) -> int:
+    """
+    Embedding dimension from $EMBEDDING_DIMENSIONS, defaulting to the
+    model's native size.
+    """
+    model = model or embedding_model()
+    configured = os.getenv("EMBEDDING_DIMENSIONS")
+    if configured:
+        dimension = int(configured)
+    else:
+        dimension = NATIVE_DIMENSIONS.get(model, 3072)
+
+    native = NATIVE_DIMENSIONS.get(model)
+    if native and dimension != native and model not in SHORTENABLE_MODELS:
+        raise ValueError(f"{model} does not support shortened embeddings (requested {dimension})")
+    if native and dimension > native:
+        raise ValueError(f"{model} produces at most {native} dimensions (requested {dimension})")
+    return dimension
+
+
+def embedding_price(model: Optional[str] = None) -> float:
+    """USD per 1M embedded tokens (text-embedding-3-large pricing if unknown)."""
+    return EMBEDDING_PRICES.get(model or embedding_model(), 0.13)
+
+
+def build_embeddings(
+    model: Optional[str] = None, dimension: Optional[int] = None, http_client=None, max_retries: Optional[int] = None
+):
+    """
+    OpenAIEmbeddings configured for the given (or configured) model and dimension.
+    
+    Prefer utils.clients.get_clients().embeddings(), which reuses the
+    shared pooled HTTP client.
+    """
+    from langchain_openai import OpenAIEmbeddings
+
+    model = model or embedding_model()
+    dimension = dimension or embedding_dimension(model)
+
+    kwargs = {"model": model}
+    if http_client is not None:
+        kwargs["http_client"] = http_client
+    if max_retries is not None:
+        kwargs["max_retries"] = max_retries
+    if dimension != NATIVE_DIMENSIONS.get(model):
+        kwargs["dimensions"] = dimension
+    return OpenAIEmbeddings(**kwargs)
+
+
+def check_index_dimension(index_dimension: Optional[int], expected: int, index_name: str):
+    """Fail fast when the index and the embedding configuration disagree."""
+    if index_dimension is not None and int(index_dimension) != expected:
+        raise ValueError(
+            f"Index '{index_name}' has dimension {index_dimension} but embeddings are "
+            f"configured for {expected} ({embedding_model()}). Set EMBEDDING_DIMENSIONS "
+            f"to match, or re-index."
+        )
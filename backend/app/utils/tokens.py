@@ -0,0 +1,91 @@
+"""Token counting helpers for prompt budgeting."""
+_encoding = None
+_encoding_failed = False
+_approx_encoding = None
+
+
+class ApproxEncoding:
+    """
+    Offline stand-in for a tiktoken Encoding, used when the BPE ranks can't
+    be loaded (no tiktoken, or no network and an empty cache). "Tokens" are
+    4-character pieces, the same estimate count_tokens falls back to. A
+    piece's id is its code points packed into one integer (plus its length),
+    so decode() round-trips without keeping a vocabulary in memory.
+    """
+
+    name = "approx-4-chars"
+
+    @staticmethod
+    def _id(piece: str) -> int:
+        return int.from_bytes(piece.encode("utf-32-le"), "little") << 3 | len(piece)
+
+    @staticmethod
+    def _piece(token_id: int) -> str:
+        length = token_id & 7
+        return (token_id >> 3).to_bytes(4 * length, "little").decode("utf-32-le")
+
+    def encode_ordinary(self, text: str) -> list:
+        return [self._id(text[i:i + 4]) for i in range(0, len(text), 4)]
+
+    def encode_ordinary_batch(self, texts) -> list:
+        return [self.encode_ordinary(text) for text in texts]
+
+    def decode(self, ids) -> str:
+        return "".join(self._piece(i) for i in ids)
+
+
+def _get_encoding():
+    """cl100k_base encoding, or None if tiktoken is unavailable."""
+    global _encoding, _encoding_failed
+    if _encoding is None and not _encoding_failed:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            # Fall back to a 4-characters-per-token estimate
+            _encoding_failed = True
+    return _encoding
+
+
+def get_encoding():
+    """cl100k_base, or the shared ApproxEncoding when tiktoken is unavailable."""
+    global _approx_encoding
+    encoding = _get_encoding()
+    if encoding is not None:
+        return encoding
+    if _approx_encoding is None:
+        print("⚠️  tiktoken cl100k_base unavailable; token counts are estimated (4 characters per token)")
+        _approx_encoding = ApproxEncoding()
+    return _approx_encoding
+
+
+def count_tokens(text: str) -> int:
+    """Number of tokens in text (estimated if tiktoken is unavailable)."""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode_ordinary(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, suffix: str = "…") -> str:
+    """Cut text to at most max_tokens, ending on a word boundary."""
+    if max_tokens <= 0:
+        return ""
+    encoding = _get_encoding()
+    if encoding is None:
+        if len(text) <= max_tokens * 4:
+            return text
+        cut = text[:max_tokens * 4]
+    else:
+        ids = encoding.encode_ordinary(text)
+        if len(ids) <= max_tokens:
+            return text
+        cut = encoding.decode(ids[:max_tokens])
+
+    boundary = cut.rfind(" ")
+    if boundary > len(cut) // 2:
+        cut = cut[:boundary]
+    return cut.rstrip(" ,;:") + suffix
+
@@ -1,18 +1,109 @@
 import os
-from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Dict, Optional
 from dotenv import load_dotenv
 import json
 from pathlib import Path
 import time
 import re
+import sys
 
 # Set OpenAI API key BEFORE importing langchain
 load_dotenv()
-os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY")
+if os.getenv("OPENAI_API_KEY"):
+    os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY")
 
-from langchain_openai import OpenAIEmbeddings
-from langchain_pinecone import Pinecone as PineconeVectorStore
-from pinecone import Pinecone as PineconeClient, ServerlessSpec
+from pinecone import ServerlessSpec
+
+from services.partitions import partition_namespace
+from services.rate_governor import BULK, request_priority
+from services.response_cache import bump_index_epoch
+from services.service_tagger import chunk_key
+from services.snapshot import IndexSnapshot, SnapshotWriter
+from services.tracing import span
+from utils.clients import get_clients
+from utils.embedding_config import check_index_dimension, embedding_dimension, embedding_model
+
+PROCESSED_DIR = Path(__file__).resolve().parent.parent / "data" / "processed"
+
+
+def _report_throughput(verb: str, count: int, size: int, seconds: float):
+    seconds = max(seconds, 1e-9)
+    print(f"✅ {verb} {count:,} vectors ({size / 1e6:.1f} MB) in {seconds:.2f}s "
+          f"- {count / seconds:,.0f} vectors/s, {size / 1e6 / seconds:.1f} MB/s")
+
+
+def export_local_snapshot(index_path: str, snapshot_path: str) -> Dict:
+    """Write a snapshot of a local index (see services.local_index); needs no API keys."""
+    from services.local_index import LocalVectorIndex
+    
+    start = time.perf_counter()
+    index = LocalVectorIndex(index_path, mode="float32")
+    info = {"source": f"local:{index.path}", "embedding_model": index.meta.get("embedding_model")}
+    with SnapshotWriter(snapshot_path, index.dimension, info) as writer:
+        for i in range(0, index.count, 10000):
+            records = index.records[i:i + 10000]
+            metadatas = [{**record["metadata"], "text": record["text"]} for record in records]
+            writer.add(
+                [record["id"] for record in records],
+                index.vectors[i:i + 10000],
+                metadatas,
+                [partition_namespace(record["metadata"]) for record in records]
+            )
+    stats = {**writer.stats, "seconds": time.perf_counter() - start}
+    _report_throughput("Exported", stats["count"], stats["bytes"], stats["seconds"])
+    return stats
+
+
+def merge_local_index(index_path: str, vectors, records: List[Dict], replace_files=()) -> Path:
+    """
+    Publish a new generation of a local index: the live build's rows, minus
+    those from replace_files (and any with the same ids), plus the given
+    rows. Existing rows are copied as they are, not re-embedded.
+    """
+    import numpy as np
+    from services.local_index import LocalVectorIndex, MODES, resolve_generation
+    
+    modes, info = MODES, {}
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if (resolve_generation(index_path) / "meta.json").exists():
+        current = LocalVectorIndex(index_path, mode="float32")
+        check_index_dimension(current.dimension, vectors.shape[1], str(current.path))
+        replaced = set(replace_files)
+        new_ids = {record["id"] for record in records}
+        keep = [
+            row for row, record in enumerate(current.records)
+            if record["metadata"].get("filename") not in replaced and record["id"] not in new_ids
+        ]
+        vectors = np.concatenate([current.vectors[keep], vectors])
+        records = [current.records[row] for row in keep] + records
+        modes = current.meta["modes"]
+        info = {key: current.meta[key] for key in ("embedding_model",) if key in current.meta}
+    return LocalVectorIndex.build_generation(index_path, vectors, records, modes=modes, info=info)
+
+
+def import_snapshot_local(snapshot_path: str, index_path: str, modes=None) -> Dict:
+    """Build a local index generation from a snapshot, without re-embedding; needs no API keys."""
+    from services.local_index import LocalVectorIndex, MODES
+    
+    start = time.perf_counter()
+    snapshot = IndexSnapshot(snapshot_path)
+    records = []
+    for row in snapshot.rows():
+        metadata = dict(row["metadata"])
+        records.append({"id": row["id"], "text": metadata.pop("text", ""), "metadata": metadata})
+    generation = LocalVectorIndex.build_generation(
+        index_path, snapshot.vectors, records, modes=modes or MODES,
+        info={"embedding_model": snapshot.info.get("embedding_model"), "snapshot": str(snapshot_path)}
+    )
+    stats = {
+        "count": snapshot.count,
+        "bytes": snapshot.path.stat().st_size,
+        "seconds": time.perf_counter() - start,
+        "generation": generation.name
+    }
+    _report_throughput("Imported", stats["count"], stats["bytes"], stats["seconds"])
+    return stats
 
 
 def clean_text(text: str) -> str:
@@ -42,35 +133,46 @@ def clean_text(text: str) -> str:
 
 
 class VectorStoreManager:
-    def __init__(self):
+    def __init__(self, require_pinecone: bool = True):
+        """require_pinecone=False for local index builds only (no Pinecone key needed)."""
         # Check for API keys
         openai_key = os.getenv("OPENAI_API_KEY")
         pinecone_key = os.getenv("PINECONE_API_KEY")
         
         if not openai_key:
             raise ValueError("OPENAI_API_KEY not found in .env file")
-        if not pinecone_key:
+        if require_pinecone and not pinecone_key:
             raise ValueError("PINECONE_API_KEY not found in .env file")
         
         print(f"✅ OpenAI API key found: {openai_key[:20]}...")
-        print(f"✅ Pinecone API key found: {pinecone_key[:20]}...")
+        if pinecone_key:
+            print(f"✅ Pinecone API key found: {pinecone_key[:20]}...")
+        
+        # Embeddings and Pinecone share the process-wide pooled clients
+        self.clients = get_clients()
         
         # Initialize embeddings
         try:
-            self.embeddings = OpenAIEmbeddings(
-                model=os.getenv("EMBEDDING_MODEL", "text-embedding-3-large")
-            )
-            print("✅ OpenAI Embeddings initialized")
+            self.embedding_model = embedding_model()
+            self.dimension = embedding_dimension(self.embedding_model)
+            self.embeddings = self.clients.embeddings(self.embedding_model, self.dimension)
+            print(f"✅ OpenAI Embeddings initialized ({self.embedding_model}, {self.dimension} dims)")
         except Exception as e:
             print(f"❌ Error initializing embeddings: {e}")
             raise
         
         # Initialize Pinecone
-        self.pc = PineconeClient(api_key=pinecone_key)
+        self.pc = self.clients.pinecone if require_pinecone else None
         self.index_name = os.getenv("PINECONE_INDEX_NAME", "aws-study-partner")
         
-    def create_index(self, dimension: int = 3072):
-        """Create Pinecone index if it doesn't exist."""
+    def create_index(self, dimension: Optional[int] = None):
+        """
+        Create Pinecone index if it doesn't exist.
+        
+        The dimension defaults to the configured embedding dimension; an
+        existing index with a different dimension is rejected.
+        """
+        dimension = dimension or self.dimension
         print("\nChecking for existing indexes...")
         
         try:
@@ -93,13 +195,34 @@ class VectorStoreManager:
                     )
                 )
                 print("✅ Index created successfully!")
-                print("⏳ Waiting 30 seconds for index to initialize...")
-                time.sleep(30)
+                self.wait_until_ready()
             except Exception as e:
                 print(f"❌ Error creating index: {e}")
                 raise
         else:
             print(f"✅ Index '{self.index_name}' already exists")
+            check_index_dimension(
+                self.pc.describe_index(self.index_name).dimension, dimension, self.index_name
+            )
+    
+    def wait_until_ready(self, timeout: float = 300, poll_interval: float = 1.0):
+        """Poll the index status until it reports ready, instead of sleeping blindly."""
+        print("⏳ Waiting for index to initialize...", end=" ", flush=True)
+        start = time.time()
+        delay = poll_interval
+        
+        while True:
+            try:
+                if self.pc.describe_index(self.index_name).status["ready"]:
+                    print(f"ready after {time.time() - start:.1f}s")
+                    return
+            except Exception as e:
+                print(f"\n⚠️  Status check failed: {e}")
+            
+            if time.time() - start > timeout:
+                raise TimeoutError(f"Index '{self.index_name}' not ready after {timeout:.0f}s")
+            time.sleep(delay)
+            delay = min(delay * 1.5, 10.0)
     
     def load_chunks_from_file(self, file_path: str) -> List[Dict]:
         """Load processed chunks from JSON file."""
@@ -113,8 +236,22 @@ class VectorStoreManager:
             print(f"❌ Error loading chunks: {e}")
             raise
     
-    def upload_documents(self, chunks: List[Dict], batch_size: int = 50, start_from: int = 0):
-        """Upload document chunks to Pinecone in batches."""
+    def upload_documents(
+        self, 
+        chunks: List[Dict], 
+        batch_size: int = 50, 
+        start_from: int = 0,
+        progress: Optional[Callable[[int, int], None]] = None
+    ):
+        """
+        Upload document chunks to Pinecone in batches.
+        
+        Args:
+            chunks: Chunks from PDFProcessor
+            batch_size: Chunks embedded and upserted per batch
+            start_from: Chunk offset to resume from
+            progress: Optional callback(chunks_done, total_chunks) run per batch
+        """
         total_chunks = len(chunks)
         print(f"\n{'='*60}")
         print(f"📤 Starting upload of {total_chunks} documents")
@@ -137,12 +274,24 @@ class VectorStoreManager:
         ]
         print("✅ Text cleaning complete\n")
         
+        # Each chunk goes to the namespace for its doc_type (and certification)
+        namespaces = [partition_namespace(metadata) for metadata in metadatas]
+        
+        # Deterministic ids: re-running an upload overwrites instead of duplicating
+        ids = [chunk_key(chunk["metadata"], chunk["chunk_id"]) for chunk in chunks]
+        
+        # A re-ingested file replaces its previous vectors (it may now have
+        # fewer chunks, or chunks in other namespaces), as it does in the
+        # service index. Not when resuming: earlier batches are this run's.
+        if start_from == 0:
+            filenames = sorted({metadata["filename"] for metadata in metadatas if metadata.get("filename")})
+            deleted = self.delete_file_vectors(filenames)
+            if deleted:
+                print(f"🗑️  Removed {deleted} earlier vectors of {len(filenames)} file(s)\n")
+        
         # Upload in batches
         total_batches = (len(texts) + batch_size - 1) // batch_size
-        vectorstore = None
-        
-        # Skip to start_from if resuming
-        start_batch = start_from // batch_size
+        vectorstore = self.get_vectorstore()
         
         for i in range(start_from, len(texts), batch_size):
             batch_num = i // batch_size + 1
@@ -151,29 +300,31 @@ class VectorStoreManager:
             print(f"📦 Batch {batch_num}/{total_batches}: "
                   f"chunks {i+1}-{end_idx}...", end=" ", flush=True)
             
-            batch_texts = texts[i:end_idx]
-            batch_metadatas = metadatas[i:end_idx]
+            # Group the batch by namespace so each partition gets one call
+            groups = {}
+            for j in range(i, end_idx):
+                group_ids, group_texts, group_metadatas = groups.setdefault(namespaces[j], ([], [], []))
+                group_ids.append(ids[j])
+                group_texts.append(texts[j])
+                group_metadatas.append(metadatas[j])
             
             try:
-                if vectorstore is None and i == 0:
-                    # First batch - create vectorstore
-                    vectorstore = PineconeVectorStore.from_texts(
-                        texts=batch_texts,
-                        embedding=self.embeddings,
-                        metadatas=batch_metadatas,
-                        index_name=self.index_name
-                    )
-                else:
-                    # Get existing vectorstore if resuming
-                    if vectorstore is None:
-                        vectorstore = self.get_vectorstore()
-                    
-                    # Add texts to existing vectorstore
-                    vectorstore.add_texts(
-                        texts=batch_texts,
-                        metadatas=batch_metadatas
-                    )
+                # Embedding for ingestion yields to interactive traffic
+                with request_priority(BULK), span(
+                    "upload.batch", batch=batch_num, chunks=end_idx - i, namespaces=len(groups)
+                ) as trace:
+                    if trace.recording:
+                        trace.set(bytes=sum(len(text.encode("utf-8")) for text in texts[i:end_idx]))
+                    for namespace, (group_ids, group_texts, group_metadatas) in groups.items():
+                        vectorstore.add_texts(
+                            texts=group_texts,
+                            metadatas=group_metadatas,
+                            ids=group_ids,
+                            namespace=namespace
+                        )
                 print("✅")
+                if progress:
+                    progress(end_idx, total_chunks)
             except Exception as e:
                 print(f"❌")
                 print(f"\n⚠️  Error in batch {batch_num} (chunks {i+1}-{end_idx}): {e}")
@@ -186,20 +337,180 @@ class VectorStoreManager:
         print(f"{'='*60}\n")
         return vectorstore
     
+    def embed_local_records(
+        self,
+        chunks: List[Dict],
+        batch_size: int = 100,
+        progress: Optional[Callable[[int, int], None]] = None
+    ):
+        """(vectors, records) for a local index build: one {"id", "text", "metadata"} record per chunk."""
+        texts = [clean_text(chunk["text"]) for chunk in chunks]
+        vectors = []
+        for i in range(0, len(texts), batch_size):
+            with request_priority(BULK), span("embed.batch", texts=len(texts[i:i + batch_size])):
+                vectors.extend(self.embeddings.embed_documents(texts[i:i + batch_size]))
+            print(f"   {min(i + batch_size, len(texts))}/{len(texts)}", end="\r", flush=True)
+            if progress:
+                progress(min(i + batch_size, len(texts)), len(texts))
+        
+        records = [
+            {
+                "id": chunk_key(chunk["metadata"], chunk["chunk_id"]),
+                "text": text,
+                "metadata": {**chunk["metadata"], "chunk_id": chunk["chunk_id"]}
+            }
+            for chunk, text in zip(chunks, texts)
+        ]
+        return vectors, records
+    
+    def build_local_index(self, chunks: List[Dict], path: str, batch_size: int = 100, modes=None):
+        """
+        Embed chunks and write a local quantized index (see services.local_index).
+        
+        Args:
+            chunks: Chunks from PDFProcessor
+            path: Index root; the build becomes its next live generation
+            batch_size: Chunks per embedding request
+            modes: Quantized code sets to precompute (default: int8 and binary)
+        """
+        import numpy as np
+        from services.local_index import LocalVectorIndex, MODES
+        
+        print(f"\n📦 Embedding {len(chunks)} chunks for local index at {path}")
+        vectors, records = self.embed_local_records(chunks, batch_size)
+        generation = LocalVectorIndex.build_generation(
+            path, np.array(vectors, dtype=np.float32), records, modes=modes or MODES,
+            info={"embedding_model": self.embedding_model}
+        )
+        print(f"\n✅ Local index written to {generation} (live; running servers pick it up on reload)")
+    
+    def export_snapshot(self, path: str, batch_size: int = 100) -> Dict:
+        """
+        Export every ID, vector and metadata record in the hosted index to a snapshot file.
+        
+        IDs are listed page by page per namespace and fetched batch_size at
+        a time, with fetches running concurrently on the Pinecone pool.
+        """
+        index = self.clients.index(self.index_name)
+        stats = index.describe_index_stats()
+        total = sum(summary.vector_count for summary in stats.namespaces.values())
+        print(f"\n📤 Exporting {total} vectors from '{self.index_name}' to {path}")
+        
+        def fetch(job):
+            namespace, ids = job
+            vectors = index.fetch(ids=ids, namespace=namespace).vectors
+            found = [vectors[i] for i in ids if i in vectors]
+            return namespace, found
+        
+        def jobs():
+            for namespace in stats.namespaces:
+                for page in index.list(namespace=namespace):
+                    for i in range(0, len(page), batch_size):
+                        yield namespace, page[i:i + batch_size]
+        
+        start = time.perf_counter()
+        info = {"source": f"pinecone:{self.index_name}", "embedding_model": self.embedding_model}
+        with SnapshotWriter(path, stats.dimension, info) as writer, \
+                ThreadPoolExecutor(max_workers=self.clients.config.pinecone_pool_threads) as pool:
+            for namespace, found in pool.map(fetch, jobs()):
+                if not found:
+                    continue
+                writer.add(
+                    [vector.id for vector in found],
+                    [vector.values for vector in found],
+                    [dict(vector.metadata or {}) for vector in found],
+                    [namespace] * len(found)
+                )
+                print(f"   {writer.count}/{total}", end="\r", flush=True)
+        print()
+        result = {**writer.stats, "seconds": time.perf_counter() - start}
+        _report_throughput("Exported", result["count"], result["bytes"], result["seconds"])
+        return result
+    
+    def import_snapshot(self, path: str, batch_size: int = 100) -> Dict:
+        """
+        Bulk-upsert a snapshot into the hosted index, creating it if needed.
+        
+        No embedding calls are made. Upserts are sent asynchronously on the
+        Pinecone pool, with a bounded number in flight.
+        """
+        snapshot = IndexSnapshot(path)
+        check_index_dimension(snapshot.dimension, self.dimension, str(path))
+        self.create_index(snapshot.dimension)
+        index = self.clients.index(self.index_name)
+        print(f"\n📥 Importing {snapshot.count} vectors from {path} into '{self.index_name}'")
+        
+        start = time.perf_counter()
+        in_flight = []
+        max_in_flight = 2 * self.clients.config.pinecone_pool_threads
+        done = 0
+        for vectors, rows in snapshot.batches(batch_size):
+            groups = {}
+            for values, row in zip(vectors.tolist(), rows):
+                groups.setdefault(row["namespace"], []).append(
+                    {"id": row["id"], "values": values, "metadata": row["metadata"]}
+                )
+            for namespace, items in groups.items():
+                in_flight.append(index.upsert(vectors=items, namespace=namespace, async_req=True))
+                if len(in_flight) >= max_in_flight:
+                    in_flight.pop(0).get()
+            done += len(rows)
+            print(f"   {done}/{snapshot.count}", end="\r", flush=True)
+        for request in in_flight:
+            request.get()
+        print()
+        
+        result = {
+            "count": snapshot.count,
+            "bytes": snapshot.path.stat().st_size,
+            "seconds": time.perf_counter() - start
+        }
+        _report_throughput("Imported", result["count"], result["bytes"], result["seconds"])
+        return result
+    
     def get_vectorstore(self):
         """Get existing vector store."""
-        return PineconeVectorStore.from_existing_index(
-            index_name=self.index_name,
-            embedding=self.embeddings
-        )
+        return self.clients.vectorstore(self.index_name, self.embeddings)
+    
+    def delete_file_vectors(self, filenames: List[str]) -> int:
+        """
+        Delete every vector of the given files, in every namespace.
+        
+        Vector ids are '<filename>#<chunk_id>', so a file's vectors are
+        listed by id prefix (serverless indexes can't delete by metadata
+        filter); pod-based indexes, which can't list, delete by filename.
+        Returns the number of ids deleted (0 for filter deletes).
+        """
+        if not filenames:
+            return 0
+        index = self.clients.index(self.index_name)
+        deleted = 0
+        for namespace in self.get_namespace_stats():
+            for filename in filenames:
+                try:
+                    for page in index.list(prefix=f"{filename}#", namespace=namespace):
+                        index.delete(ids=list(page), namespace=namespace)
+                        deleted += len(page)
+                except Exception as e:
+                    print(f"⚠️  Listing ids failed ({e}); deleting {filename} by metadata filter")
+                    index.delete(filter={"filename": {"$eq": filename}}, namespace=namespace)
+        return deleted
+    
+    def get_namespace_stats(self) -> Dict[str, int]:
+        """Vector count per namespace (partition) in the index."""
+        stats = self.clients.index(self.index_name).describe_index_stats()
+        return {
+            name: summary.vector_count
+            for name, summary in stats.namespaces.items()
+        }
     
-    def test_search(self, query: str, top_k: int = 2):
+    def test_search(self, query: str, top_k: int = 2, namespace: str = None):
         """Test the vector store with a sample query."""
-        print(f"\n🔍 Query: '{query}'")
+        print(f"\n🔍 Query: '{query}'" + (f" [{namespace}]" if namespace else ""))
         
         try:
             vectorstore = self.get_vectorstore()
-            results = vectorstore.similarity_search(query, k=top_k)
+            results = vectorstore.similarity_search(query, k=top_k, namespace=namespace)
             
             for i, doc in enumerate(results, 1):
                 print(f"\n📄 Result {i}:")
@@ -212,12 +523,37 @@ class VectorStoreManager:
             return []
 
 
+def _argument(flag: str, default: str) -> Optional[str]:
+    """Value after a command-line flag, the default if the flag has none, or None if absent."""
+    if flag not in sys.argv:
+        return None
+    position = sys.argv.index(flag) + 1
+    if position < len(sys.argv) and not sys.argv[position].startswith("--"):
+        return sys.argv[position]
+    return default
+
+
 def main():
     """Load chunks and upload to vector database."""
     print("\n" + "="*60)
     print("🚀 AWS Study Partner - Vector Store Setup")
     print("="*60)
     
+    # Snapshots:
+    #   python vector_store.py --export-snapshot <file> [--local <dir>]
+    #   python vector_store.py --import-snapshot <file> [--local <dir>]
+    # With --local the snapshot is read from / written to a local index and
+    # no API keys are needed; without it, the hosted index is used.
+    local_path = _argument("--local", "data/index")
+    export_path = _argument("--export-snapshot", "data/index.snapshot")
+    import_path = _argument("--import-snapshot", "data/index.snapshot")
+    if local_path and (export_path or import_path):
+        if export_path:
+            export_local_snapshot(local_path, export_path)
+        else:
+            import_snapshot_local(import_path, local_path)
+        return
+    
     try:
         manager = VectorStoreManager()
     except Exception as e:
@@ -226,6 +562,20 @@ def main():
         traceback.print_exc()
         return
     
+    if export_path:
+        manager.export_snapshot(export_path)
+        return
+    if import_path:
+        manager.import_snapshot(import_path)
+        bump_index_epoch(PROCESSED_DIR)
+        return
+    
+    # Local index only: python vector_store.py --local <dir>
+    if local_path:
+        chunks = manager.load_chunks_from_file("data/processed/all_chunks.json")
+        manager.build_local_index(chunks, local_path)
+        return
+    
     # Create index
     try:
         manager.create_index()
@@ -254,11 +604,14 @@ def main():
         print("\nThe first 18 batches (900 chunks) were already uploaded.")
         print("You can resume from where it failed.")
         return
+    # Running servers stop serving answers cached against the old contents
+    bump_index_epoch(PROCESSED_DIR)
     
     # Test
     print("\n🧪 Testing with sample queries...\n")
-    manager.test_search("What is Amazon S3?")
-    manager.test_search("Explain VPC peering")
+    manager.test_search("What is Amazon S3?", namespace="study_guide")
+    manager.test_search("Explain VPC peering", namespace="study_guide")
+    print(f"Partitions: {manager.get_namespace_stats()}")
     
     print("="*60)
     print("✅ Vector database setup complete!")
@@ -0,0 +1,114 @@
+"""Benchmark the token chunker against LangChain's character splitter."""
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "app"))
+
+from services.token_chunker import TokenChunker
+
+
+SERVICES = ["Amazon S3", "Amazon EC2", "AWS Lambda", "Amazon VPC", "Amazon RDS", "Amazon DynamoDB",
+            "Amazon SageMaker", "AWS Glue", "Amazon Kinesis", "Amazon CloudFront", "AWS IAM"]
+WORDS = ("data storage instance region availability zone durability replication encryption "
+         "policy access latency throughput capacity scaling endpoint bucket object cluster "
+         "pipeline training inference model feature monitoring cost budget retention backup "
+         "snapshot network subnet route gateway queue stream shard partition key").split()
+
+
+def synthetic_guide(num_pages: int, seed: int = 7):
+    """Generate a study guide: numbered sections, paragraphs, bullet lists, ALL CAPS banners."""
+    rng = random.Random(seed)
+    pages = []
+    section = 0
+    for page_no in range(num_pages):
+        lines = []
+        if page_no % 3 == 0:
+            section += 1
+            lines.append(f"{section}.{rng.randint(1, 9)} {rng.choice(SERVICES)} Fundamentals")
+        if page_no % 25 == 0:
+            lines.append(f"DOMAIN {section // 10 + 1} REVIEW")
+        for _ in range(rng.randint(4, 8)):
+            # pdfplumber-style output: a paragraph wrapped over several short lines
+            sentence_count = rng.randint(2, 6)
+            paragraph = " ".join(
+                " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20))).capitalize()
+                + f" with {rng.choice(SERVICES)}."
+                for _ in range(sentence_count)
+            )
+            words = paragraph.split()
+            lines.extend(" ".join(words[i:i + 12]) for i in range(0, len(words), 12))
+            if rng.random() < 0.3:
+                lines.extend(f"• {rng.choice(WORDS)} {rng.choice(WORDS)}" for _ in range(3))
+        pages.append("\n".join(lines))
+    return pages
+
+
+def describe(name, seconds, num_chars, token_counts):
+    return {
+        "chunker": name,
+        "seconds": seconds,
+        "mb_per_sec": num_chars / 1e6 / seconds if seconds else 0.0,
+        "chunks": len(token_counts),
+        "mean_tokens": statistics.mean(token_counts),
+        "stdev_tokens": statistics.pstdev(token_counts),
+        "min_tokens": min(token_counts),
+        "max_tokens": max(token_counts),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=2000, help="Synthetic guide length in pages")
+    parser.add_argument("--chunk-tokens", type=int, default=256)
+    parser.add_argument("--overlap-tokens", type=int, default=32)
+    parser.add_argument("--chunk-chars", type=int, default=1000, help="Character splitter chunk size")
+    parser.add_argument("--overlap-chars", type=int, default=200)
+    args = parser.parse_args()
+
+    pages = synthetic_guide(args.pages)
+    text = "".join(page + "\n\n" for page in pages)
+    print(f"📄 Synthetic guide: {args.pages} pages, {len(text) / 1e6:.2f} MB\n")
+
+    chunker = TokenChunker(chunk_tokens=args.chunk_tokens, overlap_tokens=args.overlap_tokens)
+    encoding = chunker.encoding  # load BPE ranks outside the timed region
+
+    results = []
+
+    start = time.perf_counter()
+    token_chunks = chunker.chunk_pages(pages)
+    elapsed = time.perf_counter() - start
+    results.append(describe("token", elapsed, len(text), [c["token_count"] for c in token_chunks]))
+
+    try:
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+    except ImportError:
+        print("⚠️  langchain_text_splitters not installed, skipping the character splitter")
+    else:
+        splitter = RecursiveCharacterTextSplitter(
+            chunk_size=args.chunk_chars,
+            chunk_overlap=args.overlap_chars,
+            separators=["\n\n", "\n", ". ", " ", ""],
+            length_function=len,
+        )
+        start = time.perf_counter()
+        char_chunks = splitter.split_text(text)
+        elapsed = time.perf_counter() - start
+        counts = [len(ids) for ids in encoding.encode_ordinary_batch(char_chunks)]
+        results.append(describe("recursive", elapsed, len(text), counts))
+
+    print(f"{'chunker':<10} {'seconds':>8} {'MB/s':>8} {'chunks':>7} "
+          f"{'mean tok':>9} {'stdev':>7} {'min':>5} {'max':>5}")
+    for r in results:
+        print(f"{r['chunker']:<10} {r['seconds']:>8.3f} {r['mb_per_sec']:>8.2f} {r['chunks']:>7} "
+              f"{r['mean_tokens']:>9.1f} {r['stdev_tokens']:>7.1f} {r['min_tokens']:>5} {r['max_tokens']:>5}")
+
+    if len(results) == 2:
+        print(f"\n⚡ Token chunker speedup: {results[1]['seconds'] / results[0]['seconds']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Benchmark near-duplicate collapsing on synthetic chunks.
+
+Generates chunk sets of increasing size in which a fraction of chunks are
+lightly edited copies of earlier ones (as when practice exams repeat
+questions), runs services.dedup.collapse_duplicates, and reports
+throughput (flat chunks/s means linear scaling), precision/recall against
+the planted duplicates, and the embedding spend and index size saved.
+
+--processed checks the real data instead: it collapses the chunks in
+data/processed and exits non-zero if nothing was collapsed (the practice
+exams there repeat questions across files).
+
+Usage (from backend/):
+    python bench_dedup.py --sizes 10000 100000 1000000
+    python bench_dedup.py --processed
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "app"))
+
+from bench_chunking import SERVICES, WORDS
+from services.dedup import collapse_duplicates, print_report
+
+PROCESSED_DIR = Path(__file__).resolve().parent / "data" / "processed"
+
+VOCABULARY = np.array(WORDS + [word for service in SERVICES for word in service.split()] +
+                      [f"term{i}" for i in range(2000)])
+
+
+def synthetic_chunks(count: int, duplicate_rate: float, words: int = 170, seed: int = 7):
+    """Chunks plus the index of the original each planted duplicate copies (-1 if none)."""
+    rng = np.random.default_rng(seed)
+    tokens = rng.integers(0, len(VOCABULARY), size=(count, words))
+    source = np.full(count, -1)
+    copies = np.flatnonzero(rng.random(count) < duplicate_rate)
+    copies = copies[copies > 0]
+    for i in copies:
+        original = rng.integers(0, i)
+        while source[original] != -1:
+            original = source[original]
+        source[i] = original
+        tokens[i] = tokens[original]
+        # Light edits: a couple of substituted words, like OCR noise or renumbering
+        edits = rng.integers(0, words, size=2)
+        tokens[i, edits] = rng.integers(0, len(VOCABULARY), size=2)
+
+    chunks = [
+        {
+            "text": " ".join(VOCABULARY[row]),
+            "chunk_id": i,
+            "metadata": {"filename": "synthetic.pdf", "doc_type": "questions",
+                         "services": [], "token_count": words}
+        }
+        for i, row in enumerate(tokens)
+    ]
+    return chunks, source
+
+
+def check_processed(processed_dir: Path, threshold: float) -> int:
+    """Collapse the processed chunks; exit status 1 if none collapse."""
+    chunks = []
+    for path in sorted(processed_dir.glob("*_chunks.json")):
+        with open(path, "r", encoding="utf-8") as f:
+            chunks.extend(json.load(f))
+    if not chunks:
+        print(f"No processed chunks in {processed_dir}")
+        return 1
+    _, report = collapse_duplicates(chunks, threshold=threshold)
+    print_report(report)
+    if not report["collapsed"]:
+        print(f"❌ No duplicates collapsed in {len(chunks)} processed chunks")
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 50_000, 200_000])
+    parser.add_argument("--duplicate-rate", type=float, default=0.15)
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument("--processed", action="store_true", help="Check dedup on data/processed instead")
+    args = parser.parse_args()
+
+    if args.processed:
+        sys.exit(check_processed(PROCESSED_DIR, args.threshold))
+
+    print(f"{'chunks':>9} {'seconds':>8} {'chunks/s':>9} {'collapsed':>10} {'precision':>10} "
+          f"{'recall':>7} {'saved $':>8} {'saved MB':>9}")
+    for size in args.sizes:
+        chunks, source = synthetic_chunks(size, args.duplicate_rate)
+        kept, report = collapse_duplicates(chunks, threshold=args.threshold)
+
+        kept_ids = {chunk["chunk_id"] for chunk in kept}
+        collapsed = set(range(size)) - kept_ids
+        planted = set(np.flatnonzero(source >= 0).tolist())
+        precision = len(collapsed & planted) / len(collapsed) if collapsed else 1.0
+        recall = len(collapsed & planted) / len(planted) if planted else 1.0
+        print(f"{size:>9,} {report['seconds']:>8.1f} {report['chunks_per_sec']:>9,.0f} "
+              f"{report['collapsed']:>10,} {precision:>10.3f} {recall:>7.3f} "
+              f"{report['embedding_cost_saved_usd']:>8.2f} {report['index_bytes_saved'] / 1e6:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
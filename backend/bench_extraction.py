@@ -0,0 +1,111 @@
+"""Benchmark PDF text extraction backends on synthetic study guides.
+
+Writes a multi-hundred-page PDF locally (no extra dependencies), then
+extracts it with each backend and reports pages/sec, chars/sec, pages
+sent to the pdfplumber fallback, and word overlap with pdfplumber.
+
+Usage (from backend/):
+    python bench_extraction.py --pages 400
+    python bench_extraction.py --pdf data/raw/guide.pdf
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "app"))
+
+from bench_chunking import synthetic_guide
+from services.pdf_extractors import EXTRACTORS, get_extractor
+
+
+def _pdf_string(line: str) -> bytes:
+    escaped = line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    return b"(" + escaped.encode("cp1252", errors="replace") + b")"
+
+
+def write_pdf(path: Path, pages, blank_every: int = 0):
+    """
+    Minimal PDF writer: Helvetica text, one content stream per page.
+    Every `blank_every`-th page has no text layer (like a scanned page).
+    """
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    page_refs = []
+    for number, text in enumerate(pages, start=1):
+        lines = [] if blank_every and number % blank_every == 0 else text.split("\n")
+        stream = b"BT /F1 10 Tf 12 TL 50 790 Td\n" + b"".join(
+            _pdf_string(line) + b" Tj T*\n" for line in lines[:62]
+        ) + b"ET"
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_ref = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_ref
+        )
+        page_refs.append(len(objects))
+    kids = b" ".join(b"%d 0 R" % ref for ref in page_refs)
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_refs)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    path.write_bytes(bytes(out))
+
+
+def word_overlap(pages, reference) -> float:
+    """Jaccard overlap of the word multisets, averaged over pages with text."""
+    scores = []
+    for text, ref in zip(pages, reference):
+        a, b = set(text.split()), set(ref.split())
+        if a or b:
+            scores.append(len(a & b) / len(a | b))
+    return sum(scores) / len(scores) if scores else 1.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=400)
+    parser.add_argument("--blank-every", type=int, default=50, help="Pages with no text layer (0 = none)")
+    parser.add_argument("--pdf", help="Benchmark an existing PDF instead of a synthetic one")
+    parser.add_argument("--extractors", nargs="+", default=list(EXTRACTORS), choices=EXTRACTORS)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.pdf:
+            pdf_path = Path(args.pdf)
+        else:
+            pdf_path = Path(tmp) / "synthetic_guide.pdf"
+            write_pdf(pdf_path, synthetic_guide(args.pages), blank_every=args.blank_every)
+        print(f"📄 {pdf_path.name}: {pdf_path.stat().st_size / 1e6:.1f} MB\n")
+
+        results = {}
+        for name in args.extractors:
+            extractor = get_extractor(name)
+            start = time.perf_counter()
+            pages = extractor.extract(str(pdf_path))
+            seconds = time.perf_counter() - start
+            results[name] = (pages, seconds, extractor.pages_fallback)
+
+    reference = results["pdfplumber"][0] if "pdfplumber" in results else None
+    print(f"{'extractor':<11} {'pages':>6} {'seconds':>8} {'pages/s':>8} {'chars/s':>10} "
+          f"{'fallback':>9} {'overlap':>8}")
+    for name, (pages, seconds, fallback) in results.items():
+        chars = sum(len(page) for page in pages)
+        overlap = f"{word_overlap(pages, reference):.3f}" if reference else "-"
+        print(f"{name:<11} {len(pages):>6} {seconds:>8.2f} {len(pages) / seconds:>8.1f} "
+              f"{chars / seconds:>10,.0f} {fallback:>9} {overlap:>8}")
+
+
+if __name__ == "__main__":
+    main()
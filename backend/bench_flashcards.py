@@ -0,0 +1,102 @@
+"""Benchmark flashcard scheduling throughput with millions of card states.
+
+Seeds a temporary store with users x cards SM-2 states (random due times),
+then runs a mixed next-card / review workload across random users and
+reports throughput and latency percentiles. For reference it also times
+finding the next card by scanning a user's states, which the due heap
+replaces.
+
+Usage (from backend/):
+    python bench_flashcards.py --users 1000 --cards 1000 --ops 50000
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "app"))
+
+from services.flashcards import DAY, CardState, FlashcardScheduler, FlashcardStore
+
+
+def percentiles(samples):
+    values = np.array(samples) * 1e6
+    return f"p50 {np.percentile(values, 50):7.1f} µs   p99 {np.percentile(values, 99):7.1f} µs"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--cards", type=int, default=1000, help="Deck size; every user has a state per card")
+    parser.add_argument("--ops", type=int, default=50000, help="next-card + review pairs")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    now = time.time()
+    deck = [
+        {"card_id": f"card-{i}", "front": f"Question {i}", "options": None, "back": "", "explanation": "", "source": "bench"}
+        for i in range(args.cards)
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = FlashcardStore(Path(tmp) / "flashcards.sqlite3")
+        start = time.perf_counter()
+        for u in range(args.users):
+            rows = []
+            for card in deck:
+                interval = rng.choice([1.0, 6.0, 15.0, 38.0])
+                state = CardState(
+                    ease=2.5, interval=interval, repetitions=3, lapses=0,
+                    due=now + rng.uniform(-3, 30) * DAY, last_review=now - interval * DAY, introduced=now - 90 * DAY
+                )
+                rows.append((f"user-{u}", card["card_id"], state))
+            store.put_many(rows)
+        states = args.users * args.cards
+        print(f"🌱 Seeded {states:,} card states ({args.users:,} users x {args.cards:,} cards) "
+              f"in {time.perf_counter() - start:.1f}s\n")
+
+        scheduler = FlashcardScheduler(deck, store, max_loaded_users=args.users)
+        load_times = []
+        for u in range(args.users):
+            t = time.perf_counter()
+            scheduler.next_card(f"user-{u}", now)
+            load_times.append(time.perf_counter() - t)
+        print(f"first access (load + heapify)   {percentiles(load_times)}")
+
+        next_times, review_times = [], []
+        start = time.perf_counter()
+        for _ in range(args.ops):
+            user = f"user-{rng.randrange(args.users)}"
+            t = time.perf_counter()
+            result = scheduler.next_card(user, now)
+            next_times.append(time.perf_counter() - t)
+            card = result["card"]
+            if card is None:
+                continue
+            t = time.perf_counter()
+            scheduler.review(user, card["card_id"], rng.choice([1, 3, 4, 4, 5]), now)
+            review_times.append(time.perf_counter() - t)
+        seconds = time.perf_counter() - start
+        print(f"next_card (heap)                {percentiles(next_times)}")
+        print(f"review (SM-2 + SQLite write)    {percentiles(review_times)}")
+
+        scan_times = []
+        for _ in range(min(args.ops, 2000)):
+            queue = scheduler._users[f"user-{rng.randrange(args.users)}"]
+            t = time.perf_counter()
+            min(queue.states.items(), key=lambda item: item[1].due)
+            scan_times.append(time.perf_counter() - t)
+        print(f"next card by full scan (ref)    {percentiles(scan_times)}")
+
+        print(f"\n📊 {args.ops / seconds:,.0f} next+review pairs/s over {states:,} states "
+              f"({scheduler.reviews:,} reviews)")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
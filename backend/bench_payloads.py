@@ -0,0 +1,177 @@
+"""Benchmark answer payload size and serialization, before and after lean payloads.
+
+Builds representative answers from the processed chunks (top_k sources, a
+~120-token answer) and measures:
+
+    serialization   the previous path (QueryResponse model, re-validated as
+                    the response_model, dumped, json.dumps) vs. engine dict ->
+                    source level -> orjson (or json when orjson is missing)
+    size            body bytes per source level, raw and gzip-compressed
+    gzip levels     compression time and ratio, the basis for GZIP_LEVEL
+    end to end      POSTs through a FastAPI app over ASGI: the old endpoint
+                    code against json_response(), bytes on the wire and
+                    time per request (including the client's decompression)
+
+Usage (from backend/):
+    python bench_payloads.py --top-k 5 --rounds 2000
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "app"))
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import Response
+
+from models.schemas import QueryResponse
+from services import payloads
+from services.payloads import EXCERPT_CHARS, SOURCE_LEVELS, compress, encode_json, shape_result
+from services.question_bank import load_processed_chunks
+from services.service_tagger import chunk_key
+
+PROCESSED_DIR = Path(__file__).resolve().parent / "data" / "processed"
+
+
+def representative_result(chunks, top_k: int, offset: int) -> dict:
+    """An engine answer with full source text, as query() returns it."""
+    picked = [chunks[(offset + i * 37) % len(chunks)] for i in range(top_k)]
+    answer = " ".join(chunks[offset % len(chunks)]["text"].split()[:120])
+    return {
+        "question": "How do S3 lifecycle policies move objects between storage classes?",
+        "answer": answer,
+        "sources": [
+            {
+                "id": chunk_key(chunk["metadata"], chunk["chunk_id"]),
+                "text": chunk["text"],
+                "source": chunk["metadata"].get("source", "unknown"),
+                "doc_type": chunk["metadata"].get("doc_type", "unknown"),
+                "chunk_id": chunk["chunk_id"],
+                "relevance_score": 1.0 - i * 0.1
+            }
+            for i, chunk in enumerate(picked)
+        ],
+        "num_sources": top_k,
+        "session_id": "3f1c2d4e-5b6a-4c7d-8e9f-0a1b2c3d4e5f",
+        "processing_time_ms": 1834.27
+    }
+
+
+def legacy_result(result: dict) -> dict:
+    """The same answer as the engine used to return it: every source a 300-character excerpt."""
+    return {
+        **result,
+        "sources": [
+            {key: value for key, value in s.items() if key != "id"} | {"text": s["text"][:EXCERPT_CHARS] + "..."}
+            for s in result["sources"]
+        ]
+    }
+
+
+def legacy_encode(result: dict) -> bytes:
+    """What the endpoints did: build the model, FastAPI re-validates and dumps it, then json.dumps."""
+    model = QueryResponse(**result)
+    content = QueryResponse.model_validate(model.model_dump()).model_dump(mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def timed(func, items, rounds: int) -> float:
+    """Mean microseconds per call over items, repeated until `rounds` calls."""
+    start = time.perf_counter()
+    for i in range(rounds):
+        func(items[i % len(items)])
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def serialization(results, rounds: int):
+    print(f"{'path':<34} {'µs/response':>12} {'bytes':>8} {'gzip':>8}")
+    legacy = [legacy_result(r) for r in results]
+    rows = [("before (model + json.dumps)", legacy_encode, legacy)]
+    for level in SOURCE_LEVELS:
+        rows.append((f"after, sources={level}", lambda r, level=level: encode_json(shape_result(r, level)), results))
+    for label, func, items in rows:
+        micros = timed(func, items, rounds)
+        size = statistics.mean(len(func(item)) for item in items)
+        packed = statistics.mean(len(gzip.compress(func(item), payloads.GZIP_LEVEL)) for item in items)
+        print(f"{label:<34} {micros:>12.1f} {size:>8.0f} {packed:>8.0f}")
+    encoder = "orjson" if payloads.orjson is not None else "json (orjson not installed)"
+    print(f"   encoder: {encoder}; compression threshold {payloads.COMPRESS_MIN_BYTES} bytes")
+
+
+def gzip_levels(results, rounds: int):
+    bodies = [encode_json(shape_result(r, "excerpts")) for r in results]
+    print(f"\n{'gzip level':<12} {'µs/body':>9} {'ratio':>7}")
+    for level in (1, 3, 5, 6, 9):
+        micros = timed(lambda body: gzip.compress(body, level, mtime=0), bodies, max(rounds // 4, 50))
+        ratio = statistics.mean(len(body) / len(gzip.compress(body, level)) for body in bodies)
+        marker = "  <- GZIP_LEVEL" if level == payloads.GZIP_LEVEL else ""
+        print(f"{level:<12} {micros:>9.1f} {ratio:>6.2f}x{marker}")
+
+
+def end_to_end(results, rounds: int):
+    app = FastAPI()
+    state = {"i": 0}
+
+    def next_result():
+        state["i"] += 1
+        return results[state["i"] % len(results)]
+
+    @app.post("/before", response_model=QueryResponse)
+    async def before():
+        return QueryResponse(**legacy_result(next_result()))
+
+    @app.post("/after/{level}", response_model=QueryResponse)
+    async def after(level: str, http_request: Request):
+        body, encoding = compress(encode_json(shape_result(next_result(), level)),
+                                  http_request.headers.get("accept-encoding", ""))
+        # json_response() from api.py, without importing the app (and its engine)
+        headers = {"Content-Encoding": encoding} if encoding else {}
+        return Response(body, headers=headers, media_type="application/json")
+
+    async def measure(path: str, accept_encoding: str):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench",
+                                     headers={"Accept-Encoding": accept_encoding}) as client:
+            await client.post(path)
+            wire = []
+            start = time.perf_counter()
+            for _ in range(rounds):
+                response = await client.post(path)
+                wire.append(response.num_bytes_downloaded)
+            return (time.perf_counter() - start) / rounds * 1e6, statistics.mean(wire)
+
+    print(f"\n{'endpoint (over ASGI)':<34} {'µs/request':>12} {'wire bytes':>11}")
+    cases = [("before", "/before", "identity")]
+    cases += [(f"after, sources={level}, gzip", f"/after/{level}", "gzip") for level in SOURCE_LEVELS]
+    cases += [("after, sources=excerpts, identity", "/after/excerpts", "identity")]
+    for label, path, accept_encoding in cases:
+        micros, wire = asyncio.run(measure(path, accept_encoding))
+        print(f"{label:<34} {micros:>12.1f} {wire:>11.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top-k", type=int, default=5, help="Sources per answer")
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    chunks = load_processed_chunks(PROCESSED_DIR)
+    if not chunks:
+        print(f"❌ No processed chunks under {PROCESSED_DIR}")
+        sys.exit(1)
+    results = [representative_result(chunks, args.top_k, offset) for offset in range(0, len(chunks), 7)]
+    print(f"🧪 {len(results)} answers with {args.top_k} sources each "
+          f"(mean chunk {statistics.mean(len(c['text']) for c in chunks):.0f} characters)\n")
+
+    serialization(results, args.rounds)
+    gzip_levels(results, args.rounds)
+    end_to_end(results, max(args.rounds // 4, 100))
+
+
+if __name__ == "__main__":
+    main()
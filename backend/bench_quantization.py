@@ -0,0 +1,78 @@
+"""Benchmark quantized local index modes: memory, latency and recall@k vs. exact float32."""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "app"))
+
+from services.local_index import LocalVectorIndex, MODES, normalize, top_k
+
+
+def synthetic_embeddings(count: int, dimension: int, clusters: int = 200, seed: int = 0):
+    """Clustered unit vectors, loosely shaped like topic-grouped chunk embeddings."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dimension)).astype(np.float32)
+    assignment = rng.integers(0, clusters, count)
+    vectors = centers[assignment] + 0.6 * rng.standard_normal((count, dimension)).astype(np.float32)
+    return normalize(vectors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=20000, help="Indexed vectors")
+    parser.add_argument("--dimension", type=int, default=3072)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rescore-factor", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"🧪 {args.count} x {args.dimension} vectors, {args.queries} queries, k={args.k}\n")
+    vectors = synthetic_embeddings(args.count, args.dimension)
+    rng = np.random.default_rng(1)
+    picks = rng.integers(0, args.count, args.queries)
+    queries = normalize(vectors[picks] + 0.3 * rng.standard_normal((args.queries, args.dimension)))
+
+    # Ground truth: exact search fully in RAM
+    truth = [set(top_k(vectors @ q, args.k).tolist()) for q in queries]
+
+    records = [{"id": str(i), "text": "", "metadata": {}} for i in range(args.count)]
+    with tempfile.TemporaryDirectory() as tmp:
+        LocalVectorIndex.build(tmp, vectors, records)
+        del vectors
+
+        results = []
+        for mode in MODES:
+            index = LocalVectorIndex(tmp, mode=mode, rescore_factor=args.rescore_factor)
+            index.search(queries[0], k=args.k)  # warm the page cache
+
+            latencies, hits = [], 0
+            for q, expected in zip(queries, truth):
+                start = time.perf_counter()
+                found = index.search(q, k=args.k)
+                latencies.append((time.perf_counter() - start) * 1000)
+                hits += len(expected & {row for row, _ in found})
+
+            memory = index.memory_bytes()
+            results.append({
+                "mode": mode,
+                "resident_mb": memory["mode_resident"] / 1e6,
+                "saved_pct": 100 * (1 - memory["mode_resident"] / memory["float32_full"]),
+                "mean_ms": float(np.mean(latencies)),
+                "p95_ms": float(np.percentile(latencies, 95)),
+                "recall": hits / (len(truth) * args.k)
+            })
+
+    baseline = results[0]["mean_ms"]
+    print(f"{'mode':<8} {'resident MB':>12} {'saved':>7} {'mean ms':>9} {'p95 ms':>8} "
+          f"{'speedup':>8} {f'recall@{args.k}':>10}")
+    for r in results:
+        print(f"{r['mode']:<8} {r['resident_mb']:>12.1f} {r['saved_pct']:>6.1f}% {r['mean_ms']:>9.2f} "
+              f"{r['p95_ms']:>8.2f} {baseline / r['mean_ms']:>7.2f}x {r['recall']:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
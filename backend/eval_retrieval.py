@@ -0,0 +1,127 @@
+"""Evaluate retrieval quality vs. latency across configurations, fully offline.
+
+Runs every golden-set question through EnhancedAWSStudyPartner.retrieve()
+over a local index snapshot (built with `python app/vector_store.py --local`)
+using stored query embeddings, and prints recall@k, MRR, nDCG@k and
+per-query latency for each configuration.
+
+Usage (from backend/):
+    # once, needs OPENAI_API_KEY: embed the golden questions
+    python eval_retrieval.py --embed
+    # afterwards, no network needed
+    python eval_retrieval.py --index data/index --k 5 --output data/eval/report.json
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "app"))
+
+from dotenv import load_dotenv
+
+from rag_engine import EnhancedAWSStudyPartner
+from services.dedup import chunk_refs
+from services.local_index import LocalVectorIndex, resolve_generation
+from services.retrieval_eval import evaluate, format_table, load_golden_set, load_query_embeddings
+
+load_dotenv()
+
+DEFAULT_CONFIGS = [
+    {"name": "float32 exact", "mode": "float32"},
+    {"name": "int8 + rescore x10", "mode": "int8", "rescore_factor": 10},
+    {"name": "binary + rescore x10", "mode": "binary", "rescore_factor": 10},
+    {"name": "binary + rescore x40", "mode": "binary", "rescore_factor": 40},
+    {"name": "int8 + service filter", "mode": "int8", "service_filter": True},
+    {"name": "int8, top_k=3", "mode": "int8", "top_k": 3},
+]
+
+
+def embed_questions(golden, path: Path):
+    from utils.clients import get_clients
+
+    embeddings = get_clients().embeddings()
+    vectors = embeddings.embed_documents([item["question"] for item in golden])
+    path.parent.mkdir(parents=True, exist_ok=True)
+    np.savez(path, **{item["id"]: np.asarray(v, dtype=np.float32) for item, v in zip(golden, vectors)})
+    print(f"💾 Stored {len(vectors)} query embeddings in {path}")
+
+
+def make_retriever(partner: EnhancedAWSStudyPartner, config: dict, query_vectors: dict):
+    dimension = partner.local_index.dimension
+
+    def retrieve(item, k):
+        services = partner.service_tagger.tag(item["question"]) if config.get("service_filter") else None
+        docs = partner.retrieve(
+            item["question"],
+            k=config.get("top_k", k),
+            doc_types=config.get("doc_types"),
+            services=services,
+            # Shortened text-embedding-3 vectors are prefixes of the full ones
+            embedding=query_vectors[item["id"]][:dimension]
+        )
+        # A collapsed duplicate counts as the golden chunk it stands for
+        retrieved = []
+        for doc in docs:
+            refs = chunk_refs(doc.metadata)
+            retrieved.append(next((ref for ref in refs if ref in item["relevant_refs"]), refs[0]))
+        return retrieved
+
+    return retrieve
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--golden", default="data/eval/golden_set.json")
+    parser.add_argument("--index", default="data/index", help="Local index snapshot directory")
+    parser.add_argument("--query-embeddings", default="data/eval/query_embeddings.npz")
+    parser.add_argument("--embed", action="store_true", help="Embed golden questions and store them")
+    parser.add_argument("--configs", help="JSON file with a list of configurations")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--output", help="Write the full report (including per-query rows) as JSON")
+    args = parser.parse_args()
+
+    golden = load_golden_set(args.golden)
+    embeddings_path = Path(args.query_embeddings)
+    if args.embed:
+        embed_questions(golden, embeddings_path)
+
+    query_vectors = load_query_embeddings(embeddings_path, golden)
+    if query_vectors is None:
+        print(f"❌ No query embeddings at {embeddings_path}. Run once with --embed.")
+        return
+
+    configs = DEFAULT_CONFIGS
+    if args.configs:
+        with open(args.configs, "r", encoding="utf-8") as f:
+            configs = json.load(f)
+
+    # --index may be a generations root (vector_store.py --local); read the live build
+    index_path = resolve_generation(args.index)
+    with open(index_path / "meta.json", "r", encoding="utf-8") as f:
+        available_modes = json.load(f)["modes"]
+
+    print(f"📊 {len(golden)} golden queries against {index_path}\n")
+    results = []
+    for config in configs:
+        if config["mode"] not in available_modes:
+            print(f"⏭️  Skipping '{config['name']}': index has no {config['mode']} codes")
+            continue
+        index = LocalVectorIndex(index_path, mode=config["mode"], rescore_factor=config.get("rescore_factor", 10))
+        partner = EnhancedAWSStudyPartner.retrieval_only(index)
+        retrieve = make_retriever(partner, config, query_vectors)
+        retrieve(golden[0], args.k)  # warm the page cache and filter cache
+        results.append((config["name"], evaluate(retrieve, golden, k=args.k)))
+
+    print(format_table(results, args.k))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"k": args.k, "index": str(index_path), "results": dict(results)}, f, indent=2)
+        print(f"\n📝 Report saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+"""Load-test the API with concurrent simulated students.
+
+Each virtual student loops over study scenarios, with think time between
+requests:
+
+    chat      a question, then one to three follow-ups in the same session
+    explain   one concept explanation
+    compare   one service comparison
+    quiz      generate a quiz, answer it, submit it
+
+The target is the app in-process (default: httpx over ASGI, nothing
+listening), a server this script starts on localhost (--spawn), or any
+running server (--url). In-process and spawned servers run the engine on
+local stand-ins for OpenAI (services.standins) with the latencies below,
+so no keys are needed and the run measures the service itself: admission
+control, the worker thread pool, serialization. In-process numbers include
+the load generator's own CPU; --spawn keeps it out of the server.
+
+Concurrency steps up through --users. Each step reports throughput,
+latency percentiles and error rates (by status) per endpoint, and server
+RSS is sampled once a second. Results are saved as JSON; --baseline
+compares them with an earlier run.
+
+Usage (from backend/):
+    python load_test.py --users 50,100,250,500 --step-seconds 30
+    python load_test.py --spawn --users 100 --first-token-ms 800
+    python load_test.py --url http://localhost:8000 --server-pid 12345
+    python load_test.py --users 100 --baseline ../data/loadtests/20260101-120000.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+import numpy as np
+
+APP_DIR = Path(__file__).resolve().parent / "app"
+DATA_DIR = Path(__file__).resolve().parent / "data"
+sys.path.insert(0, str(APP_DIR))
+
+from services.standins import StandInLatency
+
+QUESTIONS = [
+    "What is Amazon S3 and when should I use it?",
+    "How do S3 lifecycle policies work?",
+    "What is the difference between SQS standard and FIFO queues?",
+    "How does SageMaker handle distributed training?",
+    "When should I use DynamoDB instead of RDS?",
+    "How do I secure data at rest in AWS?",
+    "What does a VPC endpoint do?",
+    "How does auto scaling decide when to add instances?",
+]
+FOLLOW_UPS = [
+    "Can you give an example?",
+    "How does that affect cost?",
+    "What would the exam usually ask about this?",
+    "How is that different from the alternative?",
+    "What are the limits I should know?",
+]
+CONCEPTS = ["VPC peering", "S3 Glacier retrieval", "IAM roles", "SageMaker endpoints", "Kinesis shards"]
+PAIRS = [("S3", "EFS"), ("SQS", "SNS"), ("RDS", "DynamoDB"), ("Kinesis", "SQS"), ("EC2", "Lambda")]
+TOPICS = ["S3", "SageMaker", "IAM", "VPC", None]
+
+DEFAULT_MIX = "chat=4,explain=2,compare=1,quiz=2"
+
+
+class Recorder:
+    """Latency and status of every request, tagged with the concurrency step it ran in."""
+
+    def __init__(self):
+        self.users = 0
+        self.samples: Dict[int, List] = defaultdict(list)
+
+    def record(self, endpoint: str, status, ms: float):
+        self.samples[self.users].append((endpoint, status, ms))
+
+
+async def call(client: httpx.AsyncClient, recorder: Recorder, path: str, body: Dict) -> Optional[Dict]:
+    """POST and record; the response JSON, or None on any failure."""
+    start = time.perf_counter()
+    try:
+        response = await client.post(path, json=body)
+        status = response.status_code
+    except httpx.HTTPError as e:
+        response, status = None, type(e).__name__
+    recorder.record(f"POST {path}", status, (time.perf_counter() - start) * 1000)
+    return response.json() if status == 200 else None
+
+
+# Scenarios: one student's unit of work
+
+async def chat(client, recorder, rng, think):
+    session_id = f"load-{uuid.uuid4().hex[:12]}"
+    answer = await call(client, recorder, "/api/query", {"question": rng.choice(QUESTIONS), "session_id": session_id})
+    for follow_up in rng.sample(FOLLOW_UPS, rng.randint(1, 3)) if answer else []:
+        await think()
+        await call(client, recorder, "/api/query", {"question": follow_up, "session_id": session_id})
+
+
+async def explain(client, recorder, rng, think):
+    await call(client, recorder, "/api/explain", {"concept": rng.choice(CONCEPTS)})
+
+
+async def compare(client, recorder, rng, think):
+    service1, service2 = rng.choice(PAIRS)
+    await call(client, recorder, "/api/compare", {"service1": service1, "service2": service2})
+
+
+async def quiz(client, recorder, rng, think):
+    generated = await call(client, recorder, "/api/quiz/generate", {"topic": rng.choice(TOPICS), "num_questions": 5})
+    if not generated:
+        return
+    await think()
+    answers = {
+        question["id"]: rng.choice(question.get("options") or ["A", "B", "C", "D"])
+        for question in generated["questions"]
+    }
+    await call(client, recorder, "/api/quiz/submit", {"quiz_id": generated["quiz_id"], "answers": answers})
+
+
+SCENARIOS = {"chat": chat, "explain": explain, "compare": compare, "quiz": quiz}
+
+
+async def student(client, recorder, rng: random.Random, mix: Dict[str, float], think_seconds: float, stop_at: float):
+    """Run scenarios until stop_at; the one in progress then finishes."""
+    names, weights = list(mix), list(mix.values())
+
+    async def think():
+        await asyncio.sleep(think_seconds * rng.uniform(0.5, 1.5))
+
+    # Stagger starts so a step doesn't open with every student at once
+    await asyncio.sleep(rng.uniform(0, think_seconds))
+    while time.monotonic() < stop_at:
+        await SCENARIOS[rng.choices(names, weights)[0]](client, recorder, rng, think)
+        await think()
+
+
+def rss_mb(pid: int) -> Optional[float]:
+    """Resident set size of a process (Linux /proc), or None."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+async def sample_rss(pid: Optional[int], recorder: Recorder, start: float, samples: List[Dict]):
+    while pid is not None:
+        samples.append({
+            "t": round(time.monotonic() - start, 1),
+            "users": recorder.users,
+            "rss_mb": rss_mb(pid)
+        })
+        await asyncio.sleep(1.0)
+
+
+def summarize(samples: List, seconds: float) -> Dict:
+    """Throughput, error rate and per-endpoint latency percentiles of one step."""
+    endpoints = {}
+    for endpoint in sorted({s[0] for s in samples}):
+        rows = [s for s in samples if s[0] == endpoint]
+        latencies = np.array([ms for _, status, ms in rows if status == 200])
+        errors = sum(status != 200 for _, status, _ in rows)
+        endpoints[endpoint] = {
+            "requests": len(rows),
+            "errors": errors,
+            "error_rate": round(errors / len(rows), 4),
+            "statuses": dict(Counter(str(status) for _, status, _ in rows)),
+            **{
+                f"p{q}_ms": round(float(np.percentile(latencies, q)), 1) if len(latencies) else None
+                for q in (50, 90, 99)
+            },
+            "max_ms": round(float(latencies.max()), 1) if len(latencies) else None
+        }
+    ok = [ms for _, status, ms in samples if status == 200]
+    errors = len(samples) - len(ok)
+    return {
+        "seconds": round(seconds, 2),
+        "requests": len(samples),
+        "throughput_rps": round(len(samples) / seconds, 2),
+        "success_rps": round(len(ok) / seconds, 2),
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        "p50_ms": round(float(np.percentile(ok, 50)), 1) if ok else None,
+        "p99_ms": round(float(np.percentile(ok, 99)), 1) if ok else None,
+        "endpoints": endpoints
+    }
+
+
+def print_step(users: int, step: Dict):
+    print(f"\n👥 {users} students · {step['seconds']:.0f}s · {step['throughput_rps']:.1f} req/s "
+          f"({step['success_rps']:.1f} ok/s) · errors {100 * step['error_rate']:.1f}%")
+    print(f"   {'endpoint':<24} {'requests':>8} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8} {'errors':>7}  statuses")
+    for endpoint, row in step["endpoints"].items():
+        cells = " ".join(f"{row[k]:>8.0f}" if row[k] is not None else f"{'-':>8}"
+                         for k in ("p50_ms", "p90_ms", "p99_ms", "max_ms"))
+        statuses = " ".join(f"{status}:{count}" for status, count in sorted(row["statuses"].items()))
+        print(f"   {endpoint:<24} {row['requests']:>8} {cells} {100 * row['error_rate']:>6.1f}%  {statuses}")
+
+
+def find_bend(steps: List[Dict]) -> Optional[Dict]:
+    """First step where p99 doubles over the lightest step, or more than 1% of requests fail."""
+    if not steps or steps[0]["p99_ms"] is None:
+        return None
+    base = steps[0]["p99_ms"]
+    for step in steps:
+        if step["error_rate"] > 0.01:
+            return {"users": step["users"], "reason": f"error rate {100 * step['error_rate']:.1f}%"}
+        if step["p99_ms"] is not None and step["p99_ms"] > 2 * base:
+            return {"users": step["users"], "reason": f"p99 {step['p99_ms']:.0f}ms vs {base:.0f}ms at {steps[0]['users']}"}
+    return None
+
+
+def compare_baseline(steps: List[Dict], path: Path):
+    baseline = {step["users"]: step for step in json.loads(path.read_text())["steps"]}
+    print(f"\n📐 Against {path.name}:")
+    for step in steps:
+        old = baseline.get(step["users"])
+        if old is None:
+            print(f"   {step['users']:>4} students: not in baseline")
+            continue
+        p99 = (f"p99 {old['p99_ms']:.0f} -> {step['p99_ms']:.0f}ms"
+               if old["p99_ms"] is not None and step["p99_ms"] is not None else "p99 n/a")
+        print(f"   {step['users']:>4} students: {old['success_rps']:.1f} -> {step['success_rps']:.1f} ok/s, "
+              f"{p99}, errors {100 * old['error_rate']:.1f}% -> {100 * step['error_rate']:.1f}%")
+
+
+def standin_environment(args) -> Dict[str, str]:
+    return {
+        "STUDY_PARTNER_FACTORY": "services.standins:standin_engine",
+        "STANDIN_EMBED_MS": str(args.embed_ms),
+        "STANDIN_FIRST_TOKEN_MS": str(args.first_token_ms),
+        "STANDIN_TOKEN_MS": str(args.token_ms),
+        "STANDIN_ANSWER_TOKENS": str(args.answer_tokens),
+        # Measure generation, not cache hits, unless asked
+        "RESPONSE_CACHE": "on" if args.response_cache else "off",
+        "TRACING": "off",
+    }
+
+
+def spawn_server(args) -> subprocess.Popen:
+    port = args.port
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api:app", "--port", str(port), "--log-level", "warning"],
+        cwd=APP_DIR, env={**os.environ, **standin_environment(args)}
+    )
+    deadline = time.monotonic() + 180
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with code {server.returncode}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                return server
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    server.terminate()
+    raise RuntimeError("Server did not come up within 180s")
+
+
+async def run(args, client: httpx.AsyncClient, server_pid: Optional[int]) -> Dict:
+    mix = {name: float(weight) for name, weight in (item.split("=") for item in args.mix.split(","))}
+    unknown = set(mix) - set(SCENARIOS)
+    if unknown:
+        raise SystemExit(f"Unknown scenarios: {', '.join(sorted(unknown))} (expected {', '.join(SCENARIOS)})")
+
+    recorder = Recorder()
+    rss: List[Dict] = []
+    start = time.monotonic()
+    sampler = asyncio.create_task(sample_rss(server_pid, recorder, start, rss))
+    steps = []
+    for users in [int(n) for n in args.users.split(",")]:
+        recorder.users = users
+        step_start = time.monotonic()
+        stop_at = step_start + args.step_seconds
+        await asyncio.gather(*[
+            student(client, recorder, random.Random(args.seed * 100003 + users * 1009 + i), mix, args.think_seconds, stop_at)
+            for i in range(users)
+        ])
+        step = {"users": users, **summarize(recorder.samples[users], time.monotonic() - step_start)}
+        steps.append(step)
+        print_step(users, step)
+    sampler.cancel()
+
+    return {"steps": steps, "bend": find_bend(steps), "rss": rss}
+
+
+async def main_async(args):
+    server, server_pid = None, args.server_pid
+    if args.url:
+        target = args.url
+        client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=httpx.Limits(max_connections=None))
+    elif args.spawn:
+        print(f"🚀 Starting uvicorn on port {args.port} with stand-ins...")
+        server = spawn_server(args)
+        server_pid, target = server.pid, f"http://127.0.0.1:{args.port}"
+        client = httpx.AsyncClient(base_url=target, timeout=args.timeout, limits=httpx.Limits(max_connections=None))
+    else:
+        os.environ.update(standin_environment(args))
+        import api
+        target, server_pid = "in-process", os.getpid()
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app), base_url="http://loadtest",
+                                   timeout=args.timeout)
+
+    print(f"\n🎯 Target {target} · mix {args.mix} · think {args.think_seconds}s · {args.step_seconds}s per step")
+    try:
+        async with client:
+            result = await run(args, client, server_pid)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    return target, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", default="50,100,250,500", help="Concurrent students per step, comma-separated")
+    parser.add_argument("--step-seconds", type=float, default=30, help="New scenarios start for this long per step")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Scenario weights (default {DEFAULT_MIX})")
+    parser.add_argument("--think-seconds", type=float, default=1.0, help="Mean pause between a student's requests")
+    parser.add_argument("--timeout", type=float, default=60, help="Client timeout per request, seconds")
+    parser.add_argument("--seed", type=int, default=7)
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", help="Load an already running server instead of the app in-process")
+    target.add_argument("--spawn", action="store_true", help="Start uvicorn on localhost with the stand-ins")
+    parser.add_argument("--port", type=int, default=8765, help="Port for --spawn")
+    parser.add_argument("--server-pid", type=int, help="Sample this process's RSS (with --url)")
+    standins = parser.add_argument_group("stand-in latency (in-process and --spawn)")
+    defaults = StandInLatency()
+    standins.add_argument("--embed-ms", type=float, default=defaults.embed_ms)
+    standins.add_argument("--first-token-ms", type=float, default=defaults.first_token_ms)
+    standins.add_argument("--token-ms", type=float, default=defaults.token_ms)
+    standins.add_argument("--answer-tokens", type=int, default=defaults.answer_tokens)
+    standins.add_argument("--response-cache", action="store_true", help="Keep the explain/compare response cache on")
+    parser.add_argument("--output", type=Path, help="Results file (default data/loadtests/<time>.json)")
+    parser.add_argument("--baseline", type=Path, help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    target, result = asyncio.run(main_async(args))
+
+    if result["bend"]:
+        print(f"\n📈 Latency bends at {result['bend']['users']} students: {result['bend']['reason']}")
+    else:
+        print("\n📈 No bend: p99 stayed within 2x of the lightest step and errors under 1%")
+    peak = max((s["rss_mb"] for s in result["rss"] if s["rss_mb"] is not None), default=None)
+    if peak is not None:
+        print(f"🧠 Server RSS {result['rss'][0]['rss_mb']:.0f} MB at start, peak {peak:.0f} MB")
+
+    output = args.output or DATA_DIR / "loadtests" / f"{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    config = {key: str(value) if isinstance(value, Path) else value for key, value in vars(args).items()}
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({"target": target, "config": config, "created_at": time.time(), **result}, f, indent=2)
+    print(f"💾 Results saved to {output}")
+
+    if args.baseline:
+        compare_baseline(result["steps"], args.baseline)
+
+
+if __name__ == "__main__":
+    main()
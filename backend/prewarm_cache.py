@@ -0,0 +1,93 @@
+"""Pre-generate cached explanations and comparisons for the common study topics.
+
+Fills the LLM response cache (data/cache/responses.sqlite3, or
+$RESPONSE_CACHE_PATH) with brief/medium/detailed explanations of every
+/api/topics topic and answers for the common service comparisons, so
+those requests are served from the cache. Entries already cached for the
+current index version are skipped; re-run after re-indexing.
+
+Usage (from backend/):
+    python prewarm_cache.py --workers 4
+    python prewarm_cache.py --levels brief medium --skip-comparisons
+"""
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "app"))
+
+from dotenv import load_dotenv
+
+from models.topics import COMMON_COMPARISONS, STUDY_TOPICS, short_name
+from rag_engine import EnhancedAWSStudyPartner
+from services.rate_governor import BATCH, request_priority
+
+load_dotenv()
+
+DETAIL_LEVELS = ["brief", "medium", "detailed"]
+
+
+def with_priority(run):
+    """Pre-warming yields to live traffic under the shared rate governor."""
+    def wrapped():
+        with request_priority(BATCH):
+            return run()
+    return wrapped
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", nargs="+", default=DETAIL_LEVELS, choices=DETAIL_LEVELS)
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent LLM calls")
+    parser.add_argument("--skip-topics", action="store_true")
+    parser.add_argument("--skip-comparisons", action="store_true")
+    args = parser.parse_args()
+
+    partner = EnhancedAWSStudyPartner()
+    if partner.response_cache is None:
+        print("❌ Response cache is disabled (RESPONSE_CACHE=off)")
+        return
+
+    jobs = []
+    if not args.skip_topics:
+        for topic in STUDY_TOPICS:
+            for level in args.levels:
+                jobs.append((f"explain {short_name(topic)} ({level})",
+                             lambda c=short_name(topic), l=level: partner.explain_concept(c, l)))
+    if not args.skip_comparisons:
+        for service1, service2 in COMMON_COMPARISONS:
+            jobs.append((f"compare {service1} / {service2}",
+                         lambda a=service1, b=service2: partner.compare_services(a, b)))
+
+    print(f"🔥 Pre-warming {len(jobs)} responses (index version {partner.index_version})\n")
+    hits_before = partner.response_cache.hits
+    failed = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        futures = {pool.submit(with_priority(run)): name for name, run in jobs}
+        for done, future in enumerate(as_completed(futures), start=1):
+            try:
+                result = future.result()
+                print(f"   [{done}/{len(jobs)}] {futures[future]}: {result['processing_time_ms']:.0f} ms")
+            except Exception as e:
+                failed += 1
+                print(f"   [{done}/{len(jobs)}] {futures[future]}: ❌ {e}")
+    elapsed = time.perf_counter() - start
+
+    already_cached = partner.response_cache.hits - hits_before
+    print(f"\n✅ Generated {len(jobs) - already_cached - failed}, already cached {already_cached}, "
+          f"failed {failed} in {elapsed:.1f}s")
+
+    # Time a cache hit end to end
+    if jobs:
+        name, run = jobs[0]
+        start = time.perf_counter()
+        run()
+        print(f"⚡ Cache hit for '{name}': {(time.perf_counter() - start) * 1000:.2f} ms")
+    print(f"📦 {partner.response_cache.stats(partner.index_version)}")
+
+
+if __name__ == "__main__":
+    main()
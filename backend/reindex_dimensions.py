@@ -0,0 +1,143 @@
+"""Re-index the corpus at reduced embedding dimensions and compare size, latency and recall.
+
+For text-embedding-3 models a shortened embedding is the full embedding
+truncated to its first N dimensions and re-normalised, so by default the
+corpus is embedded once at full size and every reduced index is derived
+from it. Pass --reembed to request each size from the API instead.
+
+Usage (from backend/):
+    python reindex_dimensions.py --dims 256 512 1024 --out data/index-dims
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "app"))
+
+from dotenv import load_dotenv
+
+from services.local_index import LocalVectorIndex, normalize, top_k
+from services.rate_governor import BULK, request_priority
+from services.service_tagger import chunk_key
+from utils.clients import get_clients
+from utils.embedding_config import NATIVE_DIMENSIONS, embedding_model
+
+load_dotenv()
+
+DEFAULT_QUERIES = [
+    "What is Amazon S3?",
+    "Explain VPC peering",
+    "When should I use DynamoDB instead of RDS?",
+    "How does SageMaker automatic model tuning work?",
+    "What are the S3 storage classes?",
+    "How do I secure data at rest with KMS?",
+    "Difference between Kinesis Data Streams and Firehose",
+    "How do IAM roles differ from IAM users?",
+    "What is a SageMaker endpoint?",
+    "How does AWS Glue catalog data?",
+]
+
+
+def embed_all(embeddings, texts, batch_size=100):
+    vectors = []
+    for i in range(0, len(texts), batch_size):
+        with request_priority(BULK):
+            vectors.extend(embeddings.embed_documents(texts[i:i + batch_size]))
+        print(f"   embedded {min(i + batch_size, len(texts))}/{len(texts)}", end="\r", flush=True)
+    print()
+    return np.array(vectors, dtype=np.float32)
+
+
+def directory_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.iterdir() if f.is_file())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", default="data/processed/all_chunks.json")
+    parser.add_argument("--dims", type=int, nargs="+", default=[256, 512, 1024])
+    parser.add_argument("--out", default="data/index-dims", help="One sub-directory per dimension")
+    parser.add_argument("--queries", help="Text file with one evaluation query per line")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--mode", default="int8", help="Local index mode used for the latency runs")
+    parser.add_argument("--reembed", action="store_true", help="Call the API once per dimension")
+    args = parser.parse_args()
+
+    model = embedding_model()
+    full_dim = NATIVE_DIMENSIONS.get(model, 3072)
+
+    with open(args.chunks, "r", encoding="utf-8") as f:
+        chunks = json.load(f)
+    texts = [chunk["text"] for chunk in chunks]
+    records = [
+        {
+            "id": chunk_key(chunk["metadata"], chunk["chunk_id"]),
+            "text": chunk["text"],
+            "metadata": {**chunk["metadata"], "chunk_id": chunk["chunk_id"]}
+        }
+        for chunk in chunks
+    ]
+
+    if args.queries:
+        with open(args.queries, "r", encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+    else:
+        queries = DEFAULT_QUERIES
+
+    print(f"🔢 {model}: {len(texts)} chunks, {len(queries)} queries, baseline {full_dim} dims\n")
+    full_embeddings = get_clients().embeddings(model, full_dim)
+    corpus_full = normalize(embed_all(full_embeddings, texts))
+    queries_full = normalize(np.array(full_embeddings.embed_documents(queries), dtype=np.float32))
+
+    # Ground truth: exact search at full dimension
+    truth = [set(top_k(corpus_full @ q, args.k).tolist()) for q in queries_full]
+
+    out_dir = Path(args.out)
+    results = []
+    for dim in sorted(set(args.dims + [full_dim])):
+        if args.reembed and dim != full_dim:
+            reduced = get_clients().embeddings(model, dim)
+            corpus = embed_all(reduced, texts)
+            query_vectors = np.array(reduced.embed_documents(queries), dtype=np.float32)
+        else:
+            corpus = corpus_full[:, :dim]
+            query_vectors = queries_full[:, :dim]
+        query_vectors = normalize(query_vectors)
+
+        path = out_dir / f"dim-{dim}"
+        LocalVectorIndex.build(path, corpus, records, info={"embedding_model": model})
+        index = LocalVectorIndex(path, mode=args.mode)
+
+        latencies, hits = [], 0
+        for q, expected in zip(query_vectors, truth):
+            start = time.perf_counter()
+            found = index.search(q, k=args.k)
+            latencies.append((time.perf_counter() - start) * 1000)
+            hits += len(expected & {row for row, _ in found})
+
+        results.append({
+            "dimension": dim,
+            "disk_mb": directory_size(path) / 1e6,
+            "resident_mb": index.memory_bytes()["mode_resident"] / 1e6,
+            "mean_ms": float(np.mean(latencies)),
+            "p95_ms": float(np.percentile(latencies, 95)),
+            "recall": hits / (len(truth) * args.k)
+        })
+
+    print(f"\n{'dims':>6} {'disk MB':>9} {'resident MB':>12} {'mean ms':>9} {'p95 ms':>8} {f'recall@{args.k}':>10}")
+    for r in results:
+        print(f"{r['dimension']:>6} {r['disk_mb']:>9.1f} {r['resident_mb']:>12.1f} {r['mean_ms']:>9.2f} "
+              f"{r['p95_ms']:>8.2f} {r['recall']:>10.3f}")
+
+    with open(out_dir / "report.json", "w", encoding="utf-8") as f:
+        json.dump({"model": model, "k": args.k, "mode": args.mode, "results": results}, f, indent=2)
+    print(f"\n📝 Report saved to {out_dir / 'report.json'}")
+    print("To serve a reduced index: VECTOR_BACKEND=local LOCAL_INDEX_PATH=<dir> EMBEDDING_DIMENSIONS=<dims>")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""Simulate ingestion and live queries sharing one OpenAI quota, fully offline.
+
+Starts a local mock of the embeddings and chat endpoints that enforces a
+requests/min and tokens/min quota (429 with retry-after-ms when exceeded),
+then runs bulk embedding workers and a steady stream of interactive chat
+requests against it through the shared pooled client, once without and
+once with the rate governor. Prints per-class latency, 429s and failures.
+
+Usage (from backend/):
+    python simulate_rate_limits.py --duration 20 --rpm 1200 --tpm 600000
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "app"))
+
+from services.rate_governor import BULK, INTERACTIVE, estimate_tokens, request_priority
+from utils.clients import ClientConfig, ClientManager
+
+EMBED_BODY = {"model": "text-embedding-3-large", "input": ["lorem ipsum " * 85] * 20}
+CHAT_BODY = {
+    "model": "gpt-3.5-turbo",
+    "messages": [{"role": "user", "content": "context " * 250 + "What is Amazon S3?"}],
+    "max_tokens": 500
+}
+
+
+class QuotaBucket:
+    """Server-side RPM/TPM enforcement, like the real API."""
+
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm, self.tpm = rpm, tpm
+        self.requests, self.tokens = float(rpm), float(tpm)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+        self.rejected = 0
+
+    def take(self, tokens: int) -> float:
+        """0 if admitted, otherwise seconds until the request would fit."""
+        with self.lock:
+            now = time.monotonic()
+            elapsed, self.updated = now - self.updated, now
+            self.requests = min(self.rpm, self.requests + elapsed * self.rpm / 60)
+            self.tokens = min(self.tpm, self.tokens + elapsed * self.tpm / 60)
+            if self.requests >= 1 and self.tokens >= tokens:
+                self.requests -= 1
+                self.tokens -= tokens
+                return 0.0
+            self.rejected += 1
+            return max((1 - self.requests) * 60 / self.rpm, (tokens - self.tokens) * 60 / self.tpm, 0.01)
+
+
+def start_mock(bucket: QuotaBucket) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            retry_after = bucket.take(estimate_tokens(payload))
+            if retry_after:
+                self._reply(429, {"error": "rate limited"}, {"retry-after-ms": str(int(retry_after * 1000))})
+                return
+            time.sleep(0.02 if "input" in payload else 0.3)  # upstream latency
+            self._reply(200, {"ok": True})
+
+        def _reply(self, status, body, headers=None):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def call(client, url: str, body: dict, results: list, max_retries: int = 3):
+    """One logical call with SDK-style retries on 429."""
+    start = time.perf_counter()
+    throttled = 0
+    for _ in range(max_retries + 1):
+        response = client.post(url, json=body)
+        if response.status_code != 429:
+            break
+        throttled += 1
+        time.sleep(float(response.headers.get("retry-after-ms", "1000")) / 1000)
+    results.append({
+        "ok": response.status_code == 200,
+        "latency": time.perf_counter() - start,
+        "throttled": throttled
+    })
+
+
+def run(args, governed: bool) -> dict:
+    bucket = QuotaBucket(args.rpm, args.tpm)
+    server = start_mock(bucket)
+    base = f"http://127.0.0.1:{server.server_port}/v1"
+    config = ClientConfig(
+        http2=False,
+        openai_rpm=args.rpm if governed else None,
+        openai_tpm=args.tpm if governed else None
+    )
+    clients = ClientManager(config)
+    results = {INTERACTIVE: [], BULK: []}
+    stop = time.monotonic() + args.duration
+
+    def bulk_worker():
+        with request_priority(BULK):
+            while time.monotonic() < stop:
+                call(clients.http_client, f"{base}/embeddings", EMBED_BODY, results[BULK])
+
+    def interactive_worker():
+        with request_priority(INTERACTIVE):
+            while time.monotonic() < stop:
+                issued = time.monotonic()
+                call(clients.http_client, f"{base}/chat/completions", CHAT_BODY, results[INTERACTIVE])
+                time.sleep(max(0.0, args.query_interval - (time.monotonic() - issued)))
+
+    threads = [threading.Thread(target=bulk_worker) for _ in range(args.bulk_workers)]
+    threads += [threading.Thread(target=interactive_worker) for _ in range(args.interactive_users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    server.shutdown()
+
+    report = {"server_429s": bucket.rejected}
+    for name, rows in results.items():
+        latencies = np.array([row["latency"] for row in rows if row["ok"]]) * 1000
+        report[name] = {
+            "calls": len(rows),
+            "failed": sum(1 for row in rows if not row["ok"]),
+            "throttled": sum(row["throttled"] for row in rows),
+            "p50_ms": float(np.percentile(latencies, 50)) if len(latencies) else None,
+            "p95_ms": float(np.percentile(latencies, 95)) if len(latencies) else None
+        }
+    if clients.governor:
+        report["governor"] = clients.governor.stats()
+    clients.close()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--rpm", type=int, default=1200)
+    parser.add_argument("--tpm", type=int, default=600_000)
+    parser.add_argument("--bulk-workers", type=int, default=8)
+    parser.add_argument("--interactive-users", type=int, default=2)
+    parser.add_argument("--query-interval", type=float, default=1.0, help="Seconds between one user's queries")
+    parser.add_argument("--output", help="Write both reports as JSON")
+    args = parser.parse_args()
+
+    print(f"🧪 Mock quota: {args.rpm} RPM, {args.tpm} TPM; {args.bulk_workers} bulk workers, "
+          f"{args.interactive_users} interactive users, {args.duration:.0f}s per run\n")
+    reports = {}
+    for governed in (False, True):
+        label = "governed" if governed else "ungoverned"
+        print(f"▶️  {label}...")
+        reports[label] = run(args, governed)
+
+    print(f"\n{'run':<11} {'class':<12} {'calls':>6} {'failed':>7} {'429s':>6} {'p50 ms':>8} {'p95 ms':>8}")
+    for label, report in reports.items():
+        for name in (INTERACTIVE, BULK):
+            r = report[name]
+            p50 = f"{r['p50_ms']:.0f}" if r["p50_ms"] is not None else "-"
+            p95 = f"{r['p95_ms']:.0f}" if r["p95_ms"] is not None else "-"
+            print(f"{label:<11} {name:<12} {r['calls']:>6} {r['failed']:>7} {r['throttled']:>6} {p50:>8} {p95:>8}")
+    governor = reports["governed"].get("governor")
+    if governor:
+        print(f"\n📊 Governor: {json.dumps(governor['waits'])}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(reports, f, indent=2)
+        print(f"\n📝 Report saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
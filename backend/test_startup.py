@@ -27,29 +27,28 @@ try:
     else:
         print("   ❌ Pinecone key NOT found")
     
-    print("6. Importing langchain packages...")
-    from langchain_openai import OpenAIEmbeddings
-    print("   ✅ OpenAIEmbeddings imported")
-    
-    from langchain_pinecone import Pinecone as PineconeVectorStore
-    print("   ✅ PineconeVectorStore imported")
+    print("6. Importing shared clients...")
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "app"))
+    from utils.clients import get_clients
+    clients = get_clients()
+    print(f"   ✅ Client config: {clients.config}")
     
     print("7. Initializing embeddings...")
-    embeddings = OpenAIEmbeddings(
-        model=os.getenv("EMBEDDING_MODEL", "text-embedding-3-large")
-    )
+    embeddings = clients.embeddings()
     print("   ✅ Embeddings initialized")
     
     print("8. Connecting to Pinecone...")
     index_name = os.getenv("PINECONE_INDEX_NAME", "aws-study-partner")
     print(f"   Looking for index: {index_name}")
     
-    vectorstore = PineconeVectorStore.from_existing_index(
-        index_name=index_name,
-        embedding=embeddings
-    )
+    vectorstore = clients.vectorstore(index_name, embeddings)
     print("   ✅ Pinecone connected!")
     
+    print("9. Round-tripping one embedding...")
+    start = time.time()
+    embeddings.embed_query("connection check")
+    print(f"   ✅ {(time.time() - start) * 1000:.0f} ms, pools: {clients.stats()['openai']}")
+    
     print("\n✅ All components initialized successfully!")
     print("The issue is NOT with initialization.")
     
@@ -0,0 +1,108 @@
+"""Print traces recorded with TRACING=jsonl as indented span trees.
+
+Each span shows its duration, its share of the trace and its attributes,
+so the stage that dominates a slow request or ingestion job stands out.
+By default the slowest traces are shown; --trace, --request or --job pick
+one out.
+
+Usage (from backend/):
+    python trace_report.py
+    python trace_report.py --slowest 3 --name api.query
+    python trace_report.py --request 4f2a9c... --file ../data/traces.jsonl
+"""
+import argparse
+import json
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "app"))
+
+from services.tracing import CORRELATION_KEYS, DEFAULT_TRACE_FILE
+
+
+def load_traces(path: Path) -> Dict[str, List[Dict]]:
+    traces = defaultdict(list)
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                traces[record["trace_id"]].append(record)
+    return traces
+
+
+def roots(spans: List[Dict]) -> List[Dict]:
+    """Spans whose parent is not in the trace (normally just the root)."""
+    ids = {s["span_id"] for s in spans}
+    return [s for s in spans if s["parent_span_id"] not in ids]
+
+
+def trace_duration(spans: List[Dict]) -> float:
+    return (max(s["end_time_unix_nano"] for s in spans) - min(s["start_time_unix_nano"] for s in spans)) / 1e6
+
+
+def print_trace(spans: List[Dict]):
+    children = defaultdict(list)
+    for s in spans:
+        children[s["parent_span_id"]].append(s)
+    total = trace_duration(spans) or 1.0
+    root = roots(spans)[0]
+    correlation = " ".join(f"{key}={root['attributes'][key]}" for key in CORRELATION_KEYS if key in root["attributes"])
+    print(f"🔭 trace {root['trace_id']} · {total:.1f}ms · {len(spans)} spans {correlation}".rstrip())
+
+    def walk(span: Dict, depth: int):
+        attributes = " ".join(
+            f"{key}={value}" for key, value in span["attributes"].items() if key not in CORRELATION_KEYS
+        )
+        status = "" if span["status"] == "OK" else f" [{span['status']}]"
+        print(f"   {'  ' * depth}{span['name']:<{max(28 - 2 * depth, 8)}} {span['duration_ms']:>9.1f}ms "
+              f"{100 * span['duration_ms'] / total:>5.1f}%{status} {attributes}".rstrip())
+        for child in sorted(children[span["span_id"]], key=lambda s: s["start_time_unix_nano"]):
+            walk(child, depth + 1)
+
+    for top in sorted(roots(spans), key=lambda s: s["start_time_unix_nano"]):
+        walk(top, 0)
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--file", type=Path, default=DEFAULT_TRACE_FILE, help="Trace file (default: $TRACE_FILE location)")
+    parser.add_argument("--trace", help="Trace id")
+    parser.add_argument("--request", help="request.id of an API call")
+    parser.add_argument("--job", help="job.id of an ingestion job")
+    parser.add_argument("--name", help="Only traces whose root span has this name")
+    parser.add_argument("--slowest", type=int, default=5, help="Number of traces shown")
+    args = parser.parse_args()
+
+    if not args.file.exists():
+        print(f"❌ {args.file} not found; run with TRACING=jsonl to record traces")
+        sys.exit(1)
+    traces = load_traces(args.file)
+
+    selected = []
+    for trace_id, spans in traces.items():
+        root = roots(spans)[0]
+        if args.trace and trace_id != args.trace:
+            continue
+        if args.request and root["attributes"].get("request.id") != args.request:
+            continue
+        if args.job and root["attributes"].get("job.id") != args.job:
+            continue
+        if args.name and root["name"] != args.name:
+            continue
+        selected.append(spans)
+    if not selected:
+        print("No matching traces.")
+        return
+
+    selected.sort(key=trace_duration, reverse=True)
+    print(f"📊 {len(traces):,} traces in {args.file}; showing {min(args.slowest, len(selected))} "
+          f"of {len(selected):,} matching, slowest first\n")
+    for spans in selected[:args.slowest]:
+        print_trace(spans)
+
+
+if __name__ == "__main__":
+    main()